@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""Throughput benchmark for download_kaggle_writeups.py against fake_kaggle_server.py.
+
+Runs a full download into a scratch directory for every engine x --threads combination and
+reports writeups/sec, p50/p99 request latency and retries. With --baseline, compares
+writeups/sec against an earlier --json-out and exits 1 on a regression.
+
+    python scripts/benchmark_download.py --engines threads,async --threads 1,4,16 \\
+        --writeups 1000 --latency-ms 40 --rate-429 0.01 --json-out bench.json
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from download_kaggle_writeups import ENGINES, STORAGE_LAYOUTS
+from fake_kaggle_server import CONTENT_ENCODINGS, LATENCY_DISTRIBUTIONS, FakeKaggleServer, FakeServerConfig
+
+
+DOWNLOADER = Path(__file__).resolve().parent / "download_kaggle_writeups.py"
+
+
+@dataclass(frozen=True)
+class BenchResult:
+    engine: str
+    threads: int
+    run: int
+    writeups: int
+    seconds: float
+    writeups_per_second: float
+    requests: int
+    retries: int
+    throttled: int
+    p50_ms: float
+    p99_ms: float
+
+
+def _parse_csv_list(value: str) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def _parse_done_block(stdout: str) -> Dict[str, str]:
+    fields: Dict[str, str] = {}
+    for line in stdout.splitlines():
+        if line.startswith("requests "):
+            line = line[len("requests ") :]
+        for token in line.split():
+            key, sep, value = token.partition("=")
+            if sep:
+                fields[key] = value
+    return fields
+
+
+def _run_once(
+    server: FakeKaggleServer,
+    engine: str,
+    threads: int,
+    run: int,
+    downloader_args: Sequence[str],
+) -> BenchResult:
+    with tempfile.TemporaryDirectory(prefix="bench_writeups_") as tmp:
+        cmd = [
+            sys.executable,
+            str(DOWNLOADER),
+            "--base-url",
+            server.url,
+            "--competition-slug",
+            server.cfg.competition_slug,
+            "--competition-id",
+            str(server.cfg.competition_id),
+            "--out-dir",
+            tmp,
+            "--engine",
+            engine,
+            "--threads",
+            str(threads),
+            *downloader_args,
+        ]
+        started = time.monotonic()
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        seconds = time.monotonic() - started
+
+    if proc.returncode != 0:
+        tail = "\n".join(proc.stderr.splitlines()[-20:])
+        raise RuntimeError(f"downloader failed (engine={engine} threads={threads} rc={proc.returncode}):\n{tail}")
+
+    fields = _parse_done_block(proc.stdout)
+    writeups = int(fields.get("unique_writeups", 0))
+    return BenchResult(
+        engine=engine,
+        threads=threads,
+        run=run,
+        writeups=writeups,
+        seconds=seconds,
+        writeups_per_second=writeups / seconds if seconds > 0 else 0.0,
+        requests=int(fields.get("total", 0)),
+        retries=int(fields.get("retries", 0)),
+        throttled=int(fields.get("throttled", 0)),
+        p50_ms=float(fields.get("p50_ms", 0.0)),
+        p99_ms=float(fields.get("p99_ms", 0.0)),
+    )
+
+
+def _print_table(results: Sequence[BenchResult]) -> None:
+    sys.stdout.write(
+        f"{'engine':<8} {'threads':>7} {'run':>3} {'writeups':>8} {'seconds':>8} {'wu/s':>8} "
+        f"{'p50_ms':>8} {'p99_ms':>8} {'requests':>8} {'retries':>7} {'429s':>5}\n"
+    )
+    for r in results:
+        sys.stdout.write(
+            f"{r.engine:<8} {r.threads:>7} {r.run:>3} {r.writeups:>8} {r.seconds:>8.2f} "
+            f"{r.writeups_per_second:>8.1f} {r.p50_ms:>8.1f} {r.p99_ms:>8.1f} {r.requests:>8} "
+            f"{r.retries:>7} {r.throttled:>5}\n"
+        )
+    sys.stdout.flush()
+
+
+def _best_throughput(results: Sequence[Dict[str, object]]) -> Dict[str, float]:
+    best: Dict[str, float] = {}
+    for r in results:
+        key = f"{r['engine']}/{r['threads']}"
+        best[key] = max(best.get(key, 0.0), float(r["writeups_per_second"]))  # type: ignore[arg-type]
+    return best
+
+
+def _check_regressions(results: Sequence[BenchResult], baseline_path: Path, max_regression: float) -> int:
+    baseline = _best_throughput(json.loads(baseline_path.read_text(encoding="utf-8"))["results"])
+    current = _best_throughput([asdict(r) for r in results])
+    rc = 0
+    for key, now in sorted(current.items()):
+        before = baseline.get(key)
+        if not before:
+            continue
+        change = (now - before) / before
+        status = "ok"
+        if change < -max_regression:
+            status = "REGRESSION"
+            rc = 1
+        sys.stdout.write(f"baseline {key}: {before:.1f} -> {now:.1f} wu/s ({change:+.1%}) {status}\n")
+    return rc
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--engines", default=",".join(ENGINES), help=f"Comma-separated subset of {ENGINES}")
+    parser.add_argument("--threads", default="1,4,16", help="Comma-separated --threads settings")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--writeups", type=int, default=500)
+    parser.add_argument("--markdown-bytes", type=int, default=4000)
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    parser.add_argument("--latency-distribution", choices=LATENCY_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-5xx", type=float, default=0.0)
+    parser.add_argument("--retry-after-seconds", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--content-encodings",
+        default=",".join(CONTENT_ENCODINGS),
+        help="Encodings the fake server offers (empty: uncompressed responses)",
+    )
+    parser.add_argument("--storage", choices=STORAGE_LAYOUTS, default="files")
+    parser.add_argument("--min-request-interval-seconds", type=float, default=0.0)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--adaptive-concurrency", action="store_true")
+    parser.add_argument("--json-out", help="Write results as JSON (usable as a later --baseline)")
+    parser.add_argument("--baseline", help="Earlier --json-out to compare writeups/sec against")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.2,
+        help="Fail when writeups/sec drops by more than this fraction versus --baseline",
+    )
+    args = parser.parse_args(argv)
+
+    engines = _parse_csv_list(args.engines)
+    for engine in engines:
+        if engine not in ENGINES:
+            parser.error(f"unknown engine: {engine}")
+    thread_settings = [max(1, int(t)) for t in _parse_csv_list(args.threads)]
+
+    server_cfg = FakeServerConfig(
+        writeups=max(1, int(args.writeups)),
+        markdown_bytes=max(0, int(args.markdown_bytes)),
+        latency_ms=max(0.0, float(args.latency_ms)),
+        latency_distribution=str(args.latency_distribution),
+        rate_429=max(0.0, float(args.rate_429)),
+        rate_5xx=max(0.0, float(args.rate_5xx)),
+        retry_after_seconds=max(0.0, float(args.retry_after_seconds)),
+        seed=int(args.seed),
+        content_encodings=tuple(_parse_csv_list(str(args.content_encodings))),
+    )
+    downloader_args = [
+        "--storage",
+        str(args.storage),
+        "--min-request-interval-seconds",
+        str(float(args.min_request_interval_seconds)),
+        "--page-size",
+        str(int(args.page_size)),
+    ]
+    if args.adaptive_concurrency:
+        downloader_args.append("--adaptive-concurrency")
+
+    results: List[BenchResult] = []
+    server = FakeKaggleServer(server_cfg).start()
+    try:
+        for engine in engines:
+            for threads in thread_settings:
+                for run in range(1, max(1, int(args.repeat)) + 1):
+                    sys.stderr.write(f"[bench] engine={engine} threads={threads} run={run}\n")
+                    sys.stderr.flush()
+                    results.append(_run_once(server, engine, threads, run, downloader_args))
+    finally:
+        server.close()
+
+    _print_table(results)
+
+    if args.json_out:
+        Path(args.json_out).write_text(
+            json.dumps(
+                {"server": asdict(server_cfg), "downloader_args": downloader_args, "results": [asdict(r) for r in results]},
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
+
+    if args.baseline:
+        return _check_regressions(results, Path(args.baseline), float(args.max_regression))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -9,29 +9,82 @@ Usage:
   # Stage 1: Infer categories from sample
   python classify_writeups.py infer --csv writeups.csv --out categories.json
 
-  # Stage 2: Classify all writeups
-  python classify_writeups.py classify --csv writeups.csv --categories categories.json --out writeups_classified.csv
+  # Or infer from every writeup: batches in parallel, merged in a tree (rerun with --resume after a failure)
+  python classify_writeups.py infer --csv writeups.csv --out categories.json --all --concurrency 8
+
+  # Stage 2: Classify all writeups (8 batches in flight)
+  python classify_writeups.py classify --csv writeups.csv --categories categories.json --out writeups_classified.csv --concurrency 8
+
+  # Assign clear-cut writeups locally (needs numpy); only ambiguous ones go to the LLM
+  python classify_writeups.py classify --csv writeups.csv --categories categories.json --out writeups_classified.csv --prefilter
+
+  # After a crash or Ctrl+C, finish from the journal instead of starting over
+  python classify_writeups.py classify --csv writeups.csv --categories categories.json --out writeups_classified.csv --resume
 
 Environment variables:
   LLM_API_KEY      - API key (required)
   LLM_BASE_URL     - Base URL (default: https://api.openai.com/v1)
   LLM_MODEL        - Model name (default: gpt-4o-mini)
+  LLM_CACHE_PATH   - Response cache shared with extract_keywords.py (see llm_cache.py);
+                     pass --no-cache to bypass it
+  LLM_INPUT_TOKEN_BUDGET / LLM_OUTPUT_TOKEN_BUDGET
+                   - Per-call token budgets batches are packed against (defaults: 12000 / 4096),
+                     e.g. raised for models with larger context or output limits
 """
 
 import argparse
+import concurrent.futures
 import csv
+import hashlib
 import json
 import os
+import queue
 import random
 import sys
+import threading
 import time
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from llm_cache import LlmCache, cache_key, open_llm_cache
+from local_classifier import DEFAULT_MIN_MARGIN, local_classify
 
 # ---------------------------------------------------------------------------
 # LLM Client (fetch-based, edge-friendly)
 # ---------------------------------------------------------------------------
 
+class SharedBackoff:
+    """429 backoff shared by concurrent LLM calls.
+
+    The first rate-limited response pauses every caller until its wait is over, instead of
+    each thread discovering the limit on its own and hammering the API meanwhile.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._until = 0.0
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._until = max(self._until, time.monotonic() + seconds)
+
+    def wait(self) -> None:
+        while True:
+            with self._lock:
+                delay = self._until - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+
+def _retry_after_seconds(e: Any) -> Optional[float]:
+    try:
+        value = float(e.headers.get("Retry-After") or "")
+    except (AttributeError, TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
 def llm_chat(
     messages: List[Dict[str, str]],
     *,
@@ -41,8 +94,22 @@ def llm_chat(
     temperature: float = 0.3,
     max_tokens: int = 4096,
     max_retries: int = 5,
+    backoff: Optional[SharedBackoff] = None,
+    cache: Optional[LlmCache] = None,
+    validate: Optional[Callable[[str], Any]] = None,
+    stream: bool = False,
+    on_text: Optional[Callable[[str], None]] = None,
 ) -> str:
-    """Call LLM chat completion API, return assistant message content."""
+    """Call LLM chat completion API, return assistant message content.
+
+    With *backoff*, a 429 seen by any caller sharing it delays all of their requests.
+    With *cache*, identical requests are answered from disk; a response is only cached
+    once *validate* (e.g. the caller's JSON parser) accepts it, so a malformed answer is
+    asked for again on the next run.
+    With *stream*, the answer is read as server-sent events and each piece is passed to
+    *on_text* as it arrives (a cached answer is passed whole). A stream that breaks after
+    the first piece is not retried, since *on_text* has already seen part of it.
+    """
     import urllib.request
     import urllib.error
 
@@ -57,8 +124,22 @@ def llm_chat(
         "temperature": temperature,
         "max_tokens": max_tokens,
     }
-
+    if stream:
+        payload["stream"] = True
+
+    key = ""
+    if cache is not None:
+        key = cache_key(model, messages, temperature=temperature, max_tokens=max_tokens)
+        cached = cache.get(key)
+        if cached is not None:
+            if on_text is not None:
+                on_text(cached)
+            return cached
+
+    parts: List[str] = []
     for attempt in range(1, max_retries + 1):
+        if backoff is not None:
+            backoff.wait()
         try:
             req = urllib.request.Request(
                 url,
@@ -67,17 +148,36 @@ def llm_chat(
                 method="POST",
             )
             with urllib.request.urlopen(req, timeout=120) as resp:
-                data = json.loads(resp.read().decode("utf-8"))
-                return data["choices"][0]["message"]["content"]
+                if stream:
+                    for text in _read_sse_deltas(resp):
+                        parts.append(text)
+                        if on_text is not None:
+                            on_text(text)
+                    content = "".join(parts)
+                else:
+                    data = json.loads(resp.read().decode("utf-8"))
+                    content = data["choices"][0]["message"]["content"]
+            if cache is not None:
+                try:
+                    if validate is not None:
+                        validate(content)
+                except ValueError:
+                    pass
+                else:
+                    cache.put(key, model, content)
+            return content
         except urllib.error.HTTPError as e:
             if e.code == 429:
-                wait = min(60, 2 ** attempt)
+                wait = _retry_after_seconds(e) or min(60, 2 ** attempt)
                 print(f"[llm] rate limited, retry {attempt}/{max_retries} after {wait}s", file=sys.stderr)
-                time.sleep(wait)
+                if backoff is not None:
+                    backoff.pause(wait)
+                else:
+                    time.sleep(wait)
                 continue
             raise
         except Exception as e:
-            if attempt < max_retries:
+            if attempt < max_retries and not parts:
                 wait = min(30, 2 ** attempt)
                 print(f"[llm] error {e}, retry {attempt}/{max_retries} after {wait}s", file=sys.stderr)
                 time.sleep(wait)
@@ -87,6 +187,143 @@ def llm_chat(
     raise RuntimeError("LLM call failed after retries")
 
 
+def _read_sse_deltas(resp: Any) -> Any:
+    """Yield the content pieces of a ``stream: true`` chat completion response."""
+    for raw in resp:
+        line = raw.decode("utf-8").strip()
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return
+        choices = json.loads(data).get("choices") or [{}]
+        text = (choices[0].get("delta") or {}).get("content")
+        if text:
+            yield text
+
+
+class JsonArrayStream:
+    """Incrementally parse the objects of a JSON array from a streamed LLM answer.
+
+    Text before the opening ``[`` (e.g. a ```json fence) is skipped; :meth:`feed` returns
+    every top-level object completed by the new text, so a truncated answer still yields
+    all objects that were finished.
+    """
+
+    def __init__(self) -> None:
+        self._in_array = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._buf: List[str] = []
+
+    def feed(self, text: str) -> List[Any]:
+        items: List[Any] = []
+        for ch in text:
+            if not self._in_array:
+                self._in_array = ch == "["
+                continue
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    self._buf = [ch]
+                elif ch == "]":
+                    self._in_array = False
+                continue
+            self._buf.append(ch)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        items.append(json.loads("".join(self._buf)))
+                    except ValueError:
+                        pass
+        return items
+
+
+def parse_json_response(response: str) -> Any:
+    """Parse JSON from an LLM response, unwrapping a ```json fenced block if present."""
+    if "```json" in response:
+        start = response.find("```json") + 7
+        end = response.find("```", start)
+        response = response[start:end].strip()
+    elif "```" in response:
+        start = response.find("```") + 3
+        end = response.find("```", start)
+        response = response[start:end].strip()
+
+    return json.loads(response)
+
+
+# ---------------------------------------------------------------------------
+# Token-aware batching
+# ---------------------------------------------------------------------------
+
+DEFAULT_INPUT_TOKEN_BUDGET = 12000
+DEFAULT_OUTPUT_TOKEN_BUDGET = 4096
+# Token counts are estimates; keep this much of the output budget in reserve.
+OUTPUT_TOKEN_HEADROOM = 0.8
+# A taxonomy answer does not grow with the number of rows in the batch.
+INFER_OUTPUT_TOKENS = 2000
+
+T = TypeVar("T")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count without a tokenizer: ~4 ASCII chars per token, one per other char (e.g. CJK)."""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def pack_batches(
+    items: Sequence[T],
+    input_tokens: Sequence[int],
+    output_tokens: Sequence[int],
+    input_budget: int,
+    output_budget: int,
+    max_rows: int = 0,
+) -> List[List[T]]:
+    """Split *items* into consecutive batches that fit both token budgets (and *max_rows*, if set).
+
+    An item too large for a budget on its own still gets a batch of its own.
+    """
+    batches: List[List[T]] = []
+    batch: List[T] = []
+    used_in = used_out = 0
+    for item, cost_in, cost_out in zip(items, input_tokens, output_tokens):
+        full = max_rows > 0 and len(batch) >= max_rows
+        if batch and (full or used_in + cost_in > input_budget or used_out + cost_out > output_budget):
+            batches.append(batch)
+            batch, used_in, used_out = [], 0, 0
+        batch.append(item)
+        used_in += cost_in
+        used_out += cost_out
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _token_budgets(args: argparse.Namespace) -> Tuple[int, int]:
+    input_budget = args.input_token_budget or int(
+        os.environ.get("LLM_INPUT_TOKEN_BUDGET") or DEFAULT_INPUT_TOKEN_BUDGET
+    )
+    output_budget = args.output_token_budget or int(
+        os.environ.get("LLM_OUTPUT_TOKEN_BUDGET") or DEFAULT_OUTPUT_TOKEN_BUDGET
+    )
+    return input_budget, output_budget
+
+
 # ---------------------------------------------------------------------------
 # Stage 1: Infer categories from sample
 # ---------------------------------------------------------------------------
@@ -138,20 +375,24 @@ Output format (JSON):
 }
 """
 
+def _infer_line(sample: Dict[str, str]) -> str:
+    return f"- **{sample['title']}**: {sample['description']}"
+
+
 def infer_categories(
     samples: List[Dict[str, str]],
     *,
     api_key: str,
     base_url: str,
     model: str,
+    cache: Optional[LlmCache] = None,
+    backoff: Optional[SharedBackoff] = None,
+    max_tokens: int = 4096,
 ) -> Dict[str, Any]:
     """Use LLM to infer categories from sample projects."""
 
     # Format samples for LLM
-    sample_text = "\n".join(
-        f"- **{s['title']}**: {s['description']}"
-        for s in samples
-    )
+    sample_text = "\n".join(_infer_line(s) for s in samples)
 
     messages = [
         {"role": "system", "content": INFER_SYSTEM_PROMPT},
@@ -164,21 +405,157 @@ def infer_categories(
         base_url=base_url,
         model=model,
         temperature=0.3,
-        max_tokens=4096,
+        max_tokens=max_tokens,
+        backoff=backoff,
+        cache=cache,
+        validate=parse_json_response,
     )
 
-    # Parse JSON from response
-    # Try to extract JSON block if wrapped in markdown
-    if "```json" in response:
-        start = response.find("```json") + 7
-        end = response.find("```", start)
-        response = response[start:end].strip()
-    elif "```" in response:
-        start = response.find("```") + 3
-        end = response.find("```", start)
-        response = response[start:end].strip()
+    return parse_json_response(response)
 
-    return json.loads(response)
+
+class TaxonomyStore:
+    """One JSON file per node of an ``infer --all`` map-reduce tree, so ``--resume`` only redoes what failed.
+
+    Node ``(0, i)`` is the taxonomy inferred from batch ``i``; node ``(level, i)`` merges a group
+    of nodes from the level below. ``plan.json`` records a fingerprint of the batches, model and
+    merge settings, and resuming a tree built for different ones is refused.
+    """
+
+    def __init__(self, root: Path, fingerprint: str) -> None:
+        self.root = root
+        self.fingerprint = fingerprint
+
+    def start(self, resume: bool) -> None:
+        plan_path = self.root / "plan.json"
+        if resume and plan_path.exists():
+            if json.loads(plan_path.read_text(encoding="utf-8")).get("fingerprint") != self.fingerprint:
+                raise RuntimeError(
+                    f"{self.root} was built from different writeups, model or merge settings; "
+                    "rerun without --resume to start over"
+                )
+            return
+        if self.root.exists() and any(self.root.iterdir()):
+            # Only ever clear a directory this store created; --work-dir may be mistyped.
+            if not plan_path.exists():
+                raise RuntimeError(f"{self.root} is not empty and has no plan.json; choose another --work-dir")
+            self._clear()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._write(plan_path, {"fingerprint": self.fingerprint})
+
+    def _clear(self) -> None:
+        """Delete the plan and node files written by an earlier run, leaving anything else alone."""
+        for level_dir in self.root.glob("level[0-9]*"):
+            for path in level_dir.glob("node_[0-9]*.json*"):
+                path.unlink()
+            if not any(level_dir.iterdir()):
+                level_dir.rmdir()
+        (self.root / "plan.json").unlink()
+
+    def _path(self, level: int, index: int) -> Path:
+        return self.root / f"level{level}" / f"node_{index:05d}.json"
+
+    def load(self, level: int, index: int) -> Optional[Dict[str, Any]]:
+        path = self._path(level, index)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def save(self, level: int, index: int, taxonomy: Dict[str, Any]) -> None:
+        path = self._path(level, index)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._write(path, taxonomy)
+
+    @staticmethod
+    def _write(path: Path, obj: Dict[str, Any]) -> None:
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(obj, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+
+def _as_completed_in_daemon_threads(
+    call: Callable[[T], Any], items: Sequence[T], concurrency: int, stop: threading.Event
+) -> Iterator[Tuple[int, "concurrent.futures.Future[Any]"]]:
+    """Run ``call(item)`` on *concurrency* daemon threads; yield (index, finished future) as each ends.
+
+    Unlike a ThreadPoolExecutor, the workers never keep the process alive: on Ctrl+C the
+    caller sets *stop*, so no further item is started, and exits without waiting for the
+    requests (or retry sleeps) still in flight.
+    """
+    todo: "queue.SimpleQueue[int]" = queue.SimpleQueue()
+    for i in range(len(items)):
+        todo.put(i)
+    finished: "queue.SimpleQueue[Tuple[int, concurrent.futures.Future[Any]]]" = queue.SimpleQueue()
+
+    def worker() -> None:
+        while not stop.is_set():
+            try:
+                i = todo.get_nowait()
+            except queue.Empty:
+                return
+            future: "concurrent.futures.Future[Any]" = concurrent.futures.Future()
+            try:
+                future.set_result(call(items[i]))
+            except Exception as e:
+                future.set_exception(e)
+            finished.put((i, future))
+
+    for _ in range(min(concurrency, len(items))):
+        threading.Thread(target=worker, daemon=True).start()
+    for _ in range(len(items)):
+        yield finished.get()
+
+
+def _run_tree_level(
+    store: TaxonomyStore,
+    level: int,
+    inputs: Sequence[T],
+    call: Callable[[T], Dict[str, Any]],
+    *,
+    describe: Callable[[T], str],
+    concurrency: int,
+    cache: Optional[LlmCache],
+) -> List[Dict[str, Any]]:
+    """Compute (or reload) every node of one tree level; exits 1 if any node failed."""
+    nodes: List[Optional[Dict[str, Any]]] = [store.load(level, i) for i in range(len(inputs))]
+    todo = [i for i, node in enumerate(nodes) if node is None]
+    if len(todo) < len(inputs):
+        print(f"Reusing {len(inputs) - len(todo)} of {len(inputs)} level-{level} taxonomies from {store.root}")
+
+    def run(i: int) -> Dict[str, Any]:
+        hits = cache.hits if cache is not None else 0
+        result = call(inputs[i])
+        if concurrency == 1 and (cache is None or cache.hits == hits):
+            time.sleep(1)  # Rate limit
+        return result
+
+    failed = 0
+    stop = threading.Event()
+    try:
+        completed = _as_completed_in_daemon_threads(run, todo, concurrency, stop)
+        for done, (n, future) in enumerate(completed, 1):
+            i = todo[n]
+            prefix = f"[level {level}: {done}/{len(todo)}] node {i + 1}, {describe(inputs[i])}"
+            try:
+                nodes[i] = future.result()
+                store.save(level, i, nodes[i])
+                print(f"{prefix}: {len(nodes[i].get('categories', []))} categories", flush=True)
+            except Exception as e:
+                failed += 1
+                print(f"{prefix} ERROR: {e}", flush=True)
+    except KeyboardInterrupt:
+        stop.set()
+        print(f"\nInterrupted; completed taxonomies are in {store.root}. Rerun with --resume to continue.")
+        sys.exit(130)
+
+    if failed:
+        print(
+            f"Error: {failed} of {len(inputs)} level-{level} calls failed; "
+            f"rerun with --resume to retry only those",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    return [node for node in nodes if node is not None]
 
 
 def cmd_infer(args: argparse.Namespace) -> None:
@@ -195,6 +572,8 @@ def cmd_infer(args: argparse.Namespace) -> None:
     out_path = Path(args.out)
     batch_size = args.batch_size
     use_all = args.all
+    cache = open_llm_cache(args.no_cache)
+    input_budget, output_budget = _token_budgets(args)
 
     # Read CSV
     with csv_path.open("r", encoding="utf-8", newline="") as f:
@@ -202,6 +581,9 @@ def cmd_infer(args: argparse.Namespace) -> None:
         rows = list(reader)
 
     print(f"Loaded {len(rows)} writeups from {csv_path}")
+    if not rows:
+        print(f"Error: no writeups in {csv_path} to infer categories from", file=sys.stderr)
+        sys.exit(1)
 
     # Prepare all data
     all_data = [
@@ -210,42 +592,104 @@ def cmd_infer(args: argparse.Namespace) -> None:
     ]
 
     if use_all:
-        # Full dataset mode: process in batches, then merge
-        print(f"Processing ALL {len(all_data)} writeups in batches of {batch_size}")
-        
-        batch_categories = []
-        total_batches = (len(all_data) + batch_size - 1) // batch_size
-        
-        for i in range(0, len(all_data), batch_size):
-            batch = all_data[i:i + batch_size]
-            batch_num = i // batch_size + 1
-            print(f"[{batch_num}/{total_batches}] Inferring categories from {len(batch)} writeups...", end=" ", flush=True)
-            
-            try:
-                result = infer_categories(
-                    batch,
-                    api_key=api_key,
-                    base_url=base_url,
-                    model=model,
-                )
-                cats = result.get("categories", [])
-                batch_categories.extend(cats)
-                print(f"found {len(cats)} categories")
-            except Exception as e:
-                print(f"ERROR: {e}")
-            
-            time.sleep(1)  # Rate limit
-        
-        print(f"\nCollected {len(batch_categories)} category suggestions from {total_batches} batches")
-        print("Merging categories...")
+        # Full dataset mode: infer from batches packed to the input token budget in parallel
+        # (map), then merge the suggestions in a tree whose merge prompts also fit the budget
+        # (reduce). Every node is persisted, so --resume redoes only failed calls.
+        prompt_tokens = estimate_tokens(INFER_SYSTEM_PROMPT) + 50
+        batches = pack_batches(
+            all_data,
+            [estimate_tokens(_infer_line(d)) + 1 for d in all_data],
+            [0] * len(all_data),
+            max(1, input_budget - prompt_tokens),
+            output_budget,
+            max_rows=batch_size,
+        )
+        print(
+            f"Processing ALL {len(all_data)} writeups in {len(batches)} batches "
+            f"(<= {input_budget} input tokens{f', <= {batch_size} rows' if batch_size else ''} each)"
+        )
         
-        # Merge all batch categories
-        result = merge_categories(
-            batch_categories,
-            api_key=api_key,
-            base_url=base_url,
-            model=model,
+        max_tokens = max(output_budget, INFER_OUTPUT_TOKENS)
+        merge_budget = max(1, input_budget - estimate_tokens(MERGE_CATEGORIES_PROMPT) - 50)
+        fan_in = max(2, args.merge_fan_in)
+        work_dir = Path(args.work_dir) if args.work_dir else out_path.with_name(out_path.name + ".work")
+        fingerprint = hashlib.sha256(
+            json.dumps(
+                {
+                    "batches": [[_infer_line(d) for d in batch] for batch in batches],
+                    "model": model,
+                    "merge_budget": merge_budget,
+                    "fan_in": fan_in,
+                },
+                sort_keys=True,
+            ).encode("utf-8")
+        ).hexdigest()
+        store = TaxonomyStore(work_dir, fingerprint)
+        try:
+            store.start(args.resume)
+        except RuntimeError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+
+        concurrency = max(1, args.concurrency)
+        backoff = SharedBackoff()
+        llm = {"api_key": api_key, "base_url": base_url, "model": model, "cache": cache, "backoff": backoff}
+        if concurrency > 1:
+            print(f"Inferring from {len(batches)} batches, {concurrency} in flight")
+        nodes = _run_tree_level(
+            store,
+            0,
+            batches,
+            lambda batch: infer_categories(batch, max_tokens=max_tokens, **llm),
+            describe=lambda batch: f"{len(batch)} writeups",
+            concurrency=concurrency,
+            cache=cache,
+        )
+        print(
+            f"\nCollected {sum(len(n.get('categories', [])) for n in nodes)} category suggestions "
+            f"from {len(nodes)} batches"
         )
+
+        # Group taxonomies so each merge prompt fits the budget and has at most fan_in inputs;
+        # repeat on the merged taxonomies until one is left.
+        level = 0
+        while level == 0 or len(nodes) > 1:
+            level += 1
+            groups = pack_batches(
+                nodes,
+                [sum(estimate_tokens(_merge_line(c)) + 1 for c in n.get("categories", [])) for n in nodes],
+                [0] * len(nodes),
+                merge_budget,
+                max_tokens,
+                max_rows=fan_in,
+            )
+            if len(nodes) > 1 and len(groups) == len(nodes):
+                print(
+                    f"Error: merge prompts would exceed --input-token-budget {input_budget}; raise it",
+                    file=sys.stderr,
+                )
+                sys.exit(1)
+            print(f"Merging {len(nodes)} taxonomies in {len(groups)} groups (level {level})...")
+
+            final = len(groups) == 1
+
+            def merge_group(group: List[Dict[str, Any]]) -> Dict[str, Any]:
+                # A lone taxonomy only needs the LLM when it is the final one
+                if len(group) == 1 and not final:
+                    return group[0]
+                suggestions = [c for n in group for c in n.get("categories", [])]
+                return merge_categories(suggestions, max_tokens=max_tokens, **llm)
+
+            nodes = _run_tree_level(
+                store,
+                level,
+                groups,
+                merge_group,
+                describe=lambda group: f"{len(group)} taxonomies",
+                concurrency=concurrency,
+                cache=cache,
+            )
+        result = nodes[0]
     else:
         # Sample mode
         sample_size = args.sample_size
@@ -262,6 +706,7 @@ def cmd_infer(args: argparse.Namespace) -> None:
             api_key=api_key,
             base_url=base_url,
             model=model,
+            cache=cache,
         )
 
     # Save result
@@ -274,24 +719,31 @@ def cmd_infer(args: argparse.Namespace) -> None:
         print(f"  - {cat['name']}: {cat.get('description', '')}")
 
     print(f"\nSaved to {out_path}")
+    if cache is not None:
+        print(f"LLM cache: {cache.summary()}")
+        cache.close()
     print("\nReview and edit the categories, then run Stage 2:")
     print(f"  python {sys.argv[0]} classify --csv {csv_path} --categories {out_path} --out writeups_classified.csv")
 
 
+def _merge_line(category: Dict[str, Any]) -> str:
+    return f"- {category.get('name', 'Unknown')}: {category.get('description', '')}"
+
+
 def merge_categories(
     batch_categories: List[Dict[str, Any]],
     *,
     api_key: str,
     base_url: str,
     model: str,
+    cache: Optional[LlmCache] = None,
+    backoff: Optional[SharedBackoff] = None,
+    max_tokens: int = 4096,
 ) -> Dict[str, Any]:
     """Merge category suggestions from multiple batches."""
     
     # Format batch categories for LLM
-    cat_text = "\n".join(
-        f"- {c.get('name', 'Unknown')}: {c.get('description', '')}"
-        for c in batch_categories
-    )
+    cat_text = "\n".join(_merge_line(c) for c in batch_categories)
     
     messages = [
         {"role": "system", "content": MERGE_CATEGORIES_PROMPT},
@@ -304,20 +756,13 @@ def merge_categories(
         base_url=base_url,
         model=model,
         temperature=0.3,
-        max_tokens=4096,
+        max_tokens=max_tokens,
+        backoff=backoff,
+        cache=cache,
+        validate=parse_json_response,
     )
-    
-    # Parse JSON from response
-    if "```json" in response:
-        start = response.find("```json") + 7
-        end = response.find("```", start)
-        response = response[start:end].strip()
-    elif "```" in response:
-        start = response.find("```") + 3
-        end = response.find("```", start)
-        response = response[start:end].strip()
-    
-    return json.loads(response)
+
+    return parse_json_response(response)
 
 
 # ---------------------------------------------------------------------------
@@ -341,6 +786,17 @@ Output format (JSON array):
 ]
 """
 
+def _classify_line(item: Dict[str, str]) -> str:
+    return f"ID={item['id']} | Title: {item['title']} | Description: {item['description']}"
+
+
+def _classify_output_tokens(item_id: str, categories: List[Dict[str, str]]) -> int:
+    """Estimated tokens of one answer object, sized for the longest category name."""
+    longest = max((c["name"] for c in categories), key=len, default="Unknown")
+    answer = json.dumps({"id": item_id, "category": longest, "confidence": "medium"}, ensure_ascii=False)
+    return estimate_tokens(answer) + 4
+
+
 def classify_batch(
     batch: List[Dict[str, str]],
     categories: List[Dict[str, str]],
@@ -348,16 +804,33 @@ def classify_batch(
     api_key: str,
     base_url: str,
     model: str,
+    backoff: Optional[SharedBackoff] = None,
+    cache: Optional[LlmCache] = None,
+    max_tokens: int = 4096,
+    stream: bool = False,
 ) -> List[Dict[str, str]]:
-    """Classify a batch of projects using LLM."""
+    """Classify a batch of projects using LLM.
+
+    With *stream*, answers are parsed one object at a time as they arrive; if the response
+    is cut short (truncated, timed out or dropped), the finished ones are kept and only the
+    remaining projects are asked for again.
+    """
+    if stream:
+        return _classify_batch_streaming(
+            batch,
+            categories,
+            api_key=api_key,
+            base_url=base_url,
+            model=model,
+            backoff=backoff,
+            cache=cache,
+            max_tokens=max_tokens,
+        )
 
     cat_list = "\n".join(f"- {c['name']}: {c.get('description', '')}" for c in categories)
     system_prompt = CLASSIFY_SYSTEM_PROMPT_TEMPLATE.format(categories=cat_list)
 
-    batch_text = "\n".join(
-        f"ID={b['id']} | Title: {b['title']} | Description: {b['description']}"
-        for b in batch
-    )
+    batch_text = "\n".join(_classify_line(b) for b in batch)
 
     messages = [
         {"role": "system", "content": system_prompt},
@@ -370,20 +843,155 @@ def classify_batch(
         base_url=base_url,
         model=model,
         temperature=0.1,
-        max_tokens=4096,
+        max_tokens=max_tokens,
+        backoff=backoff,
+        cache=cache,
+        validate=parse_json_response,
     )
 
-    # Parse JSON from response
-    if "```json" in response:
-        start = response.find("```json") + 7
-        end = response.find("```", start)
-        response = response[start:end].strip()
-    elif "```" in response:
-        start = response.find("```") + 3
-        end = response.find("```", start)
-        response = response[start:end].strip()
+    return parse_json_response(response)
+
+
+STREAM_FOLLOW_UPS = 2
 
-    return json.loads(response)
+
+def _classify_batch_streaming(
+    batch: List[Dict[str, str]],
+    categories: List[Dict[str, str]],
+    *,
+    api_key: str,
+    base_url: str,
+    model: str,
+    backoff: Optional[SharedBackoff],
+    cache: Optional[LlmCache],
+    max_tokens: int,
+) -> List[Dict[str, str]]:
+    cat_list = "\n".join(f"- {c['name']}: {c.get('description', '')}" for c in categories)
+    system_prompt = CLASSIFY_SYSTEM_PROMPT_TEMPLATE.format(categories=cat_list)
+
+    results: Dict[str, Dict[str, str]] = {}
+    remaining = list(batch)
+    for _ in range(STREAM_FOLLOW_UPS + 1):
+        wanted = {str(b["id"]) for b in remaining}
+        parser = JsonArrayStream()
+
+        def on_text(text: str) -> None:
+            for item in parser.feed(text):
+                if isinstance(item, dict) and str(item.get("id")) in wanted:
+                    results[str(item["id"])] = item
+
+        batch_text = "\n".join(_classify_line(b) for b in remaining)
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"Classify these {len(remaining)} projects:\n\n{batch_text}"},
+        ]
+        found = len(results)
+        try:
+            llm_chat(
+                messages,
+                api_key=api_key,
+                base_url=base_url,
+                model=model,
+                temperature=0.1,
+                max_tokens=max_tokens,
+                backoff=backoff,
+                cache=cache,
+                validate=parse_json_response,
+                stream=True,
+                on_text=on_text,
+            )
+        except Exception as e:
+            if not results:
+                raise
+            print(f"[llm] stream ended early ({e}); kept {len(results)} of {len(batch)} answers", file=sys.stderr)
+
+        remaining = [b for b in remaining if str(b["id"]) not in results]
+        # Stop when done, or when the model answered nothing new for the leftovers
+        if not remaining or len(results) == found:
+            break
+
+    if remaining:
+        print(f"[llm] no answer for {len(remaining)} of {len(batch)} projects in this batch", file=sys.stderr)
+    return list(results.values())
+
+
+class ClassifyJournal:
+    """Append-only JSONL of completed classify batches, so an interrupted run can ``--resume``.
+
+    The first line records a fingerprint of the categories and model; resuming against a
+    journal written for different ones is refused rather than mixing taxonomies. Failed
+    batches are not journaled and are retried on resume.
+    """
+
+    def __init__(self, path: Path, fingerprint: str) -> None:
+        self.path = path
+        self.fingerprint = fingerprint
+        self._f: Optional[Any] = None
+
+    def start(self, resume: bool, fresh: bool = False) -> Dict[str, Dict[str, str]]:
+        """Open the journal; returns results recorded by earlier runs when resuming.
+
+        A journal left by an unfinished run (a finished run deletes it) is only overwritten
+        with *fresh*, since it holds paid-for answers.
+        """
+        results: Dict[str, Dict[str, str]] = {}
+        lines: List[str] = []
+        if not resume and not fresh and self._recorded_batches() > 0:
+            raise RuntimeError(
+                f"{self.path} holds batches from an unfinished run; "
+                "pass --resume to continue from it or --fresh to discard it"
+            )
+        if resume and self.path.exists():
+            data = self.path.read_bytes()
+            # Drop a torn trailing line left by a crash mid-append.
+            keep = data.rfind(b"\n") + 1
+            lines = data[:keep].decode("utf-8").splitlines()
+            if keep != len(data):
+                with self.path.open("r+b") as f:
+                    f.truncate(keep)
+
+        if not lines:
+            self._f = self.path.open("w", encoding="utf-8")
+            self._write({"fingerprint": self.fingerprint})
+            return results
+
+        if json.loads(lines[0]).get("fingerprint") != self.fingerprint:
+            raise RuntimeError(
+                f"{self.path} was written for different categories or model; rerun without --resume to start over"
+            )
+        for line in lines[1:]:
+            results.update(json.loads(line)["results"])
+        self._f = self.path.open("a", encoding="utf-8")
+        return results
+
+    def _recorded_batches(self) -> int:
+        if not self.path.exists():
+            return 0
+        with self.path.open("rb") as f:
+            # The first line is the fingerprint header.
+            return max(0, sum(1 for line in f if line.endswith(b"\n")) - 1)
+
+    def append(self, batch_num: int, results: Dict[str, Dict[str, str]]) -> None:
+        self._write({"batch": batch_num, "results": results})
+
+    def _write(self, obj: Dict[str, Any]) -> None:
+        assert self._f is not None
+        self._f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def close(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+def _classify_item(row: Dict[str, str]) -> Dict[str, str]:
+    return {
+        "id": row.get("writeup_id", ""),
+        "title": row.get("title", ""),
+        "description": row.get("description", ""),
+    }
 
 
 def cmd_classify(args: argparse.Namespace) -> None:
@@ -400,6 +1008,8 @@ def cmd_classify(args: argparse.Namespace) -> None:
     categories_path = Path(args.categories)
     out_path = Path(args.out)
     batch_size = args.batch_size
+    cache = open_llm_cache(args.no_cache)
+    input_budget, output_budget = _token_budgets(args)
 
     # Load categories
     with categories_path.open("r", encoding="utf-8") as f:
@@ -415,49 +1025,115 @@ def cmd_classify(args: argparse.Namespace) -> None:
 
     print(f"Loaded {len(rows)} writeups from {csv_path}")
 
-    # Classify in batches
-    results = {}  # id -> {"category": ..., "confidence": ...}
-    total_batches = (len(rows) + batch_size - 1) // batch_size
-
-    for i in range(0, len(rows), batch_size):
-        batch_rows = rows[i:i + batch_size]
-        batch_num = i // batch_size + 1
-
-        batch_data = [
-            {
-                "id": r.get("writeup_id", ""),
-                "title": r.get("title", ""),
-                "description": r.get("description", ""),
-            }
-            for r in batch_rows
-        ]
+    # Every completed batch is journaled, so --resume only classifies what is left
+    journal_path = Path(args.journal) if args.journal else out_path.with_name(out_path.name + ".journal.jsonl")
+    fingerprint = hashlib.sha256(
+        json.dumps({"categories": categories, "model": model}, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    journal = ClassifyJournal(journal_path, fingerprint)
+    try:
+        results = journal.start(args.resume, fresh=args.fresh)  # id -> {"category": ..., "confidence": ...}
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    pending = [r for r in rows if r.get("writeup_id", "") not in results]
+    if args.resume:
+        print(f"Resuming from {journal_path}: {len(rows) - len(pending)} already classified, {len(pending)} left")
 
-        print(f"[{batch_num}/{total_batches}] Classifying {len(batch_data)} writeups...", end=" ", flush=True)
+    # Classify in batches packed against the input and output token budgets
+    cat_list = "\n".join(f"- {c['name']}: {c.get('description', '')}" for c in categories)
+    prompt_tokens = estimate_tokens(CLASSIFY_SYSTEM_PROMPT_TEMPLATE.format(categories=cat_list)) + 50
+
+    def plan_batches(batch_rows: List[Dict[str, str]]) -> List[List[Dict[str, str]]]:
+        return pack_batches(
+            batch_rows,
+            [estimate_tokens(_classify_line(_classify_item(r))) + 1 for r in batch_rows],
+            [_classify_output_tokens(r.get("writeup_id", ""), categories) for r in batch_rows],
+            max(1, input_budget - prompt_tokens),
+            int(output_budget * OUTPUT_TOKEN_HEADROOM),
+            max_rows=batch_size,
+        )
 
+    batches = plan_batches(pending)
+    if args.prefilter and pending:
+        # Settle the clear-cut rows offline; these are cheap to recompute, so they are not journaled
         try:
-            batch_results = classify_batch(
-                batch_data,
-                categories,
-                api_key=api_key,
-                base_url=base_url,
-                model=model,
-            )
-            for item in batch_results:
-                results[str(item["id"])] = {
-                    "category": item.get("category", "Unknown"),
-                    "confidence": item.get("confidence", "low"),
+            local = local_classify([_classify_item(r) for r in pending], categories, args.prefilter_margin)
+        except ImportError:
+            print("Error: --prefilter requires numpy (pip install numpy)", file=sys.stderr)
+            sys.exit(1)
+        results.update(local)
+        pending = [r for r in pending if r.get("writeup_id", "") not in local]
+        llm_batches = plan_batches(pending)
+        print(
+            f"Pre-classified {len(local)} writeups locally (margin >= {args.prefilter_margin}); "
+            f"{len(pending)} left for the LLM, saving {len(batches) - len(llm_batches)} of {len(batches)} calls"
+        )
+        batches = llm_batches
+    total_batches = len(batches)
+    if batches:
+        print(
+            f"Packed {len(pending)} writeups into {total_batches} batches "
+            f"(<= {input_budget} input / {output_budget} output tokens"
+            f"{f', <= {batch_size} rows' if batch_size else ''} each)"
+        )
+    concurrency = max(1, args.concurrency)
+    backoff = SharedBackoff()
+
+    def run_batch(batch_rows: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        hits = cache.hits if cache is not None else 0
+        batch_results = classify_batch(
+            [_classify_item(r) for r in batch_rows],
+            categories,
+            api_key=api_key,
+            base_url=base_url,
+            model=model,
+            cache=cache,
+            backoff=backoff,
+            max_tokens=output_budget,
+            stream=args.stream,
+        )
+        if concurrency == 1 and (cache is None or cache.hits == hits):
+            # Small delay between batches (not needed for answers from the cache)
+            time.sleep(0.5)
+        return batch_results
+
+    if concurrency > 1:
+        print(f"Classifying {total_batches} batches, {concurrency} in flight")
+
+    # The thread count bounds in-flight requests; results are keyed by id, so the output
+    # keeps the input row order whatever order batches finish in.
+    stop = threading.Event()
+    try:
+        completed = _as_completed_in_daemon_threads(run_batch, batches, concurrency, stop)
+        for done, (n, future) in enumerate(completed, 1):
+            batch_num = n + 1
+            batch_rows = batches[n]
+            prefix = f"[{done}/{total_batches}] batch {batch_num}: {len(batch_rows)} writeups"
+            try:
+                batch_results = {
+                    str(item["id"]): {
+                        "category": item.get("category", "Unknown"),
+                        "confidence": item.get("confidence", "low"),
+                    }
+                    for item in future.result()
                 }
-            print("OK")
-        except Exception as e:
-            print(f"ERROR: {e}")
-            # Mark batch as failed
-            for r in batch_rows:
-                wid = r.get("writeup_id", "")
-                if wid not in results:
-                    results[wid] = {"category": "ERROR", "confidence": "low"}
-
-        # Small delay between batches
-        time.sleep(0.5)
+                journal.append(batch_num, batch_results)
+                results.update(batch_results)
+                print(f"{prefix} OK", flush=True)
+            except Exception as e:
+                print(f"{prefix} ERROR: {e}", flush=True)
+                # Mark batch as failed
+                for r in batch_rows:
+                    wid = r.get("writeup_id", "")
+                    if wid not in results:
+                        results[wid] = {"category": "ERROR", "confidence": "low"}
+    except KeyboardInterrupt:
+        stop.set()
+        journal.close()
+        print(f"\nInterrupted; completed batches are in {journal_path}. Rerun with --resume to continue.")
+        sys.exit(130)
+    journal.close()
 
     # Write output CSV
     out_fieldnames = list(fieldnames) + ["category", "confidence"]
@@ -473,6 +1149,18 @@ def cmd_classify(args: argparse.Namespace) -> None:
 
     print(f"\nClassified {len(rows)} writeups")
     print(f"Saved to {out_path}")
+    # Once every row has an answer the journal has served its purpose; an incomplete one is
+    # kept so that --resume can retry just the missing rows.
+    unfinished = sum(
+        1 for row in rows if results.get(row.get("writeup_id", ""), {}).get("category", "ERROR") == "ERROR"
+    )
+    if unfinished:
+        print(f"{unfinished} writeups not classified; rerun with --resume to retry them from {journal_path}")
+    else:
+        journal_path.unlink(missing_ok=True)
+    if cache is not None:
+        print(f"LLM cache: {cache.summary()}")
+        cache.close()
 
     # Summary
     cat_counts = {}
@@ -493,20 +1181,105 @@ def main():
     parser = argparse.ArgumentParser(description="Classify Kaggle writeups using LLM")
     subparsers = parser.add_subparsers(dest="command", required=True)
 
+    # options shared by both commands
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--no-cache", action="store_true", help="Bypass the on-disk LLM response cache")
+    common.add_argument(
+        "--input-token-budget",
+        type=int,
+        default=0,
+        help=f"Estimated prompt tokens per call (default: $LLM_INPUT_TOKEN_BUDGET or {DEFAULT_INPUT_TOKEN_BUDGET})",
+    )
+    common.add_argument(
+        "--output-token-budget",
+        type=int,
+        default=0,
+        help=f"max_tokens per call; batches are sized to fit their answers in it "
+        f"(default: $LLM_OUTPUT_TOKEN_BUDGET or {DEFAULT_OUTPUT_TOKEN_BUDGET})",
+    )
+
     # infer command
-    infer_parser = subparsers.add_parser("infer", help="Infer categories from sample or full dataset")
+    infer_parser = subparsers.add_parser(
+        "infer", parents=[common], help="Infer categories from sample or full dataset"
+    )
     infer_parser.add_argument("--csv", required=True, help="Input CSV file")
     infer_parser.add_argument("--out", default="categories.json", help="Output categories JSON")
     infer_parser.add_argument("--sample-size", type=int, default=250, help="Sample size for inference (ignored if --all)")
     infer_parser.add_argument("--all", action="store_true", help="Process ALL writeups (batch mode)")
-    infer_parser.add_argument("--batch-size", type=int, default=300, help="Batch size for full dataset mode")
+    infer_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=0,
+        help="Max rows per batch in full dataset mode (default: 0, packed by token budget only)",
+    )
+    infer_parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Batches and merges run in parallel in full dataset mode (default: 1, sequential)",
+    )
+    infer_parser.add_argument(
+        "--merge-fan-in",
+        type=int,
+        default=8,
+        help="Max taxonomies combined by one merge call; more levels are added as needed (default: 8)",
+    )
+    infer_parser.add_argument(
+        "--work-dir",
+        help="Where full dataset mode keeps per-batch and per-merge taxonomies (default: <out>.work)",
+    )
+    infer_parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Reuse taxonomies already in --work-dir and only redo the calls that did not complete",
+    )
 
     # classify command
-    classify_parser = subparsers.add_parser("classify", help="Classify all writeups")
+    classify_parser = subparsers.add_parser("classify", parents=[common], help="Classify all writeups")
     classify_parser.add_argument("--csv", required=True, help="Input CSV file")
     classify_parser.add_argument("--categories", required=True, help="Categories JSON file")
     classify_parser.add_argument("--out", required=True, help="Output classified CSV")
-    classify_parser.add_argument("--batch-size", type=int, default=20, help="Batch size for classification")
+    classify_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=0,
+        help="Max rows per batch (default: 0, packed by token budget only)",
+    )
+    classify_parser.add_argument(
+        "--prefilter",
+        action="store_true",
+        help="Assign clear-cut writeups with a local TF-IDF classifier (needs numpy) and send only the rest to the LLM",
+    )
+    classify_parser.add_argument(
+        "--prefilter-margin",
+        type=float,
+        default=DEFAULT_MIN_MARGIN,
+        help=f"Min cosine-score lead of the best category over the runner-up to skip the LLM "
+        f"(default: {DEFAULT_MIN_MARGIN})",
+    )
+    journal_mode = classify_parser.add_mutually_exclusive_group()
+    journal_mode.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip writeups already recorded in the journal by an interrupted run",
+    )
+    journal_mode.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Discard an existing journal and classify everything again",
+    )
+    classify_parser.add_argument("--journal", help="Journal of completed batches (default: <out>.journal.jsonl)")
+    classify_parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream answers and parse them as they arrive; a cut-off response keeps its finished rows",
+    )
+    classify_parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Batches classified in parallel; a 429 on any of them pauses all (default: 1, sequential)",
+    )
 
     args = parser.parse_args()
 
@@ -1,21 +1,35 @@
 #!/usr/bin/env python3
 
 import argparse
+import asyncio
 import base64
+import bisect
+import collections
+import concurrent.futures
+import contextlib
 import csv
+import hashlib
+import http.client
 import http.cookiejar
+import http.server
 import json
+import math
+import mmap
 import os
 import random
+import sqlite3
+import ssl
+import struct
 import sys
 import threading
 import time
 import urllib.error
 import urllib.parse
 import urllib.request
-from dataclasses import dataclass
+import zlib
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
 
 
 KAGGLE_BASE_URL = "https://www.kaggle.com"
@@ -23,6 +37,38 @@ KAGGLE_BASE_URL = "https://www.kaggle.com"
 LIST_WRITEUPS_API_PATH = "/api/i/competitions.HackathonService/ListHackathonWriteUps"
 GET_WRITEUP_BY_ID_API_PATH = "/api/i/discussions.WriteUpsService/GetWriteUpById"
 
+RETRYABLE_HTTP_CODES = {403, 429, 500, 502, 503, 504}
+AUTH_FAILURE_HTTP_CODES = {401, 403}
+SESSION_REFRESH_MIN_INTERVAL_SECONDS = 30.0
+
+ENGINES = ("threads", "async")
+
+SYNC_MODES = ("full", "incremental")
+SYNC_STATE_FILENAME = "sync_state.json"
+MANIFEST_FILENAME = "manifest.sqlite3"
+LISTING_PAGES_FILENAME = "writeups_list_pages.jsonl"
+LISTING_CHECKPOINT_FILENAME = "listing_checkpoint.json"
+
+STORAGE_LAYOUTS = ("files", "packed")
+PACKED_DIRNAME = "packed"
+PACKED_INDEX_FILENAME = "index.bin"
+PACKED_SHARD_MAX_BYTES = 256 * 1024 * 1024
+PACKED_REF_PREFIX = "packed:"
+
+CSV_ROW_SPOOL_FILENAME = "writeups_csv_rows.jsonl"
+CSV_PARALLEL_MIN_ROWS = 256
+
+DURABILITY_MODES = ("none", "batch")
+DURABILITY_BATCH_SIZE = 64
+
+AIMD_INITIAL_CONCURRENCY = 2
+
+ACCEPT_ENCODING = "gzip, deflate"
+RESPONSE_READ_CHUNK_BYTES = 64 * 1024
+
+METRICS_PREFIX = "kaggle_writeups_downloader"
+LATENCY_BUCKETS_SECONDS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
 
 @dataclass(frozen=True)
 class Config:
@@ -34,27 +80,88 @@ class Config:
     request_timeout_seconds: int
     max_retries: int
     min_request_interval_seconds: float
+    burst: int
     retry_missing_passes: int
+    engine: str
+    sync: str
+    deep_verify: bool
+    storage: str
+    durability: str
+    durability_batch_size: int
+    csv_workers: int
+    adaptive_concurrency: bool
+    base_url: str
+    shard_index: int = 0
+    shard_count: int = 1
+
+
+class _TokenBucket:
+    __slots__ = ("lock", "theoretical_arrival_at")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.theoretical_arrival_at = 0.0
 
 
 class RateLimiter:
-    def __init__(self, min_interval_seconds: float) -> None:
+    """Token-bucket limiter with one bucket per endpoint and global throttling.
+
+    Each bucket refills one token every ``min_interval_seconds`` and holds up to ``burst``
+    tokens (tracked as a theoretical arrival time, GCRA style). Reserving a slot is a few
+    float operations under the bucket's own lock; callers sleep *after* releasing it, so
+    workers waiting for later slots never block others from reserving theirs.
+    :meth:`penalize` and :meth:`throttle_to` apply to every bucket; :meth:`penalize_key`
+    to one.
+    """
+
+    def __init__(self, min_interval_seconds: float, burst: int = 1) -> None:
         self._base_min_interval_seconds = float(min_interval_seconds)
         self._current_min_interval_seconds = float(min_interval_seconds)
+        self._burst = max(1, int(burst))
         self._lock = threading.Lock()
-        self._next_allowed_at = 0.0
+        self._blocked_until = 0.0
+        self._buckets: Dict[str, _TokenBucket] = {}
 
-    def wait(self) -> None:
-        if self._current_min_interval_seconds <= 0:
-            return
-        with self._lock:
+    @property
+    def current_interval_seconds(self) -> float:
+        return self._current_min_interval_seconds
+
+    @property
+    def penalty_remaining_seconds(self) -> float:
+        return max(0.0, self._blocked_until - time.monotonic())
+
+    def _bucket(self, key: str) -> _TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.setdefault(key, _TokenBucket())
+        return bucket
+
+    def reserve(self, key: str = "") -> float:
+        """Claim the next slot for *key* and return how long the caller must wait for it.
+
+        Never sleeps, so it is safe to use from an event loop.
+        """
+        interval = self._current_min_interval_seconds
+        blocked_until = self._blocked_until
+        if interval <= 0 and blocked_until <= 0 and key not in self._buckets:
+            return 0.0
+        bucket = self._bucket(key)
+        tolerance = interval * (self._burst - 1)
+        with bucket.lock:
             now = time.monotonic()
-            if now < self._next_allowed_at:
-                time.sleep(self._next_allowed_at - now)
-            self._next_allowed_at = time.monotonic() + self._current_min_interval_seconds
+            tat = max(bucket.theoretical_arrival_at, now, blocked_until)
+            slot = max(now, blocked_until, tat - tolerance)
+            bucket.theoretical_arrival_at = tat + interval
+        return slot - now
+
+    def wait(self, key: str = "") -> None:
+        delay = self.reserve(key)
+        if delay > 0:
+            time.sleep(delay)
 
     def penalize(self, extra_delay_seconds: float) -> None:
-        """Push out the next allowed time for *all* threads.
+        """Push out the next allowed time for *all* threads and endpoints.
 
         Useful for server-driven throttling (e.g. HTTP 429).
         """
@@ -62,8 +169,20 @@ class RateLimiter:
         if extra <= 0:
             return
         with self._lock:
-            now = time.monotonic()
-            self._next_allowed_at = max(self._next_allowed_at, now + extra)
+            self._blocked_until = max(self._blocked_until, time.monotonic() + extra)
+
+    def penalize_key(self, key: str, extra_delay_seconds: float) -> None:
+        """Push out the next allowed time for *key* only, leaving other endpoints alone."""
+        extra = float(extra_delay_seconds)
+        if extra <= 0:
+            return
+        bucket = self._bucket(key)
+        # reserve() lets a full bucket start up to the burst tolerance early; cover that too.
+        tolerance = self._current_min_interval_seconds * (self._burst - 1)
+        with bucket.lock:
+            bucket.theoretical_arrival_at = max(
+                bucket.theoretical_arrival_at, time.monotonic() + extra + tolerance
+            )
 
     def throttle_to(self, min_interval_seconds: float) -> None:
         """Dynamically increase the minimum interval (never below the base)."""
@@ -73,16 +192,484 @@ class RateLimiter:
 
     def on_success(self) -> None:
         """Gradually decay dynamic throttling back toward the base interval."""
+        if self._current_min_interval_seconds <= self._base_min_interval_seconds:
+            return
         with self._lock:
-            if self._current_min_interval_seconds <= self._base_min_interval_seconds:
-                self._current_min_interval_seconds = self._base_min_interval_seconds
-                return
             # Decay by 10% per successful request.
             self._current_min_interval_seconds = max(
                 self._base_min_interval_seconds, self._current_min_interval_seconds * 0.9
             )
 
 
+class AimdConcurrencyController:
+    """Additive-increase/multiplicative-decrease limit on in-flight detail requests.
+
+    The limit grows by one after each window of ``limit`` healthy successes and is cut by
+    ``decrease_factor`` on HTTP 429/5xx. Latency above ``latency_tolerance`` times the best
+    smoothed latency seen so far, or any other request error, pauses growth. ``--threads``
+    becomes a ceiling rather than a fixed setting.
+    """
+
+    def __init__(
+        self,
+        ceiling: int,
+        initial: int = AIMD_INITIAL_CONCURRENCY,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 2.0,
+    ) -> None:
+        self._ceiling = max(1, int(ceiling))
+        self._limit = float(max(1, min(int(initial), self._ceiling)))
+        self._decrease_factor = float(decrease_factor)
+        self._latency_tolerance = float(latency_tolerance)
+        self._cond = threading.Condition()
+        # Futures of coroutines waiting in acquire_async(), resolved on their own loop.
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, "asyncio.Future[None]"]] = []
+        self._in_flight = 0
+        self._healthy_in_window = 0
+        self._latency_ewma: Optional[float] = None
+        self._best_latency_ewma: Optional[float] = None
+        self._last_decrease_at = 0.0
+        self._start_ts = time.monotonic()
+        self._min_limit = self.limit
+        self._max_limit = self.limit
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            self._in_flight += 1
+
+    async def acquire_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._in_flight < int(self._limit):
+                    self._in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            await waiter
+
+    def release(self, latency_seconds: float, outcome: str) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            if outcome == "ok":
+                self._on_success(latency_seconds)
+            elif outcome == "throttled":
+                self._on_throttled()
+            else:
+                self._healthy_in_window = 0
+            waiters = self._notify_locked()
+        self._wake(waiters)
+
+    def abandon(self) -> None:
+        """Give back a slot that was acquired but never used for a request."""
+        with self._cond:
+            self._in_flight -= 1
+            waiters = self._notify_locked()
+        self._wake(waiters)
+
+    def _notify_locked(self) -> List[Tuple[asyncio.AbstractEventLoop, "asyncio.Future[None]"]]:
+        self._cond.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        return waiters
+
+    @staticmethod
+    def _wake(waiters: List[Tuple[asyncio.AbstractEventLoop, "asyncio.Future[None]"]]) -> None:
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_resolve_waiter, waiter)
+
+    def _on_success(self, latency_seconds: float) -> None:
+        if self._latency_ewma is None:
+            self._latency_ewma = latency_seconds
+        else:
+            self._latency_ewma = 0.8 * self._latency_ewma + 0.2 * latency_seconds
+        if self._best_latency_ewma is None or self._latency_ewma < self._best_latency_ewma:
+            self._best_latency_ewma = self._latency_ewma
+
+        if self._latency_ewma > self._best_latency_ewma * self._latency_tolerance:
+            self._healthy_in_window = 0
+            return
+
+        self._healthy_in_window += 1
+        if self._healthy_in_window >= int(self._limit) and self._limit < self._ceiling:
+            self._healthy_in_window = 0
+            self._set_limit(self._limit + 1, "increase")
+
+    def _on_throttled(self) -> None:
+        self._healthy_in_window = 0
+        now = time.monotonic()
+        # Requests already in flight were sent under the old limit; cut once per round trip.
+        if now - self._last_decrease_at < max(0.5, self._latency_ewma or 0.0):
+            return
+        self._last_decrease_at = now
+        self._set_limit(max(1.0, float(int(self._limit * self._decrease_factor))), "decrease")
+
+    def _set_limit(self, new_limit: float, reason: str) -> None:
+        if int(new_limit) == int(self._limit):
+            return
+        self._limit = new_limit
+        self._min_limit = min(self._min_limit, self.limit)
+        self._max_limit = max(self._max_limit, self.limit)
+        latency_ms = (self._latency_ewma or 0.0) * 1000.0
+        sys.stderr.write(
+            f"[concurrency] t={time.monotonic() - self._start_ts:.1f}s limit={self.limit} "
+            f"({reason}) in_flight={self._in_flight} latency_ewma={latency_ms:.0f}ms\n"
+        )
+        sys.stderr.flush()
+
+    def summary(self) -> str:
+        return f"final={self.limit} min={self._min_limit} max={self._max_limit} ceiling={self._ceiling}"
+
+
+def _resolve_waiter(waiter: "asyncio.Future[None]") -> None:
+    if not waiter.done():  # cancelled while waiting
+        waiter.set_result(None)
+
+
+def _aimd_outcome(exc: Optional[BaseException]) -> str:
+    if exc is None:
+        return "ok"
+    code = int(getattr(exc, "code", 0) or 0)
+    if code == 429 or code >= 500:
+        return "throttled"
+    return "error"
+
+
+def _endpoint_name(api_path: str) -> str:
+    return api_path.rsplit("/", 1)[-1]
+
+
+def _percentile(sorted_values: Sequence[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile.
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class _ResponseDecoder:
+    """Incrementally decode an identity/gzip/deflate response body as chunks arrive.
+
+    Compressed input is inflated chunk by chunk rather than buffered whole; ``wire_bytes``
+    counts what actually came over the connection.
+    """
+
+    def __init__(self, content_encoding: str) -> None:
+        encoding = content_encoding.strip().lower()
+        self._inflater: Any = None
+        self._raw_deflate_fallback = False
+        if encoding in {"gzip", "x-gzip"}:
+            self._inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == "deflate":
+            # RFC 9110 deflate is zlib-wrapped, but some servers send a bare deflate stream.
+            self._inflater = zlib.decompressobj(zlib.MAX_WBITS)
+            self._raw_deflate_fallback = True
+        elif encoding not in {"", "identity"}:
+            raise RuntimeError(f"Unsupported Content-Encoding: {content_encoding}")
+        self._parts: List[bytes] = []
+        self.wire_bytes = 0
+
+    def feed(self, chunk: bytes) -> None:
+        first = self.wire_bytes == 0
+        self.wire_bytes += len(chunk)
+        if self._inflater is None:
+            self._parts.append(chunk)
+            return
+        try:
+            self._parts.append(self._inflater.decompress(chunk))
+        except zlib.error:
+            if not (first and self._raw_deflate_fallback):
+                raise
+            self._inflater = zlib.decompressobj(-zlib.MAX_WBITS)
+            self._parts.append(self._inflater.decompress(chunk))
+        self._raw_deflate_fallback = False
+
+    def finish(self) -> bytes:
+        if self._inflater is not None:
+            self._parts.append(self._inflater.flush())
+            if not self._inflater.eof:
+                raise RuntimeError("Truncated compressed response body")
+        return b"".join(self._parts)
+
+
+class RequestStats:
+    """Latency, HTTP status and retry counts of every API request, per endpoint path.
+
+    Latency covers the HTTP exchange only, not time spent waiting on the rate limiter or for
+    a concurrency slot. Network errors are recorded with status 0. Body sizes of successful
+    responses are kept both as received (``wire``) and after content decoding.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, List[float]] = collections.defaultdict(list)
+        self._latency_buckets: Dict[str, List[int]] = collections.defaultdict(
+            lambda: [0] * (len(LATENCY_BUCKETS_SECONDS) + 1)
+        )
+        self._statuses: Dict[Tuple[str, int], int] = collections.Counter()
+        self._retries: Dict[str, int] = collections.Counter()
+        self._in_flight: Dict[str, int] = collections.Counter()
+        self._wire_bytes: Dict[str, int] = collections.Counter()
+        self._decoded_bytes: Dict[str, int] = collections.Counter()
+
+    def begin(self, api_path: str) -> None:
+        with self._lock:
+            self._in_flight[api_path] += 1
+
+    def observe(self, api_path: str, status: int, latency_seconds: float) -> None:
+        """Record a finished request; pairs with :meth:`begin`."""
+        with self._lock:
+            self._in_flight[api_path] -= 1
+            self._latencies[api_path].append(latency_seconds)
+            self._latency_buckets[api_path][bisect.bisect_left(LATENCY_BUCKETS_SECONDS, latency_seconds)] += 1
+            self._statuses[(api_path, status)] += 1
+
+    def retried(self, api_path: str) -> None:
+        with self._lock:
+            self._retries[api_path] += 1
+
+    def add_bytes(self, api_path: str, wire_bytes: int, decoded_bytes: int) -> None:
+        with self._lock:
+            self._wire_bytes[api_path] += wire_bytes
+            self._decoded_bytes[api_path] += decoded_bytes
+
+    def byte_counts(self) -> Dict[str, Tuple[int, int]]:
+        """Return api path -> (wire bytes, decoded bytes)."""
+        with self._lock:
+            return {path: (n, self._decoded_bytes[path]) for path, n in sorted(self._wire_bytes.items())}
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(v for values in self._latencies.values() for v in values)
+            statuses = collections.Counter()
+            for (_path, status), n in self._statuses.items():
+                statuses[status] += n
+            retries = sum(self._retries.values())
+        return {
+            "requests": len(latencies),
+            "retries": retries,
+            "throttled": statuses.get(429, 0),
+            "errors": sum(n for status, n in statuses.items() if status == 0 or status >= 400),
+            "p50_ms": _percentile(latencies, 0.50) * 1000.0,
+            "p99_ms": _percentile(latencies, 0.99) * 1000.0,
+        }
+
+    def summary(self) -> str:
+        s = self.snapshot()
+        return (
+            f"total={s['requests']} retries={s['retries']} throttled={s['throttled']} "
+            f"errors={s['errors']} p50_ms={s['p50_ms']:.1f} p99_ms={s['p99_ms']:.1f}"
+        )
+
+    def bytes_summary_lines(self) -> List[str]:
+        lines: List[str] = []
+        for path, (wire, decoded) in self.byte_counts().items():
+            saved = 1.0 - wire / decoded if decoded else 0.0
+            lines.append(f"endpoint={_endpoint_name(path)} wire={wire} decoded={decoded} saved={saved:.1%}")
+        return lines
+
+    def prometheus_lines(self) -> List[str]:
+        """Request metrics in the Prometheus text exposition format, labelled by endpoint."""
+        with self._lock:
+            buckets = {path: list(counts) for path, counts in self._latency_buckets.items()}
+            sums = {path: sum(values) for path, values in self._latencies.items()}
+            statuses = dict(self._statuses)
+            retries = dict(self._retries)
+            in_flight = dict(self._in_flight)
+            wire_bytes = dict(self._wire_bytes)
+            decoded_bytes = dict(self._decoded_bytes)
+
+        p = METRICS_PREFIX
+        lines = [
+            f"# HELP {p}_request_duration_seconds API request latency (HTTP exchange only).",
+            f"# TYPE {p}_request_duration_seconds histogram",
+        ]
+        for path, counts in sorted(buckets.items()):
+            label = f'endpoint="{_endpoint_name(path)}"'
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS_SECONDS, counts):
+                cumulative += n
+                lines.append(f'{p}_request_duration_seconds_bucket{{{label},le="{bound:g}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{p}_request_duration_seconds_bucket{{{label},le="+Inf"}} {cumulative}')
+            lines.append(f"{p}_request_duration_seconds_sum{{{label}}} {sums.get(path, 0.0):.6f}")
+            lines.append(f"{p}_request_duration_seconds_count{{{label}}} {cumulative}")
+
+        lines += [
+            f"# HELP {p}_responses_total API responses by HTTP status (0 = network error; 429 = throttled).",
+            f"# TYPE {p}_responses_total counter",
+        ]
+        for (path, status), n in sorted(statuses.items()):
+            lines.append(f'{p}_responses_total{{endpoint="{_endpoint_name(path)}",status="{status}"}} {n}')
+
+        lines += [
+            f"# HELP {p}_throttled_total API responses with HTTP 429.",
+            f"# TYPE {p}_throttled_total counter",
+        ]
+        for path in sorted(buckets):
+            lines.append(f'{p}_throttled_total{{endpoint="{_endpoint_name(path)}"}} {statuses.get((path, 429), 0)}')
+
+        lines += [f"# HELP {p}_retries_total API requests retried.", f"# TYPE {p}_retries_total counter"]
+        for path, n in sorted(retries.items()):
+            lines.append(f'{p}_retries_total{{endpoint="{_endpoint_name(path)}"}} {n}')
+
+        lines += [f"# HELP {p}_in_flight_requests API requests awaiting a response.", f"# TYPE {p}_in_flight_requests gauge"]
+        for path, n in sorted(in_flight.items()):
+            lines.append(f'{p}_in_flight_requests{{endpoint="{_endpoint_name(path)}"}} {n}')
+
+        lines += [
+            f"# HELP {p}_response_bytes_total Response body bytes, as received (wire) and decoded.",
+            f"# TYPE {p}_response_bytes_total counter",
+        ]
+        for path, n in sorted(wire_bytes.items()):
+            label = f'endpoint="{_endpoint_name(path)}"'
+            lines.append(f'{p}_response_bytes_total{{{label},form="wire"}} {n}')
+            lines.append(f'{p}_response_bytes_total{{{label},form="decoded"}} {decoded_bytes.get(path, 0)}')
+        return lines
+
+
+class _RequestSlot:
+    """Time one HTTP exchange: hold a slot of an optional concurrency controller, then wait
+    for the rate limiter, and record the outcome in optional request stats.
+
+    The rate slot is reserved only once a concurrency slot is held; reserving it first would
+    let requests queued on the controller burn their rate slots and undershoot the limit.
+    """
+
+    def __init__(
+        self,
+        controller: Optional[AimdConcurrencyController],
+        stats: Optional[RequestStats] = None,
+        api_path: str = "",
+        rate_limiter: Optional[RateLimiter] = None,
+    ) -> None:
+        self._controller = controller
+        self._stats = stats
+        self._api_path = api_path
+        self._rate_limiter = rate_limiter
+        self._started = 0.0
+
+    def __enter__(self) -> "_RequestSlot":
+        if self._controller is not None:
+            self._controller.acquire()
+        if self._rate_limiter is not None:
+            try:
+                self._rate_limiter.wait(self._api_path)
+            except BaseException:
+                self._abandon()
+                raise
+        self._begin()
+        return self
+
+    def _abandon(self) -> None:
+        if self._controller is not None:
+            self._controller.abandon()
+
+    def _begin(self) -> None:
+        if self._stats is not None:
+            self._stats.begin(self._api_path)
+        self._started = time.monotonic()
+
+    def __exit__(self, exc_type: Any, exc: Optional[BaseException], tb: Any) -> None:
+        latency_seconds = time.monotonic() - self._started
+        if self._controller is not None:
+            self._controller.release(latency_seconds, _aimd_outcome(exc))
+        if self._stats is not None:
+            status = 200 if exc is None else int(getattr(exc, "code", 0) or 0)
+            self._stats.observe(self._api_path, status, latency_seconds)
+
+    async def __aenter__(self) -> "_RequestSlot":
+        if self._controller is not None:
+            await self._controller.acquire_async()
+        if self._rate_limiter is not None:
+            delay = self._rate_limiter.reserve(self._api_path)
+            if delay > 0:
+                try:
+                    await asyncio.sleep(delay)
+                except BaseException:
+                    self._abandon()
+                    raise
+        self._begin()
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc: Optional[BaseException], tb: Any) -> None:
+        self.__exit__(exc_type, exc, tb)
+
+
+def _render_metrics(
+    stats: RequestStats,
+    rate_limiter: RateLimiter,
+    concurrency: Optional[AimdConcurrencyController],
+) -> str:
+    p = METRICS_PREFIX
+    lines = stats.prometheus_lines()
+    lines += [
+        f"# HELP {p}_rate_limit_interval_seconds Current minimum interval between requests per endpoint.",
+        f"# TYPE {p}_rate_limit_interval_seconds gauge",
+        f"{p}_rate_limit_interval_seconds {rate_limiter.current_interval_seconds:.6f}",
+        f"# HELP {p}_rate_limit_penalty_seconds Time left on the global 429 penalty.",
+        f"# TYPE {p}_rate_limit_penalty_seconds gauge",
+        f"{p}_rate_limit_penalty_seconds {rate_limiter.penalty_remaining_seconds:.6f}",
+    ]
+    if concurrency is not None:
+        lines += [
+            f"# HELP {p}_concurrency_limit AIMD limit on in-flight detail requests.",
+            f"# TYPE {p}_concurrency_limit gauge",
+            f"{p}_concurrency_limit {concurrency.limit}",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serve ``GET /metrics`` in the Prometheus text format from a daemon thread.
+
+    ``render`` is called on every scrape, so the output always reflects live state.
+    """
+
+    def __init__(self, host: str, port: int, render: Callable[[], str]) -> None:
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                try:
+                    body = render().encode("utf-8")
+                except Exception as e:
+                    self.send_error(500, explain=str(e))
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._httpd = http.server.ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
 def _decode_kaggle_client_build_version(client_token: str) -> str:
     try:
         parts = client_token.split(".")
@@ -96,33 +683,58 @@ def _decode_kaggle_client_build_version(client_token: str) -> str:
         return ""
 
 
-def _atomic_write_text(path: Path, text: str) -> None:
+def _atomic_write_bytes(path: Path, data: bytes) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     tmp_path = path.with_suffix(path.suffix + ".tmp")
-    tmp_path.write_text(text, encoding="utf-8")
+    tmp_path.write_bytes(data)
     os.replace(tmp_path, path)
 
 
-def _atomic_write_json(path: Path, obj: Any) -> None:
+def _atomic_write_text(path: Path, text: str) -> None:
+    _atomic_write_bytes(path, text.encode("utf-8"))
+
+
+def _fsync_paths(paths: Iterable[Path]) -> None:
+    """fsync each file, then each distinct parent directory once (making the renames durable)."""
+    dirs: Set[Path] = set()
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            continue
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        dirs.add(path.parent)
+    for directory in dirs:
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def atomic_write_json(path: Path, obj: Any) -> None:
     _atomic_write_text(path, json.dumps(obj, ensure_ascii=False, indent=2))
 
 
-def _read_json(path: Path) -> Any:
+def read_json_file(path: Path) -> Any:
     return json.loads(path.read_text(encoding="utf-8"))
 
 
-def _is_valid_json_file(path: Path) -> bool:
+def is_valid_json_file(path: Path) -> bool:
     if not path.exists():
         return False
     try:
-        _read_json(path)
+        read_json_file(path)
         return True
     except Exception:
         return False
 
 
-def _bootstrap_headers(competition_slug: str, request_timeout_seconds: int) -> Dict[str, str]:
-    list_url = f"{KAGGLE_BASE_URL}/competitions/{competition_slug}/writeups"
+def _bootstrap_headers(base_url: str, competition_slug: str, request_timeout_seconds: int) -> Dict[str, str]:
+    list_url = f"{base_url}/competitions/{competition_slug}/writeups"
 
     cj = http.cookiejar.CookieJar()
     opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(cj))
@@ -140,6 +752,7 @@ def _bootstrap_headers(competition_slug: str, request_timeout_seconds: int) -> D
         "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) KaggleWriteupsDownloader/1.0",
         "Content-Type": "application/json",
         "Accept": "application/json",
+        "Accept-Encoding": ACCEPT_ENCODING,
     }
     if cookie_header:
         headers["Cookie"] = cookie_header
@@ -151,54 +764,243 @@ def _bootstrap_headers(competition_slug: str, request_timeout_seconds: int) -> D
     return headers
 
 
+class KaggleSession:
+    """Bootstrap headers (cookies, XSRF token, build version) shared by every worker of a
+    competition, re-bootstrapped when the session expires.
+
+    Requests take :meth:`current` before sending and, on HTTP 401/403, call :meth:`refresh`
+    with the generation they used. Only the first caller for a generation re-bootstraps;
+    concurrent callers wait on the lock and then retry with the new headers. A generation is
+    only replaced once it has served a successful request (see :meth:`mark_ok`) or is older
+    than ``min_refresh_interval_seconds``: a 403 on cookies that never worked is not an
+    expiry, so it falls back to the normal retry backoff instead of re-bootstrapping in a loop.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        competition_slug: str,
+        request_timeout_seconds: int,
+        min_refresh_interval_seconds: float = SESSION_REFRESH_MIN_INTERVAL_SECONDS,
+    ) -> None:
+        self._base_url = base_url
+        self._competition_slug = competition_slug
+        self._request_timeout_seconds = request_timeout_seconds
+        self._min_refresh_interval_seconds = float(min_refresh_interval_seconds)
+        self._lock = threading.Lock()
+        self._state = (0, _bootstrap_headers(base_url, competition_slug, request_timeout_seconds))
+        self._refreshed_at = time.monotonic()
+        self._ok_generation = -1
+        self.refreshes = 0
+
+    def current(self) -> Tuple[int, Dict[str, str]]:
+        """Return ``(generation, headers)``; the pair is swapped atomically on refresh."""
+        return self._state
+
+    def mark_ok(self, generation: int) -> None:
+        self._ok_generation = generation
+
+    def refresh(self, stale_generation: int) -> bool:
+        """Re-bootstrap unless someone already has; True when newer headers are available."""
+        with self._lock:
+            generation = self._state[0]
+            if generation != stale_generation:
+                return True
+            young = time.monotonic() - self._refreshed_at < self._min_refresh_interval_seconds
+            if young and self._ok_generation != generation:
+                return False
+            try:
+                headers = _bootstrap_headers(self._base_url, self._competition_slug, self._request_timeout_seconds)
+            except Exception as e:
+                sys.stderr.write(f"[session] {self._competition_slug}: re-bootstrap failed: {e}\n")
+                sys.stderr.flush()
+                return False
+            self._state = (generation + 1, headers)
+            self._refreshed_at = time.monotonic()
+            self.refreshes += 1
+            sys.stderr.write(f"[session] {self._competition_slug}: re-bootstrapped after auth failure (#{self.refreshes})\n")
+            sys.stderr.flush()
+            return True
+
+
+def http_retry_sleep_seconds(
+    code: int,
+    response_headers: Any,
+    attempt: int,
+    rate_limiter: Optional[RateLimiter] = None,
+) -> float:
+    """Seconds to wait before retrying an HTTP error.
+
+    A 429 with Retry-After also slows every thread down through *rate_limiter*; pass None
+    to only compute the delay.
+    """
+    retry_after_seconds = 0.0
+    try:
+        if code == 429 and response_headers is not None:
+            ra = response_headers.get("Retry-After")
+            if ra:
+                retry_after_seconds = float(ra)
+    except Exception:
+        retry_after_seconds = 0.0
+
+    if code == 429 and retry_after_seconds > 0:
+        # If we keep getting throttled even after Retry-After, back off more aggressively.
+        # This helps escape "penalty box" windows where 429 persists.
+        base = retry_after_seconds
+        sleep_seconds = min(600.0, base * (2 ** (attempt - 1)) + random.random())
+        # Ensure all threads slow down consistently.
+        if rate_limiter is not None:
+            rate_limiter.throttle_to(sleep_seconds)
+            rate_limiter.penalize(sleep_seconds)
+        return sleep_seconds
+
+    return min(
+        120.0,
+        max(retry_after_seconds, 0.8 * (2 ** (attempt - 1)) + random.random()),
+    )
+
+
+def error_retry_sleep_seconds(attempt: int) -> float:
+    return min(120.0, 0.8 * (2 ** (attempt - 1)) + random.random())
+
+
+def _read_response_body(resp: Any) -> Tuple[bytes, int]:
+    """Read and decode a urllib response in chunks; returns (decoded body, wire bytes)."""
+    decoder = _ResponseDecoder(resp.headers.get("Content-Encoding", ""))
+    while True:
+        chunk = resp.read(RESPONSE_READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        decoder.feed(chunk)
+    return decoder.finish(), decoder.wire_bytes
+
+
+def _log_session_retry(
+    api_path: str, attempt: int, max_retries: int, code: int, stats: Optional[RequestStats]
+) -> None:
+    if stats is not None:
+        stats.retried(api_path)
+    sys.stderr.write(f"[retry] {api_path} attempt={attempt}/{max_retries} http={code} session=refreshed\n")
+    sys.stderr.flush()
+
+
+class HttpConnectionPool:
+    """Thread-safe keep-alive ``http.client`` connections to one origin for the threads engine.
+
+    One pool serves every worker of a download run, and so every competition sharing it;
+    at most ``max_idle`` connections are kept open between requests.
+    """
+
+    def __init__(self, base_url: str, max_idle: int, request_timeout_seconds: int) -> None:
+        parsed = urllib.parse.urlsplit(base_url)
+        self.base_url = base_url
+        self._https = (parsed.scheme or "https") == "https"
+        self._host = parsed.hostname or ""
+        self._port = parsed.port
+        self._ssl_context = ssl.create_default_context() if self._https else None
+        self._request_timeout_seconds = request_timeout_seconds
+        self._max_idle = max(1, int(max_idle))
+        self._lock = threading.Lock()
+        self._idle: List[http.client.HTTPConnection] = []
+
+    def _open(self) -> http.client.HTTPConnection:
+        if self._https:
+            return http.client.HTTPSConnection(
+                self._host, self._port, timeout=self._request_timeout_seconds, context=self._ssl_context
+            )
+        return http.client.HTTPConnection(self._host, self._port, timeout=self._request_timeout_seconds)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def request(
+        self, method: str, path: str, body: bytes, headers: Dict[str, str]
+    ) -> Tuple[int, Any, bytes, int]:
+        """Send one request; returns (status, headers, decoded body, body bytes on the wire)."""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        reused = conn is not None
+        if conn is None:
+            conn = self._open()
+        try:
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                resp = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionError, http.client.BadStatusLine):
+                conn.close()
+                if not reused:
+                    raise
+                # The server may have dropped an idle keep-alive connection; retry once on a fresh one.
+                conn = self._open()
+                conn.request(method, path, body=body, headers=headers)
+                resp = conn.getresponse()
+            raw, wire_bytes = _read_response_body(resp)
+        except BaseException:
+            conn.close()
+            raise
+
+        if resp.will_close:
+            conn.close()
+        else:
+            with self._lock:
+                if len(self._idle) < self._max_idle:
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+        return resp.status, resp.headers, raw, wire_bytes
+
+
 def _api_post_json(
+    base_url: str,
     api_path: str,
     payload: Dict[str, Any],
-    headers: Dict[str, str],
+    session: KaggleSession,
     request_timeout_seconds: int,
     max_retries: int,
     rate_limiter: RateLimiter,
+    concurrency: Optional[AimdConcurrencyController] = None,
+    stats: Optional[RequestStats] = None,
+    pool: Optional[HttpConnectionPool] = None,
 ) -> Any:
-    url = f"{KAGGLE_BASE_URL}{api_path}"
+    url = f"{base_url}{api_path}"
     body = json.dumps(payload).encode("utf-8")
 
     last_error: Optional[BaseException] = None
     for attempt in range(1, max_retries + 1):
-        rate_limiter.wait()
+        generation, headers = session.current()
         try:
-            req = urllib.request.Request(url, data=body, headers=headers, method="POST")
-            with urllib.request.urlopen(req, timeout=request_timeout_seconds) as resp:
-                data = json.loads(resp.read())
-                rate_limiter.on_success()
-                return data
+            with _RequestSlot(concurrency, stats, api_path, rate_limiter):
+                if pool is not None:
+                    status, resp_headers, raw, wire_bytes = pool.request("POST", api_path, body, headers)
+                    if status >= 400:
+                        raise urllib.error.HTTPError(url, status, f"HTTP {status}", resp_headers, None)
+                else:
+                    req = urllib.request.Request(url, data=body, headers=headers, method="POST")
+                    with urllib.request.urlopen(req, timeout=request_timeout_seconds) as resp:
+                        raw, wire_bytes = _read_response_body(resp)
+                data = json.loads(raw)
+            if stats is not None:
+                stats.add_bytes(api_path, wire_bytes, len(raw))
+            session.mark_ok(generation)
+            rate_limiter.on_success()
+            return data
         except urllib.error.HTTPError as e:
             last_error = e
             code = int(getattr(e, "code", 0) or 0)
-            retryable = code in {403, 429, 500, 502, 503, 504}
-            if not retryable:
+            if code in AUTH_FAILURE_HTTP_CODES and session.refresh(generation):
+                _log_session_retry(api_path, attempt, max_retries, code, stats)
+                continue
+            if code not in RETRYABLE_HTTP_CODES:
                 raise
-            retry_after_seconds = 0.0
-            try:
-                if code == 429 and getattr(e, "headers", None) is not None:
-                    ra = e.headers.get("Retry-After")
-                    if ra:
-                        retry_after_seconds = float(ra)
-            except Exception:
-                retry_after_seconds = 0.0
-
-            if code == 429 and retry_after_seconds > 0:
-                # If we keep getting throttled even after Retry-After, back off more aggressively.
-                # This helps escape "penalty box" windows where 429 persists.
-                base = retry_after_seconds
-                sleep_seconds = min(600.0, base * (2 ** (attempt - 1)) + random.random())
-                # Ensure all threads slow down consistently.
-                rate_limiter.throttle_to(sleep_seconds)
-                rate_limiter.penalize(sleep_seconds)
-            else:
-                sleep_seconds = min(
-                    120.0,
-                    max(retry_after_seconds, 0.8 * (2 ** (attempt - 1)) + random.random()),
-                )
+            sleep_seconds = http_retry_sleep_seconds(
+                code, getattr(e, "headers", None), attempt, rate_limiter
+            )
+            if stats is not None:
+                stats.retried(api_path)
             sys.stderr.write(
                 f"[retry] {api_path} attempt={attempt}/{max_retries} http={code} "
                 f"sleep={sleep_seconds:.1f}s\n"
@@ -207,7 +1009,9 @@ def _api_post_json(
             time.sleep(sleep_seconds)
         except Exception as e:
             last_error = e
-            sleep_seconds = min(120.0, 0.8 * (2 ** (attempt - 1)) + random.random())
+            sleep_seconds = error_retry_sleep_seconds(attempt)
+            if stats is not None:
+                stats.retried(api_path)
             sys.stderr.write(
                 f"[retry] {api_path} attempt={attempt}/{max_retries} err={type(e).__name__} "
                 f"sleep={sleep_seconds:.1f}s\n"
@@ -218,18 +1022,21 @@ def _api_post_json(
     raise RuntimeError(f"API request failed after {max_retries} attempts: {url}") from last_error
 
 
-def _list_all_writeups(
+def _iter_writeup_pages(
     competition_id: int,
     page_size: int,
-    headers: Dict[str, str],
+    session: KaggleSession,
     request_timeout_seconds: int,
     max_retries: int,
     rate_limiter: RateLimiter,
-) -> Tuple[int, List[Dict[str, Any]]]:
-    page_token: Optional[str] = None
-    total_count: Optional[int] = None
-    items: List[Dict[str, Any]] = []
-
+    page_token: Optional[str] = None,
+    base_url: str = KAGGLE_BASE_URL,
+    stats: Optional[RequestStats] = None,
+) -> Iterator[Tuple[int, List[Dict[str, Any]], Optional[str]]]:
+    """Yield ``(totalCount, items, nextPageToken)`` for each listing page, starting at *page_token*.
+
+    Only the current page is held; ``nextPageToken`` is None on the last page.
+    """
     while True:
         payload: Dict[str, Any] = {
             "competitionId": competition_id,
@@ -239,27 +1046,140 @@ def _list_all_writeups(
             payload["pageToken"] = page_token
 
         data = _api_post_json(
+            base_url,
             LIST_WRITEUPS_API_PATH,
             payload,
-            headers,
+            session,
             request_timeout_seconds,
             max_retries,
             rate_limiter,
+            stats=stats,
         )
 
-        if total_count is None:
-            total_count = int(data.get("totalCount") or 0)
-
         batch = data.get("hackathonWriteUps") or []
         if not isinstance(batch, list):
             raise RuntimeError("Unexpected response format: hackathonWriteUps is not a list")
 
-        items.extend(batch)
-        page_token = data.get("nextPageToken")
+        page_token = data.get("nextPageToken") or None
+        yield int(data.get("totalCount") or 0), batch, page_token
         if not page_token:
-            break
+            return
+
 
-    return int(total_count or 0), items
+class ListingCheckpoint:
+    """Append-only JSONL spool of listing pages plus the page token to resume from.
+
+    Every page is appended to ``writeups_list_pages.jsonl`` and fsync'ed, then
+    ``listing_checkpoint.json`` records the spool length known to be good and the
+    ``nextPageToken`` to request next. A restarted run truncates the spool to that length,
+    replays the stored pages and continues from the token. Once the last page is stored the
+    checkpoint is marked complete and the next run lists from scratch.
+    """
+
+    def __init__(self, out_dir: Path, competition_id: int, page_size: int) -> None:
+        self.pages_path = out_dir / LISTING_PAGES_FILENAME
+        self.state_path = out_dir / LISTING_CHECKPOINT_FILENAME
+        self.competition_id = int(competition_id)
+        self.page_size = int(page_size)
+        self.next_page_token: Optional[str] = None
+        self.total_count = 0
+        self.pages = 0
+        self.items = 0
+        self.complete = False
+        self._spool_bytes = 0
+        self._fh: Optional[Any] = None
+
+    def open(self) -> bool:
+        """Open the spool for appending; returns True when resuming an interrupted listing."""
+        state: Dict[str, Any] = {}
+        if is_valid_json_file(self.state_path):
+            state = read_json_file(self.state_path)
+        resume = (
+            int(state.get("competition_id") or 0) == self.competition_id
+            and int(state.get("page_size") or 0) == self.page_size
+            and not state.get("complete")
+            and bool(state.get("next_page_token"))
+            and self.pages_path.exists()
+            and self.pages_path.stat().st_size >= int(state.get("spool_bytes") or 0)
+        )
+        if resume:
+            self.next_page_token = str(state["next_page_token"])
+            self.total_count = int(state.get("total_count") or 0)
+            self.pages = int(state.get("pages") or 0)
+            self.items = int(state.get("items") or 0)
+            self._spool_bytes = int(state.get("spool_bytes") or 0)
+            self._fh = self.pages_path.open("r+b")
+            # Drop a page that was appended but never checkpointed.
+            self._fh.truncate(self._spool_bytes)
+            self._fh.seek(self._spool_bytes)
+        else:
+            self.pages_path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = self.pages_path.open("wb")
+        return resume
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def stored_pages(self) -> Iterator[List[Dict[str, Any]]]:
+        """Yield the items of every page stored so far, one page at a time."""
+        with self.pages_path.open("rb") as f:
+            remaining = self._spool_bytes
+            for line in f:
+                if remaining <= 0:
+                    break
+                remaining -= len(line)
+                yield json.loads(line)["items"]
+
+    def append(self, total_count: int, items: List[Dict[str, Any]], next_page_token: Optional[str]) -> None:
+        if self._fh is None:
+            raise RuntimeError("ListingCheckpoint is not open")
+        line = (
+            json.dumps(
+                {"page": self.pages, "total_count": total_count, "next_page_token": next_page_token, "items": items},
+                ensure_ascii=False,
+            ).encode("utf-8")
+            + b"\n"
+        )
+        self._fh.write(line)
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+
+        self._spool_bytes += len(line)
+        if self.pages == 0:
+            self.total_count = int(total_count)
+        self.pages += 1
+        self.items += len(items)
+        self.next_page_token = next_page_token
+        self.complete = next_page_token is None
+        atomic_write_json(
+            self.state_path,
+            {
+                "competition_id": self.competition_id,
+                "page_size": self.page_size,
+                "total_count": self.total_count,
+                "pages": self.pages,
+                "items": self.items,
+                "spool_bytes": self._spool_bytes,
+                "next_page_token": next_page_token,
+                "complete": self.complete,
+            },
+        )
+
+    def export_json_array(self, path: Path) -> None:
+        """Write all stored items as one JSON array, streaming page by page."""
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            f.write("[")
+            first = True
+            for items in self.stored_pages():
+                for item in items:
+                    f.write("\n" if first else ",\n")
+                    f.write(json.dumps(item, ensure_ascii=False))
+                    first = False
+            f.write("\n]\n")
+        os.replace(tmp_path, path)
 
 
 def _extract_writeup_id(list_item: Dict[str, Any]) -> Optional[int]:
@@ -275,46 +1195,509 @@ def _extract_writeup_id(list_item: Dict[str, Any]) -> Optional[int]:
         return None
 
 
+def _extract_writeup_update_time(list_item: Dict[str, Any]) -> str:
+    wu = list_item.get("writeUp")
+    if isinstance(wu, dict) and wu.get("updateTime"):
+        return str(wu["updateTime"])
+    return str(list_item.get("updateTime") or "")
+
+
+def shard_of(writeup_id: int, shard_count: int) -> int:
+    """Shard a writeup id belongs to under ``--shard i/N``.
+
+    Uses sha256 rather than ``hash()`` or ``id % N`` so every machine agrees on the split
+    and ids that arrive in runs still spread evenly.
+    """
+    digest = hashlib.sha256(str(int(writeup_id)).encode("ascii")).digest()
+    return int.from_bytes(digest[:8], "big") % shard_count
+
+
+def _parse_shard(value: str) -> Tuple[int, int]:
+    index, sep, count = value.partition("/")
+    try:
+        shard = (int(index), int(count))
+    except ValueError:
+        shard = (-1, 0)
+    if not sep or shard[1] < 1 or not 0 <= shard[0] < shard[1]:
+        raise argparse.ArgumentTypeError(f"expected i/N with 0 <= i < N, got {value!r}")
+    return shard
+
+
+class SyncState:
+    """Per-export record of the list ``updateTime`` each saved writeup was fetched at.
+
+    ``writeups`` maps id -> updateTime for writeups whose local copy is current, and
+    ``tombstones`` maps id -> {update_time, removed_at} for writeups that disappeared
+    from the listing.
+    """
+
+    def __init__(self, path: Path, writeups: Dict[int, str], tombstones: Dict[int, Dict[str, str]]) -> None:
+        self.path = path
+        self.writeups = writeups
+        self.tombstones = tombstones
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: Path) -> "SyncState":
+        writeups: Dict[int, str] = {}
+        tombstones: Dict[int, Dict[str, str]] = {}
+        if path.exists():
+            data = read_json_file(path)
+            writeups = {int(k): str(v) for k, v in (data.get("writeups") or {}).items()}
+            tombstones = {int(k): dict(v) for k, v in (data.get("tombstones") or {}).items()}
+        return cls(path, writeups, tombstones)
+
+    def save(self) -> None:
+        with self._lock:
+            obj = {
+                "writeups": {str(k): v for k, v in sorted(self.writeups.items())},
+                "tombstones": {str(k): v for k, v in sorted(self.tombstones.items())},
+            }
+        atomic_write_json(self.path, obj)
+
+    def mark_fetched(self, writeup_id: int, update_time: str) -> None:
+        with self._lock:
+            self.writeups[int(writeup_id)] = update_time
+            self.tombstones.pop(int(writeup_id), None)
+
+    def stale_ids(self, listed_update_times: Dict[int, str]) -> List[int]:
+        with self._lock:
+            return sorted(
+                wid for wid, ut in listed_update_times.items() if self.writeups.get(wid) != ut
+            )
+
+    def is_current(self, writeup_id: int, update_time: str) -> bool:
+        with self._lock:
+            return self.writeups.get(writeup_id) == update_time
+
+    def adopt(self, writeup_id: int, update_time: str, store: "WriteupStore") -> bool:
+        """Record an already-downloaded writeup whose saved ``updateTime`` matches the listing.
+
+        This lets an export produced by a full run switch to incremental sync without
+        refetching everything; each file is parsed at most once, on first adoption.
+        """
+        with self._lock:
+            if writeup_id in self.writeups or not update_time:
+                return False
+        if not store.has(writeup_id):
+            return False
+        try:
+            saved_ut = str(store.read_json(writeup_id).get("updateTime") or "")
+        except Exception:
+            return False
+        if saved_ut != update_time:
+            return False
+        self.mark_fetched(writeup_id, update_time)
+        return True
+
+    def tombstone_unlisted(self, listed_ids: Iterable[int]) -> List[int]:
+        listed = set(listed_ids)
+        removed_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        removed: List[int] = []
+        with self._lock:
+            for wid in sorted(set(self.writeups) - listed):
+                self.tombstones[wid] = {"update_time": self.writeups.pop(wid), "removed_at": removed_at}
+                removed.append(wid)
+        return removed
+
+
 def _fetch_writeup_detail(
     writeup_id: int,
-    headers: Dict[str, str],
+    session: KaggleSession,
     request_timeout_seconds: int,
     max_retries: int,
     rate_limiter: RateLimiter,
+    concurrency: Optional[AimdConcurrencyController] = None,
+    base_url: str = KAGGLE_BASE_URL,
+    stats: Optional[RequestStats] = None,
+    pool: Optional[HttpConnectionPool] = None,
 ) -> Dict[str, Any]:
     payload = {"writeUpId": int(writeup_id)}
     data = _api_post_json(
+        base_url,
         GET_WRITEUP_BY_ID_API_PATH,
         payload,
-        headers,
+        session,
         request_timeout_seconds,
         max_retries,
         rate_limiter,
+        concurrency,
+        stats,
+        pool,
     )
     if not isinstance(data, dict):
         raise RuntimeError("Unexpected response format: writeup detail is not a JSON object")
     return data
 
 
-def _save_writeup(detail: Dict[str, Any], writeups_dir: Path) -> None:
+@dataclass(frozen=True)
+class SavedWriteup:
+    writeup_id: int
+    json_size: int
+    md_size: int
+    content_hash: str
+    # False when the fetched content matched what was already stored and nothing was written.
+    written: bool = True
+
+
+KnownHashLookup = Callable[[int], Optional[str]]
+
+
+def _writeup_payloads(detail: Dict[str, Any]) -> Tuple[int, bytes, bytes]:
     wid = detail.get("id")
     if wid is None:
         raise RuntimeError("Writeup detail missing id")
 
-    writeup_id = int(wid)
-    json_path = writeups_dir / f"{writeup_id}.json"
-    md_path = writeups_dir / f"{writeup_id}.md"
-
-    _atomic_write_json(json_path, detail)
+    json_bytes = json.dumps(detail, ensure_ascii=False, indent=2).encode("utf-8")
 
     msg = detail.get("message")
     raw_md = ""
     if isinstance(msg, dict):
         raw_md = str(msg.get("rawMarkdown") or "")
-    _atomic_write_text(md_path, raw_md)
 
+    return int(wid), json_bytes, raw_md.encode("utf-8")
+
+
+def _describe_payloads(writeup_id: int, json_bytes: bytes, md_size: int) -> SavedWriteup:
+    return SavedWriteup(
+        writeup_id=writeup_id,
+        json_size=len(json_bytes),
+        md_size=md_size,
+        content_hash=hashlib.sha256(json_bytes).hexdigest(),
+    )
+
+
+def _file_has_content(path: Path, data: bytes, data_hash: Optional[str] = None, known_hash: Optional[str] = None) -> bool:
+    """Whether *path* already holds *data*.
+
+    With the hash recorded when the file was last saved (*known_hash*) a size check and a
+    hash comparison suffice; otherwise the file is read back and compared.
+    """
+    try:
+        if path.stat().st_size != len(data):
+            return False
+        if known_hash is not None and data_hash is not None:
+            return known_hash == data_hash
+        return path.read_bytes() == data
+    except OSError:
+        return False
+
+
+class FileWriteupStore:
+    """The default layout: ``writeups/{id}.json`` and ``writeups/{id}.md`` per writeup.
+
+    Files whose content is unchanged are not rewritten, so re-fetching identical writeups
+    leaves mtimes alone. With ``durability="batch"`` written files are remembered until
+    :meth:`sync` fsyncs them in one go.
+    """
+
+    name = "files"
+
+    def __init__(
+        self,
+        out_dir: Path,
+        known_hash: Optional[KnownHashLookup] = None,
+        durability: str = "none",
+    ) -> None:
+        self.out_dir = out_dir
+        self.writeups_dir = out_dir / "writeups"
+        self._known_hash = known_hash
+        self._durable = durability == "batch"
+        self._lock = threading.Lock()
+        self._unsynced: List[Path] = []
+
+    def close(self) -> None:
+        self.sync()
+
+    def sync(self) -> None:
+        with self._lock:
+            paths, self._unsynced = self._unsynced, []
+        _fsync_paths(paths)
+
+    def json_ref(self, writeup_id: int) -> str:
+        return str(Path("writeups") / f"{writeup_id}.json")
+
+    def markdown_ref(self, writeup_id: int) -> str:
+        return str(Path("writeups") / f"{writeup_id}.md")
+
+    def save(self, detail: Dict[str, Any]) -> SavedWriteup:
+        writeup_id, json_bytes, md_bytes = _writeup_payloads(detail)
+        saved = _describe_payloads(writeup_id, json_bytes, len(md_bytes))
+        known_hash = self._known_hash(writeup_id) if self._known_hash is not None else None
+
+        written: List[Path] = []
+        json_path = self.writeups_dir / f"{writeup_id}.json"
+        if not _file_has_content(json_path, json_bytes, saved.content_hash, known_hash):
+            _atomic_write_bytes(json_path, json_bytes)
+            written.append(json_path)
+        md_path = self.writeups_dir / f"{writeup_id}.md"
+        if not _file_has_content(md_path, md_bytes):
+            _atomic_write_bytes(md_path, md_bytes)
+            written.append(md_path)
+
+        if written and self._durable:
+            with self._lock:
+                self._unsynced.extend(written)
+        return replace(saved, written=bool(written))
+
+    def has(self, writeup_id: int) -> bool:
+        return (self.writeups_dir / f"{writeup_id}.json").exists() and (
+            self.writeups_dir / f"{writeup_id}.md"
+        ).exists()
+
+    def read_json_bytes(self, writeup_id: int) -> bytes:
+        return (self.writeups_dir / f"{writeup_id}.json").read_bytes()
+
+    def read_json(self, writeup_id: int) -> Any:
+        return read_json_file(self.writeups_dir / f"{writeup_id}.json")
+
+    def read_markdown(self, writeup_id: int) -> str:
+        return (self.writeups_dir / f"{writeup_id}.md").read_text(encoding="utf-8")
+
+    def markdown_size(self, writeup_id: int) -> int:
+        return (self.writeups_dir / f"{writeup_id}.md").stat().st_size
+
+    def saved_at(self, writeup_id: int) -> float:
+        return (self.writeups_dir / f"{writeup_id}.json").stat().st_mtime
+
+    def describe_existing(self, writeup_id: int) -> Optional[SavedWriteup]:
+        json_path = self.writeups_dir / f"{writeup_id}.json"
+        md_path = self.writeups_dir / f"{writeup_id}.md"
+        if not md_path.exists() or not is_valid_json_file(json_path):
+            return None
+        return _describe_payloads(writeup_id, json_path.read_bytes(), md_path.stat().st_size)
+
+
+_PACKED_INDEX_RECORD = struct.Struct("<QBIQII")  # id, kind, shard, offset, length, raw length
+_PACKED_KIND_JSON = 0
+_PACKED_KIND_MD = 1
+
+
+def packed_ref_writeup_id(ref: str) -> int:
+    """Return the writeup id of a ``packed:writeups/{id}.md`` style CSV reference."""
+    return int(Path(ref[len(PACKED_REF_PREFIX):]).stem)
+
+
+class PackedWriteupStore:
+    """Append-only compressed shard files with an id -> (shard, offset, length) index.
+
+    Every JSON document and markdown body is zlib-compressed on its own and appended to the
+    current ``shard-NNNNN.pack``. Each append adds a fixed-size record to ``index.bin``; the
+    last record for an id wins. Readers mmap the shard and decompress only the requested
+    slice, so fetching one writeup never touches the rest of the shard.
+    """
+
+    name = "packed"
+
+    def __init__(
+        self,
+        out_dir: Path,
+        shard_max_bytes: int = PACKED_SHARD_MAX_BYTES,
+        known_hash: Optional[KnownHashLookup] = None,
+        durability: str = "none",
+    ) -> None:
+        self.out_dir = out_dir
+        self.root = out_dir / PACKED_DIRNAME
+        self._shard_max_bytes = int(shard_max_bytes)
+        self._known_hash = known_hash
+        self._durable = durability == "batch"
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._index: Dict[Tuple[int, int], Tuple[int, int, int, int]] = {}
+        self._index_bytes_loaded = 0
+        self._maps: Dict[int, mmap.mmap] = {}
+        self._shard_no = 0
+        self._shard_file: Optional[Any] = None
+        self._index_file: Optional[Any] = None
+        with self._lock:
+            self._load_index()
+
+    def _shard_path(self, shard_no: int) -> Path:
+        return self.root / f"shard-{shard_no:05d}.pack"
+
+    def _load_index(self) -> None:
+        index_path = self.root / PACKED_INDEX_FILENAME
+        if not index_path.exists():
+            return
+        with index_path.open("rb") as f:
+            f.seek(self._index_bytes_loaded)
+            data = f.read()
+        usable = len(data) - len(data) % _PACKED_INDEX_RECORD.size
+        for wid, kind, shard_no, offset, length, raw_length in _PACKED_INDEX_RECORD.iter_unpack(
+            data[:usable]
+        ):
+            self._index[(wid, kind)] = (shard_no, offset, length, raw_length)
+            self._shard_no = max(self._shard_no, shard_no)
+        self._index_bytes_loaded += usable
+
+    def _open_for_append(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        index_path = self.root / PACKED_INDEX_FILENAME
+        if index_path.exists():
+            # Drop a torn trailing record left by a crash mid-append.
+            size = index_path.stat().st_size
+            if size % _PACKED_INDEX_RECORD.size:
+                with index_path.open("r+b") as f:
+                    f.truncate(size - size % _PACKED_INDEX_RECORD.size)
+        self._index_file = index_path.open("ab")
+        self._shard_file = self._shard_path(self._shard_no).open("ab")
+
+    def sync(self) -> None:
+        """fsync the current shard, then the index, so no index record outlives its data."""
+        with self._lock:
+            if not self._dirty:
+                return
+            for f in (self._shard_file, self._index_file):
+                if f is not None:
+                    os.fsync(f.fileno())
+            self._dirty = False
+
+    def close(self) -> None:
+        if self._durable:
+            self.sync()
+        with self._lock:
+            for f in (self._shard_file, self._index_file):
+                if f is not None:
+                    f.close()
+            self._shard_file = None
+            self._index_file = None
+            for mm in self._maps.values():
+                mm.close()
+            self._maps.clear()
+
+    def json_ref(self, writeup_id: int) -> str:
+        return f"{PACKED_REF_PREFIX}writeups/{writeup_id}.json"
+
+    def markdown_ref(self, writeup_id: int) -> str:
+        return f"{PACKED_REF_PREFIX}writeups/{writeup_id}.md"
+
+    def _append(self, writeup_id: int, kind: int, payload: bytes) -> None:
+        if self._shard_file is None:
+            self._open_for_append()
+        assert self._shard_file is not None and self._index_file is not None
+        compressed = zlib.compress(payload, 6)
+        offset = self._shard_file.tell()
+        if offset and offset + len(compressed) > self._shard_max_bytes:
+            if self._durable:
+                os.fsync(self._shard_file.fileno())
+            self._shard_file.close()
+            self._shard_no += 1
+            self._shard_file = self._shard_path(self._shard_no).open("ab")
+            offset = self._shard_file.tell()
+        self._shard_file.write(compressed)
+        self._shard_file.flush()
+        entry = (self._shard_no, offset, len(compressed), len(payload))
+        self._index_file.write(_PACKED_INDEX_RECORD.pack(writeup_id, kind, *entry))
+        self._index_file.flush()
+        self._index_bytes_loaded += _PACKED_INDEX_RECORD.size
+        self._index[(writeup_id, kind)] = entry
+        self._dirty = True
+
+    def _has_content(
+        self, writeup_id: int, kind: int, payload: bytes, data_hash: Optional[str] = None, known_hash: Optional[str] = None
+    ) -> bool:
+        entry = self._lookup(writeup_id, kind)
+        if entry is None or entry[3] != len(payload):
+            return False
+        if known_hash is not None and data_hash is not None:
+            return known_hash == data_hash
+        try:
+            return self._read(writeup_id, kind) == payload
+        except (OSError, KeyError, zlib.error):
+            return False
+
+    def save(self, detail: Dict[str, Any]) -> SavedWriteup:
+        writeup_id, json_bytes, md_bytes = _writeup_payloads(detail)
+        saved = _describe_payloads(writeup_id, json_bytes, len(md_bytes))
+        known_hash = self._known_hash(writeup_id) if self._known_hash is not None else None
+        # Appending identical content would only grow the shard; skip it.
+        json_changed = not self._has_content(writeup_id, _PACKED_KIND_JSON, json_bytes, saved.content_hash, known_hash)
+        md_changed = not self._has_content(writeup_id, _PACKED_KIND_MD, md_bytes)
+        with self._lock:
+            if json_changed:
+                self._append(writeup_id, _PACKED_KIND_JSON, json_bytes)
+            if md_changed:
+                self._append(writeup_id, _PACKED_KIND_MD, md_bytes)
+        return replace(saved, written=json_changed or md_changed)
+
+    def _lookup(self, writeup_id: int, kind: int) -> Optional[Tuple[int, int, int, int]]:
+        with self._lock:
+            entry = self._index.get((writeup_id, kind))
+            if entry is None and self._shard_file is None:
+                # Another process (e.g. a running downloader) may have appended since we loaded.
+                self._load_index()
+                entry = self._index.get((writeup_id, kind))
+            return entry
+
+    def _read(self, writeup_id: int, kind: int) -> bytes:
+        entry = self._lookup(writeup_id, kind)
+        if entry is None:
+            raise KeyError(f"writeup {writeup_id} not in packed store {self.root}")
+        shard_no, offset, length, _raw_length = entry
+        with self._lock:
+            mm = self._maps.get(shard_no)
+            if mm is None or len(mm) < offset + length:
+                if mm is not None:
+                    mm.close()
+                with self._shard_path(shard_no).open("rb") as f:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps[shard_no] = mm
+            compressed = mm[offset:offset + length]
+        return zlib.decompress(compressed)
+
+    def has(self, writeup_id: int) -> bool:
+        return (
+            self._lookup(writeup_id, _PACKED_KIND_JSON) is not None
+            and self._lookup(writeup_id, _PACKED_KIND_MD) is not None
+        )
+
+    def read_json_bytes(self, writeup_id: int) -> bytes:
+        return self._read(writeup_id, _PACKED_KIND_JSON)
+
+    def read_json(self, writeup_id: int) -> Any:
+        return json.loads(self.read_json_bytes(writeup_id))
+
+    def read_markdown(self, writeup_id: int) -> str:
+        return self._read(writeup_id, _PACKED_KIND_MD).decode("utf-8")
+
+    def markdown_size(self, writeup_id: int) -> int:
+        entry = self._lookup(writeup_id, _PACKED_KIND_MD)
+        if entry is None:
+            raise KeyError(f"writeup {writeup_id} not in packed store {self.root}")
+        return entry[3]
 
-def _categorize_links(writeup_links: Any) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    def saved_at(self, writeup_id: int) -> float:
+        entry = self._lookup(writeup_id, _PACKED_KIND_JSON)
+        if entry is None:
+            raise KeyError(f"writeup {writeup_id} not in packed store {self.root}")
+        return self._shard_path(entry[0]).stat().st_mtime
+
+    def describe_existing(self, writeup_id: int) -> Optional[SavedWriteup]:
+        if not self.has(writeup_id):
+            return None
+        try:
+            json_bytes = self.read_json_bytes(writeup_id)
+            json.loads(json_bytes)
+        except Exception:
+            return None
+        return _describe_payloads(writeup_id, json_bytes, self.markdown_size(writeup_id))
+
+
+WriteupStore = Union[FileWriteupStore, PackedWriteupStore]
+
+
+def open_writeup_store(
+    out_dir: Path,
+    storage: str,
+    known_hash: Optional[KnownHashLookup] = None,
+    durability: str = "none",
+) -> WriteupStore:
+    if storage == "packed":
+        return PackedWriteupStore(out_dir, known_hash=known_hash, durability=durability)
+    return FileWriteupStore(out_dir, known_hash=known_hash, durability=durability)
+
+
+def categorize_links(writeup_links: Any) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
     application: List[Dict[str, Any]] = []
     youtube: List[Dict[str, Any]] = []
     other: List[Dict[str, Any]] = []
@@ -361,141 +1744,848 @@ def _format_links_urls(links: Sequence[Dict[str, Any]]) -> str:
     return ";".join(urls)
 
 
-def _build_csv(expected_ids: Sequence[int], out_dir: Path) -> Path:
-    writeups_dir = out_dir / "writeups"
-    csv_path = out_dir / "writeups.csv"
-
-    fieldnames = [
-        "writeup_id",
-        "topic_id",
-        "url",
-        "title",
-        "description",
-        "authors",
-        "content_state",
-        "create_time",
-        "publish_time",
-        "update_time",
-        "application_links",
-        "youtube_links",
-        "application_links_json",
-        "youtube_links_json",
-        "markdown_path",
-        "json_path",
+CSV_FIELDNAMES = [
+    "writeup_id",
+    "topic_id",
+    "url",
+    "title",
+    "description",
+    "authors",
+    "content_state",
+    "create_time",
+    "publish_time",
+    "update_time",
+    "application_links",
+    "youtube_links",
+    "application_links_json",
+    "youtube_links_json",
+    "markdown_path",
+    "json_path",
+]
+
+
+def _csv_content_fields(data: Dict[str, Any], writeup_id: int) -> List[Any]:
+    """CSV values derived from a writeup's JSON: every column except the two storage refs."""
+    application_links, youtube_links, _other_links = categorize_links(data.get("writeUpLinks"))
+    return [
+        int(data.get("id") or writeup_id),
+        int(data.get("topicId") or 0) if data.get("topicId") is not None else 0,
+        str(data.get("url") or ""),
+        str(data.get("title") or ""),
+        str(data.get("subtitle") or ""),
+        str(data.get("authors") or ""),
+        str(data.get("contentState") or ""),
+        str(data.get("createTime") or ""),
+        str(data.get("publishTime") or ""),
+        str(data.get("updateTime") or ""),
+        _format_links_urls(application_links),
+        _format_links_urls(youtube_links),
+        json.dumps(application_links, ensure_ascii=False),
+        json.dumps(youtube_links, ensure_ascii=False),
     ]
 
-    with csv_path.open("w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames, quoting=csv.QUOTE_ALL)
-        writer.writeheader()
 
+class CsvRowSpool:
+    """Append-only JSONL of CSV content fields keyed by writeup id and content hash.
+
+    Workers append a row as each writeup is saved, so the final CSV is an ordered merge of
+    spooled rows instead of a re-parse of every JSON document. The latest line for an id
+    wins; a row is only used while its hash matches the manifest, so rows outlived by a
+    rewrite are recomputed.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._fh: Optional[Any] = None
+
+    def _open(self) -> Any:
+        if self._fh is None:
+            if self.path.exists():
+                # Drop a torn trailing line left by a crash mid-append.
+                data = self.path.read_bytes()
+                keep = data.rfind(b"\n") + 1
+                if keep != len(data):
+                    with self.path.open("r+b") as f:
+                        f.truncate(keep)
+            self._fh = self.path.open("ab")
+        return self._fh
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+    def append(self, writeup_id: int, content_hash: str, fields: List[Any]) -> None:
+        line = json.dumps({"id": writeup_id, "hash": content_hash, "fields": fields}, ensure_ascii=False)
+        with self._lock:
+            fh = self._open()
+            fh.write(line.encode("utf-8") + b"\n")
+            fh.flush()
+
+    def index(self) -> Dict[int, Tuple[str, int]]:
+        """Return id -> (content hash, byte offset) of the latest complete row per id."""
+        index: Dict[int, Tuple[str, int]] = {}
+        if not self.path.exists():
+            return index
+        with self._lock, self.path.open("rb") as f:
+            offset = 0
+            for line in f:
+                if line.endswith(b"\n"):
+                    try:
+                        entry = json.loads(line)
+                        index[int(entry["id"])] = (str(entry["hash"]), offset)
+                    except (ValueError, KeyError, TypeError):
+                        pass
+                offset += len(line)
+        return index
+
+
+def _csv_rows(store: WriteupStore, writeup_ids: Sequence[int]) -> Iterator[Tuple[int, str, List[Any]]]:
+    """Yield ``(id, content hash, fields)`` computed from each writeup's saved JSON."""
+    for wid in writeup_ids:
+        json_bytes = store.read_json_bytes(wid)
+        yield wid, hashlib.sha256(json_bytes).hexdigest(), _csv_content_fields(json.loads(json_bytes), wid)
+
+
+def read_store_in_process(
+    out_dir: Path,
+    storage: str,
+    read: Callable[[WriteupStore, Sequence[int]], Iterable[Any]],
+    writeup_ids: Sequence[int],
+) -> List[Any]:
+    """Process-pool entry point: ``read(store, writeup_ids)`` on the worker's own read-only store.
+
+    *read* has to be picklable, i.e. a module-level function or a ``functools.partial`` of one.
+    """
+    store = open_writeup_store(out_dir, storage)
+    try:
+        return list(read(store, writeup_ids))
+    finally:
+        store.close()
+
+
+def _build_csv(
+    expected_ids: Sequence[int],
+    out_dir: Path,
+    store: WriteupStore,
+    manifest: "DownloadManifest",
+    spool: CsvRowSpool,
+    workers: int = 1,
+) -> Tuple[Path, int]:
+    """Write ``writeups.csv`` from spooled rows; returns (path, rows recomputed from JSON).
+
+    Rows missing from the spool or spooled for different content are recomputed from the
+    saved JSON (across ``workers`` processes when there are many, e.g. an export that
+    predates the spool) and spooled for next time. The CSV itself is one pass in id order.
+    """
+    hashes = {wid: entry[2] for wid, entry in manifest.entries(expected_ids).items()}
+    index = spool.index()
+    stale = [wid for wid in expected_ids if wid not in index or index[wid][0] != hashes.get(wid)]
+
+    if stale:
+        if workers > 1 and len(stale) >= CSV_PARALLEL_MIN_ROWS:
+            chunk_size = max(1, -(-len(stale) // (workers * 4)))
+            chunks = [stale[i:i + chunk_size] for i in range(0, len(stale), chunk_size)]
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+                for rows in pool.map(
+                    read_store_in_process,
+                    [out_dir] * len(chunks),
+                    [store.name] * len(chunks),
+                    [_csv_rows] * len(chunks),
+                    chunks,
+                ):
+                    for wid, content_hash, fields in rows:
+                        spool.append(wid, content_hash, fields)
+        else:
+            for wid, content_hash, fields in _csv_rows(store, stale):
+                spool.append(wid, content_hash, fields)
+        index = spool.index()
+
+    csv_path = out_dir / "writeups.csv"
+    tmp_path = csv_path.with_suffix(".csv.tmp")
+    with tmp_path.open("w", encoding="utf-8", newline="") as f, spool.path.open("rb") as rows_file:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(CSV_FIELDNAMES)
         for wid in expected_ids:
-            json_path = writeups_dir / f"{wid}.json"
-            md_path = writeups_dir / f"{wid}.md"
-            data = _read_json(json_path)
-
-            application_links, youtube_links, _other_links = _categorize_links(data.get("writeUpLinks"))
-
-            row = {
-                "writeup_id": int(data.get("id") or wid),
-                "topic_id": int(data.get("topicId") or 0) if data.get("topicId") is not None else 0,
-                "url": str(data.get("url") or ""),
-                "title": str(data.get("title") or ""),
-                "description": str(data.get("subtitle") or ""),
-                "authors": str(data.get("authors") or ""),
-                "content_state": str(data.get("contentState") or ""),
-                "create_time": str(data.get("createTime") or ""),
-                "publish_time": str(data.get("publishTime") or ""),
-                "update_time": str(data.get("updateTime") or ""),
-                "application_links": _format_links_urls(application_links),
-                "youtube_links": _format_links_urls(youtube_links),
-                "application_links_json": json.dumps(application_links, ensure_ascii=False),
-                "youtube_links_json": json.dumps(youtube_links, ensure_ascii=False),
-                "markdown_path": str(md_path.relative_to(out_dir)),
-                "json_path": str(json_path.relative_to(out_dir)),
-            }
-            writer.writerow(row)
+            rows_file.seek(index[wid][1])
+            fields = json.loads(rows_file.readline())["fields"]
+            writer.writerow(fields + [store.markdown_ref(wid), store.json_ref(wid)])
+    os.replace(tmp_path, csv_path)
+
+    return csv_path, len(stale)
+
 
-    return csv_path
+class DownloadManifest:
+    """SQLite record of every saved writeup: sizes, content hash, fetch time and status.
 
+    Verification becomes a single indexed query instead of re-parsing every JSON file.
+    Rows are tagged with the storage layout they were saved to, so switching ``--storage``
+    on an existing export re-validates rather than trusting the other layout's rows.
+    """
 
-def _verify_downloaded(expected_ids: Sequence[int], out_dir: Path) -> List[int]:
-    writeups_dir = out_dir / "writeups"
+    def __init__(self, path: Path, storage: str, autocommit: bool = True) -> None:
+        self.path = path
+        self.storage = storage
+        self._autocommit = autocommit
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS writeups ("
+            " id INTEGER PRIMARY KEY,"
+            " json_size INTEGER NOT NULL,"
+            " md_size INTEGER NOT NULL,"
+            " content_hash TEXT NOT NULL,"
+            " fetched_at REAL NOT NULL,"
+            " status TEXT NOT NULL,"
+            " storage TEXT NOT NULL DEFAULT 'files'"
+            ")"
+        )
+        columns = {r[1] for r in self._conn.execute("PRAGMA table_info(writeups)")}
+        if "storage" not in columns:
+            self._conn.execute("ALTER TABLE writeups ADD COLUMN storage TEXT NOT NULL DEFAULT 'files'")
+        self._conn.execute("DROP INDEX IF EXISTS writeups_status")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS writeups_storage_status ON writeups (storage, status)")
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def commit(self) -> None:
+        with self._lock:
+            self._conn.commit()
+
+    def record(self, saved: SavedWriteup, fetched_at: Optional[float] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO writeups"
+                " (id, json_size, md_size, content_hash, fetched_at, status, storage)"
+                " VALUES (?, ?, ?, ?, ?, 'ok', ?)",
+                (
+                    saved.writeup_id,
+                    saved.json_size,
+                    saved.md_size,
+                    saved.content_hash,
+                    time.time() if fetched_at is None else fetched_at,
+                    self.storage,
+                ),
+            )
+            if self._autocommit:
+                self._conn.commit()
+
+    def mark_status(self, writeup_ids: Iterable[int], status: str) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE writeups SET status = ? WHERE id = ?",
+                [(status, int(wid)) for wid in writeup_ids],
+            )
+            self._conn.commit()
+
+    def ok_hash(self, writeup_id: int) -> Optional[str]:
+        """Content hash of a writeup last recorded as intact in this storage layout."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash FROM writeups WHERE id = ? AND storage = ? AND status = 'ok'",
+                (int(writeup_id), self.storage),
+            ).fetchone()
+        return str(row[0]) if row else None
+
+    def ok_ids(self) -> Set[int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM writeups WHERE storage = ? AND status = 'ok'", (self.storage,)
+            ).fetchall()
+        return {int(r[0]) for r in rows}
+
+    def entries(self, writeup_ids: Iterable[int]) -> Dict[int, Tuple[int, int, str]]:
+        wanted = set(int(w) for w in writeup_ids)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, json_size, md_size, content_hash FROM writeups"
+                " WHERE storage = ? AND status = 'ok'",
+                (self.storage,),
+            ).fetchall()
+        return {int(r[0]): (int(r[1]), int(r[2]), str(r[3])) for r in rows if int(r[0]) in wanted}
+
+
+def verify_downloaded(
+    expected_ids: Sequence[int],
+    store: WriteupStore,
+    manifest: DownloadManifest,
+    deep: bool = False,
+) -> List[int]:
+    ok_ids = manifest.ok_ids()
+    unrecorded = [wid for wid in expected_ids if wid not in ok_ids]
     missing: List[int] = []
 
-    for wid in expected_ids:
-        json_path = writeups_dir / f"{wid}.json"
-        md_path = writeups_dir / f"{wid}.md"
-        if not _is_valid_json_file(json_path):
+    # Writeups saved before the manifest existed are validated the slow way once and then recorded.
+    for wid in unrecorded:
+        saved = store.describe_existing(wid)
+        if saved is None:
             missing.append(wid)
             continue
-        if not md_path.exists():
-            missing.append(wid)
+        manifest.record(saved, fetched_at=store.saved_at(wid))
+
+    if deep:
+        corrupt: List[int] = []
+        for wid, (json_size, md_size, content_hash) in manifest.entries(expected_ids).items():
+            try:
+                json_bytes = store.read_json_bytes(wid)
+                intact = (
+                    len(json_bytes) == json_size
+                    and store.markdown_size(wid) == md_size
+                    and hashlib.sha256(json_bytes).hexdigest() == content_hash
+                )
+            except (OSError, KeyError, zlib.error):
+                intact = False
+            if not intact:
+                corrupt.append(wid)
+        if corrupt:
+            manifest.mark_status(corrupt, "corrupt")
+            missing.extend(corrupt)
 
     return sorted(set(missing))
 
 
-def _download_missing(
-    missing_ids: Sequence[int],
-    headers: Dict[str, str],
+class _DownloadProgress:
+    def __init__(self, label: str = "", total: int = 0) -> None:
+        self._prefix = f"{label} " if label else ""
+        self._total = total
+        self._done = 0
+        self._lock = threading.Lock()
+        self._start_ts = time.monotonic()
+
+    def add_total(self, n: int) -> None:
+        with self._lock:
+            self._total += n
+
+    def mark_done(self) -> None:
+        with self._lock:
+            self._done += 1
+            done = self._done
+            if done == self._total or done % 50 == 0:
+                elapsed = max(0.001, time.monotonic() - self._start_ts)
+                rate = done / elapsed
+                sys.stderr.write(f"[download] {self._prefix}{done}/{self._total} ({rate:.2f}/s)\n")
+                sys.stderr.flush()
+
+
+WriteupProducer = Callable[[Callable[[int], None]], None]
+
+
+def _produce_ids(writeup_ids: Sequence[int]) -> WriteupProducer:
+    def produce(emit: Callable[[int], None]) -> None:
+        for wid in writeup_ids:
+            emit(wid)
+
+    return produce
+
+
+@dataclass
+class DownloadJob:
+    """One competition's worth of writeup ids to fetch within a shared download run.
+
+    ``error`` is set to the first listing failure instead of aborting the other jobs
+    sharing the run; writeups whose detail fetch failed land in ``failed_writeups`` and are
+    left for the retry passes.
+    """
+
+    label: str
+    produce: WriteupProducer
+    session: KaggleSession
+    store: WriteupStore
+    on_saved: Optional[Callable[[SavedWriteup, Dict[str, Any]], None]] = None
+    error: Optional[BaseException] = None
+    failed_writeups: Dict[int, BaseException] = field(default_factory=dict)
+
+    def fail(self, error: BaseException) -> None:
+        if self.error is None:
+            self.error = error
+
+    def fail_writeup(self, writeup_id: int, error: BaseException) -> None:
+        self.failed_writeups[writeup_id] = error
+
+    def save(self, detail: Dict[str, Any]) -> SavedWriteup:
+        """Store one writeup and run the ``on_saved`` bookkeeping (blocking I/O, off the event loop)."""
+        saved = self.store.save(detail)
+        if self.on_saved is not None:
+            self.on_saved(saved, detail)
+        return saved
+
+
+def _download_error(writeup_id: int, cause: BaseException) -> RuntimeError:
+    error = RuntimeError(f"Failed downloading writeup {writeup_id}: {cause}")
+    error.__cause__ = cause
+    return error
+
+
+class _FairQueue:
+    """Per-job bounded queues drained round-robin so one large job cannot starve the rest."""
+
+    def __init__(self, job_count: int, maxsize_per_job: int) -> None:
+        self._cond = threading.Condition()
+        self._queues: List[Deque[int]] = [collections.deque() for _ in range(job_count)]
+        self._open = set(range(job_count))
+        self._order: Deque[int] = collections.deque(range(job_count))
+        self._maxsize = max(1, maxsize_per_job)
+
+    def put(self, job_index: int, writeup_id: int) -> None:
+        with self._cond:
+            while len(self._queues[job_index]) >= self._maxsize:
+                self._cond.wait()
+            self._queues[job_index].append(writeup_id)
+            self._cond.notify_all()
+
+    def close(self, job_index: int) -> None:
+        with self._cond:
+            self._open.discard(job_index)
+            self._cond.notify_all()
+
+    def get(self) -> Optional[Tuple[int, int]]:
+        """Return the next ``(job_index, writeup_id)``, or None once every job is drained."""
+        with self._cond:
+            while True:
+                for _ in range(len(self._order)):
+                    job_index = self._order[0]
+                    self._order.rotate(-1)
+                    if self._queues[job_index]:
+                        writeup_id = self._queues[job_index].popleft()
+                        self._cond.notify_all()
+                        return job_index, writeup_id
+                if not self._open:
+                    return None
+                self._cond.wait()
+
+
+def _download_writeups(
+    jobs: Sequence[DownloadJob],
     cfg: Config,
     rate_limiter: RateLimiter,
+    concurrency: Optional[AimdConcurrencyController] = None,
+    stats: Optional[RequestStats] = None,
 ) -> None:
-    writeups_dir = cfg.out_dir / "writeups"
-    writeups_dir.mkdir(parents=True, exist_ok=True)
-
-    total = len(missing_ids)
-    if total == 0:
-        return
-
-    counter_lock = threading.Lock()
-    done = 0
-    start_ts = time.monotonic()
-
-    def mark_done() -> None:
-        nonlocal done
-        with counter_lock:
-            done += 1
-            if done == total or done % 50 == 0:
-                elapsed = max(0.001, time.monotonic() - start_ts)
-                rate = done / elapsed
-                sys.stderr.write(f"[download] {done}/{total} ({rate:.2f}/s)\n")
-                sys.stderr.flush()
+    """Fetch and save every writeup id the jobs' producers emit, using ``cfg.threads`` workers.
+
+    Each producer runs on its own thread and feeds a bounded per-job queue that the shared
+    workers drain round-robin as ids arrive, so detail fetching overlaps with whatever the
+    producer is doing (e.g. paging through the listing). A full queue blocks its producer.
+    Detail requests of all jobs go through one keep-alive connection pool.
+    """
+    pool = HttpConnectionPool(cfg.base_url, cfg.threads, cfg.request_timeout_seconds)
+    pending = _FairQueue(len(jobs), max(cfg.page_size, cfg.threads * 4))
+    progress = [_DownloadProgress(job.label if len(jobs) > 1 else "") for job in jobs]
+
+    def worker() -> None:
+        while True:
+            item = pending.get()
+            if item is None:
+                return
+            job_index, wid = item
+            job = jobs[job_index]
+            try:
+                detail = _fetch_writeup_detail(
+                    wid,
+                    job.session,
+                    cfg.request_timeout_seconds,
+                    cfg.max_retries,
+                    rate_limiter,
+                    concurrency,
+                    base_url=cfg.base_url,
+                    stats=stats,
+                    pool=pool,
+                )
+                job.save(detail)
+            except Exception as e:
+                # Keep draining so no producer blocks on a queue nobody reads.
+                job.fail_writeup(wid, _download_error(wid, e))
+            progress[job_index].mark_done()
 
-    def worker(wid: int) -> Tuple[int, Optional[str]]:
-        json_path = writeups_dir / f"{wid}.json"
-        md_path = writeups_dir / f"{wid}.md"
-        if _is_valid_json_file(json_path) and md_path.exists():
-            mark_done()
-            return wid, None
-
-        detail = _fetch_writeup_detail(
-            wid,
-            headers,
-            cfg.request_timeout_seconds,
-            cfg.max_retries,
-            rate_limiter,
+    def run_producer(job_index: int) -> None:
+        def emit(wid: int) -> None:
+            progress[job_index].add_total(1)
+            pending.put(job_index, wid)
+
+        try:
+            jobs[job_index].produce(emit)
+        except Exception as e:
+            jobs[job_index].fail(e)
+        finally:
+            pending.close(job_index)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(cfg.threads)]
+    threads += [threading.Thread(target=run_producer, args=(i,), daemon=True) for i in range(len(jobs))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    pool.close()
+
+
+class AsyncHttpError(Exception):
+    def __init__(self, code: int, headers: Dict[str, str]) -> None:
+        super().__init__(f"HTTP {code}")
+        self.code = code
+        self.headers = headers
+
+
+class AsyncConnectionPool:
+    """A bounded pool of persistent HTTP/1.1 connections to a single origin.
+
+    Connections are kept alive between requests so that only the first request on each
+    connection pays for the TCP+TLS handshake.
+    """
+
+    def __init__(self, base_url: str, max_connections: int, request_timeout_seconds: int) -> None:
+        parsed = urllib.parse.urlsplit(base_url)
+        self.base_url = base_url
+        self._scheme = parsed.scheme or "https"
+        self._host = parsed.hostname or ""
+        self._port = parsed.port or (443 if self._scheme == "https" else 80)
+        self._host_header = parsed.netloc
+        self._ssl_context = ssl.create_default_context() if self._scheme == "https" else None
+        self._request_timeout_seconds = request_timeout_seconds
+        self._slots = asyncio.Semaphore(max(1, int(max_connections)))
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def _open(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        return await asyncio.open_connection(
+            self._host,
+            self._port,
+            ssl=self._ssl_context,
+            server_hostname=self._host if self._ssl_context else None,
         )
-        _save_writeup(detail, writeups_dir)
-        mark_done()
-        return wid, None
 
-    if cfg.threads <= 1:
-        for wid in missing_ids:
-            worker(wid)
-        return
+    @staticmethod
+    def _close(writer: asyncio.StreamWriter) -> None:
+        try:
+            writer.close()
+        except Exception:
+            pass
+
+    async def close(self) -> None:
+        while self._idle:
+            _reader, writer = self._idle.pop()
+            self._close(writer)
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        body: bytes,
+        headers: Dict[str, str],
+    ) -> Tuple[int, Dict[str, str], bytes, int]:
+        """Send one request; returns (status, headers, decoded body, body bytes on the wire)."""
+        async with self._slots:
+            reused = bool(self._idle)
+            conn = self._idle.pop() if reused else await self._open()
+            try:
+                status, resp_headers, resp_body, wire_bytes, keep_alive = await asyncio.wait_for(
+                    self._exchange(conn, method, path, body, headers),
+                    timeout=self._request_timeout_seconds,
+                )
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                self._close(conn[1])
+                if not reused:
+                    raise
+                # The server may have dropped an idle keep-alive connection; retry once on a fresh one.
+                conn = await self._open()
+                try:
+                    status, resp_headers, resp_body, wire_bytes, keep_alive = await asyncio.wait_for(
+                        self._exchange(conn, method, path, body, headers),
+                        timeout=self._request_timeout_seconds,
+                    )
+                except BaseException:
+                    self._close(conn[1])
+                    raise
+            except BaseException:
+                self._close(conn[1])
+                raise
+
+            if keep_alive:
+                self._idle.append(conn)
+            else:
+                self._close(conn[1])
+            return status, resp_headers, resp_body, wire_bytes
+
+    async def _exchange(
+        self,
+        conn: Tuple[asyncio.StreamReader, asyncio.StreamWriter],
+        method: str,
+        path: str,
+        body: bytes,
+        headers: Dict[str, str],
+    ) -> Tuple[int, Dict[str, str], bytes, int, bool]:
+        reader, writer = conn
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self._host_header}"]
+        for k, v in headers.items():
+            if k.lower() in {"host", "content-length", "connection"}:
+                continue
+            lines.append(f"{k}: {v}")
+        lines.append(f"Content-Length: {len(body)}")
+        lines.append("Connection: keep-alive")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+        status_line = await reader.readuntil(b"\r\n")
+        parts = status_line.decode("latin-1").split(" ", 2)
+        if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+            raise ConnectionError(f"Malformed HTTP status line: {status_line!r}")
+        status = int(parts[1])
+        version = parts[0]
+
+        resp_headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            resp_headers[name.strip().title()] = value.strip()
+
+        connection = resp_headers.get("Connection", "").lower()
+        keep_alive = connection != "close" and not (version == "HTTP/1.0" and connection != "keep-alive")
+
+        if method == "HEAD" or status in {204, 304} or 100 <= status < 200:
+            return status, resp_headers, b"", 0, keep_alive
+
+        decoder = _ResponseDecoder(resp_headers.get("Content-Encoding", ""))
+        if resp_headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while True:
+                size_line = await reader.readuntil(b"\r\n")
+                size = int(size_line.split(b";", 1)[0].strip(), 16)
+                if size == 0:
+                    # Skip optional trailers.
+                    while (await reader.readuntil(b"\r\n")) != b"\r\n":
+                        pass
+                    break
+                decoder.feed(await reader.readexactly(size))
+                await reader.readexactly(2)
+            return status, resp_headers, decoder.finish(), decoder.wire_bytes, keep_alive
+
+        content_length = resp_headers.get("Content-Length")
+        if content_length is not None:
+            remaining = int(content_length)
+            while remaining > 0:
+                chunk = await reader.readexactly(min(remaining, RESPONSE_READ_CHUNK_BYTES))
+                decoder.feed(chunk)
+                remaining -= len(chunk)
+            return status, resp_headers, decoder.finish(), decoder.wire_bytes, keep_alive
+
+        while True:
+            chunk = await reader.read(RESPONSE_READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            decoder.feed(chunk)
+        return status, resp_headers, decoder.finish(), decoder.wire_bytes, False
+
+
+async def _api_post_json_async(
+    api_path: str,
+    payload: Dict[str, Any],
+    session: KaggleSession,
+    max_retries: int,
+    rate_limiter: RateLimiter,
+    pool: AsyncConnectionPool,
+    concurrency: Optional[AimdConcurrencyController] = None,
+    stats: Optional[RequestStats] = None,
+) -> Any:
+    body = json.dumps(payload).encode("utf-8")
+
+    last_error: Optional[BaseException] = None
+    for attempt in range(1, max_retries + 1):
+        generation, headers = session.current()
+        try:
+            async with _RequestSlot(concurrency, stats, api_path, rate_limiter):
+                status, resp_headers, resp_body, wire_bytes = await pool.request("POST", api_path, body, headers)
+                if status >= 400:
+                    raise AsyncHttpError(status, resp_headers)
+                data = json.loads(resp_body)
+            if stats is not None:
+                stats.add_bytes(api_path, wire_bytes, len(resp_body))
+            session.mark_ok(generation)
+            rate_limiter.on_success()
+            return data
+        except AsyncHttpError as e:
+            last_error = e
+            if e.code in AUTH_FAILURE_HTTP_CODES and await asyncio.to_thread(session.refresh, generation):
+                _log_session_retry(api_path, attempt, max_retries, e.code, stats)
+                continue
+            if e.code not in RETRYABLE_HTTP_CODES:
+                raise
+            sleep_seconds = http_retry_sleep_seconds(e.code, e.headers, attempt, rate_limiter)
+            if stats is not None:
+                stats.retried(api_path)
+            sys.stderr.write(
+                f"[retry] {api_path} attempt={attempt}/{max_retries} http={e.code} "
+                f"sleep={sleep_seconds:.1f}s\n"
+            )
+            sys.stderr.flush()
+            await asyncio.sleep(sleep_seconds)
+        except Exception as e:
+            last_error = e
+            sleep_seconds = error_retry_sleep_seconds(attempt)
+            if stats is not None:
+                stats.retried(api_path)
+            sys.stderr.write(
+                f"[retry] {api_path} attempt={attempt}/{max_retries} err={type(e).__name__} "
+                f"sleep={sleep_seconds:.1f}s\n"
+            )
+            sys.stderr.flush()
+            await asyncio.sleep(sleep_seconds)
+
+    raise RuntimeError(
+        f"API request failed after {max_retries} attempts: {pool.base_url}{api_path}"
+    ) from last_error
+
+
+async def _fetch_writeup_detail_async(
+    writeup_id: int,
+    session: KaggleSession,
+    max_retries: int,
+    rate_limiter: RateLimiter,
+    pool: AsyncConnectionPool,
+    concurrency: Optional[AimdConcurrencyController] = None,
+    stats: Optional[RequestStats] = None,
+) -> Dict[str, Any]:
+    payload = {"writeUpId": int(writeup_id)}
+    data = await _api_post_json_async(
+        GET_WRITEUP_BY_ID_API_PATH,
+        payload,
+        session,
+        max_retries,
+        rate_limiter,
+        pool,
+        concurrency,
+        stats,
+    )
+    if not isinstance(data, dict):
+        raise RuntimeError("Unexpected response format: writeup detail is not a JSON object")
+    return data
+
 
-    import concurrent.futures
+class _AsyncFairQueue:
+    """Event-loop counterpart of :class:`_FairQueue`."""
+
+    def __init__(self, job_count: int, maxsize_per_job: int) -> None:
+        self._cond = asyncio.Condition()
+        self._queues: List[Deque[int]] = [collections.deque() for _ in range(job_count)]
+        self._open = set(range(job_count))
+        self._order: Deque[int] = collections.deque(range(job_count))
+        self._maxsize = max(1, maxsize_per_job)
+
+    async def put(self, job_index: int, writeup_id: int) -> None:
+        async with self._cond:
+            while len(self._queues[job_index]) >= self._maxsize:
+                await self._cond.wait()
+            self._queues[job_index].append(writeup_id)
+            self._cond.notify_all()
+
+    async def close(self, job_index: int) -> None:
+        async with self._cond:
+            self._open.discard(job_index)
+            self._cond.notify_all()
+
+    async def get(self) -> Optional[Tuple[int, int]]:
+        async with self._cond:
+            while True:
+                for _ in range(len(self._order)):
+                    job_index = self._order[0]
+                    self._order.rotate(-1)
+                    if self._queues[job_index]:
+                        writeup_id = self._queues[job_index].popleft()
+                        self._cond.notify_all()
+                        return job_index, writeup_id
+                if not self._open:
+                    return None
+                await self._cond.wait()
+
+
+async def _download_writeups_async_main(
+    jobs: Sequence[DownloadJob],
+    cfg: Config,
+    rate_limiter: RateLimiter,
+    concurrency: Optional[AimdConcurrencyController],
+    stats: Optional[RequestStats],
+) -> None:
+    loop = asyncio.get_running_loop()
+    pool = AsyncConnectionPool(cfg.base_url, cfg.threads, cfg.request_timeout_seconds)
+    pending = _AsyncFairQueue(len(jobs), max(cfg.page_size, cfg.threads * 4))
+    progress = [_DownloadProgress(job.label if len(jobs) > 1 else "") for job in jobs]
+
+    async def worker() -> None:
+        while True:
+            item = await pending.get()
+            if item is None:
+                return
+            job_index, wid = item
+            job = jobs[job_index]
+            try:
+                detail = await _fetch_writeup_detail_async(
+                    wid,
+                    job.session,
+                    cfg.max_retries,
+                    rate_limiter,
+                    pool,
+                    concurrency,
+                    stats,
+                )
+                await asyncio.to_thread(job.save, detail)
+            except Exception as e:
+                job.fail_writeup(wid, _download_error(wid, e))
+            progress[job_index].mark_done()
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=cfg.threads) as ex:
-        futures = [ex.submit(worker, wid) for wid in missing_ids]
-        for fut in concurrent.futures.as_completed(futures):
-            wid, err = fut.result()
-            if err:
-                raise RuntimeError(f"Failed downloading writeup {wid}: {err}")
+    def run_producer(job_index: int) -> None:
+        def emit(wid: int) -> None:
+            progress[job_index].add_total(1)
+            asyncio.run_coroutine_threadsafe(pending.put(job_index, wid), loop).result()
+
+        try:
+            jobs[job_index].produce(emit)
+        except Exception as e:
+            jobs[job_index].fail(e)
+        finally:
+            asyncio.run_coroutine_threadsafe(pending.close(job_index), loop).result()
+
+    workers = [asyncio.create_task(worker()) for _ in range(cfg.threads)]
+    # Producers may block (listing pages through urllib, or waiting on a full queue), so they
+    # get dedicated threads rather than the default executor that DownloadJob.save() relies on.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(jobs)) as producers:
+        try:
+            await asyncio.gather(
+                *(loop.run_in_executor(producers, run_producer, i) for i in range(len(jobs)))
+            )
+            await asyncio.gather(*workers)
+        finally:
+            await pool.close()
+
+
+def _download_writeups_async(
+    jobs: Sequence[DownloadJob],
+    cfg: Config,
+    rate_limiter: RateLimiter,
+    concurrency: Optional[AimdConcurrencyController] = None,
+    stats: Optional[RequestStats] = None,
+) -> None:
+    """Async counterpart of :func:`_download_writeups`.
+
+    One coroutine per ``--threads`` slot shares a keep-alive connection pool of the same size
+    across all jobs, so waiting on the rate limiter or on Retry-After costs no thread.
+    """
+    asyncio.run(_download_writeups_async_main(jobs, cfg, rate_limiter, concurrency, stats))
 
 
 def main(argv: Optional[Sequence[str]] = None) -> int:
-    parser = argparse.ArgumentParser()
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv[:1] == ["merge"]:
+        return merge_main(argv[1:])
+
+    parser = argparse.ArgumentParser(
+        epilog="Run `%(prog)s merge --help` to combine --shard outputs into one export.",
+    )
     parser.add_argument("--competition-slug", default="gemini-3")
     parser.add_argument("--competition-id", type=int, default=120570)
     parser.add_argument("--out-dir", default="./kaggle_writeups_export")
@@ -504,7 +2594,85 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
     parser.add_argument("--request-timeout-seconds", type=int, default=60)
     parser.add_argument("--max-retries", type=int, default=8)
     parser.add_argument("--min-request-interval-seconds", type=float, default=0.25)
+    parser.add_argument(
+        "--burst",
+        type=int,
+        default=1,
+        help="Requests per endpoint allowed back-to-back before --min-request-interval-seconds applies",
+    )
     parser.add_argument("--retry-missing-passes", type=int, default=3)
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="threads",
+        help="threads: worker threads over pooled http.client keep-alive connections; "
+        "async: asyncio with pooled keep-alive connections",
+    )
+    parser.add_argument(
+        "--sync",
+        choices=SYNC_MODES,
+        default="full",
+        help="full: fetch writeups missing on disk; incremental: refetch writeups whose updateTime changed",
+    )
+    parser.add_argument(
+        "--deep-verify",
+        action="store_true",
+        help="Re-hash every saved writeup against the manifest instead of trusting recorded status",
+    )
+    parser.add_argument(
+        "--storage",
+        choices=STORAGE_LAYOUTS,
+        default="files",
+        help="files: writeups/{id}.json + .md; packed: compressed append-only shards with an offset index",
+    )
+    parser.add_argument(
+        "--durability",
+        choices=DURABILITY_MODES,
+        default="none",
+        help="none: leave flushing to the OS; batch: fsync saved writeups, then commit the manifest, "
+        "once per --durability-batch-size saves",
+    )
+    parser.add_argument("--durability-batch-size", type=int, default=DURABILITY_BATCH_SIZE)
+    parser.add_argument(
+        "--csv-workers",
+        type=int,
+        default=min(8, os.cpu_count() or 1),
+        help="Processes used to compute CSV rows that are not already spooled (e.g. for --rebuild-csv)",
+    )
+    parser.add_argument(
+        "--rebuild-csv",
+        action="store_true",
+        help="Rebuild writeups.csv of an existing export from its saved JSON without contacting Kaggle",
+    )
+    parser.add_argument(
+        "--adaptive-concurrency",
+        action="store_true",
+        help="Treat --threads as a ceiling and let an AIMD controller pick in-flight detail requests",
+    )
+    parser.add_argument(
+        "--competitions-file",
+        help="JSON list of {competition_slug, competition_id, out_dir?} to download in one process "
+        "with a shared rate budget (overrides --competition-slug/--competition-id)",
+    )
+    parser.add_argument(
+        "--base-url",
+        default=KAGGLE_BASE_URL,
+        help="Origin to download from, e.g. a local scripts/fake_kaggle_server.py for benchmarks",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve live Prometheus metrics on http://<metrics-host>:<port>/metrics while running",
+    )
+    parser.add_argument("--metrics-host", default="127.0.0.1")
+    parser.add_argument(
+        "--shard",
+        type=_parse_shard,
+        default=(0, 1),
+        metavar="I/N",
+        help="Download only the writeup ids hashed to shard I of N (e.g. one per machine); "
+        "combine the exports afterwards with `merge`",
+    )
 
     args = parser.parse_args(argv)
 
@@ -517,95 +2685,617 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
         request_timeout_seconds=int(args.request_timeout_seconds),
         max_retries=max(1, int(args.max_retries)),
         min_request_interval_seconds=float(args.min_request_interval_seconds),
+        burst=max(1, int(args.burst)),
         retry_missing_passes=max(0, int(args.retry_missing_passes)),
+        engine=str(args.engine),
+        sync=str(args.sync),
+        deep_verify=bool(args.deep_verify),
+        storage=str(args.storage),
+        durability=str(args.durability),
+        durability_batch_size=max(1, int(args.durability_batch_size)),
+        csv_workers=max(1, int(args.csv_workers)),
+        adaptive_concurrency=bool(args.adaptive_concurrency),
+        base_url=str(args.base_url).rstrip("/"),
+        shard_index=args.shard[0],
+        shard_count=args.shard[1],
     )
 
-    cfg.out_dir.mkdir(parents=True, exist_ok=True)
+    if args.competitions_file:
+        cfgs = _load_competitions_file(Path(args.competitions_file).expanduser(), cfg)
+    else:
+        cfgs = [cfg]
+
+    if args.rebuild_csv:
+        return max(_rebuild_csv(c) for c in cfgs)
+
+    # Listing and detail requests get independent buckets; 429 penalties slow both. In batch
+    # mode every competition shares this one limiter, i.e. one global request budget.
+    rate_limiter = RateLimiter(cfg.min_request_interval_seconds, cfg.burst)
+    download = _download_writeups_async if cfg.engine == "async" else _download_writeups
+    concurrency = AimdConcurrencyController(cfg.threads) if cfg.adaptive_concurrency else None
+    stats = RequestStats()
+
+    metrics_server: Optional[MetricsServer] = None
+    if args.metrics_port is not None:
+        metrics_server = MetricsServer(
+            str(args.metrics_host),
+            int(args.metrics_port),
+            lambda: _render_metrics(stats, rate_limiter, concurrency),
+        )
+        sys.stderr.write(f"[metrics] serving {metrics_server.url}\n")
+        sys.stderr.flush()
+
+    try:
+        return _run_competitions(cfgs, cfg, rate_limiter, download, concurrency, stats)
+    finally:
+        if metrics_server is not None:
+            metrics_server.close()
+
+
+def _load_competitions_file(path: Path, base: Config) -> List[Config]:
+    entries = read_json_file(path)
+    if not isinstance(entries, list) or not entries:
+        raise RuntimeError(f"{path}: expected a non-empty JSON list of competitions")
+
+    cfgs: List[Config] = []
+    for entry in entries:
+        if not isinstance(entry, dict) or "competition_slug" not in entry or "competition_id" not in entry:
+            raise RuntimeError(f"{path}: each entry needs competition_slug and competition_id: {entry!r}")
+        slug = str(entry["competition_slug"])
+        out_dir = Path(entry["out_dir"]).expanduser() if entry.get("out_dir") else base.out_dir / slug
+        cfgs.append(
+            replace(
+                base,
+                competition_slug=slug,
+                competition_id=int(entry["competition_id"]),
+                out_dir=out_dir.resolve(),
+            )
+        )
+    return cfgs
+
+
+def _rebuild_csv(cfg: Config) -> int:
+    """Recompute every CSV row of an existing export in a process pool and re-merge the CSV."""
+    index_path = cfg.out_dir / "writeups_index.json"
+    if not is_valid_json_file(index_path):
+        sys.stderr.write(f"ERROR: {index_path} not found; run a download first\n")
+        return 2
+    index = read_json_file(index_path)
+    expected_ids = sorted(int(w) for w in index.get("writeup_ids") or [])
+    if index.get("shard"):
+        shard_index, shard_count = _parse_shard(str(index["shard"]))
+        expected_ids = [wid for wid in expected_ids if shard_of(wid, shard_count) == shard_index]
+
+    manifest = DownloadManifest(cfg.out_dir / MANIFEST_FILENAME, cfg.storage)
+    store = open_writeup_store(cfg.out_dir, cfg.storage)
+    spool = CsvRowSpool(cfg.out_dir / CSV_ROW_SPOOL_FILENAME)
+    try:
+        missing = verify_downloaded(expected_ids, store, manifest)
+        if missing:
+            sys.stderr.write(f"ERROR: {len(missing)} writeups missing from {cfg.out_dir}; run a download first\n")
+            return 2
+        spool.path.unlink(missing_ok=True)
+        started = time.monotonic()
+        csv_path, recomputed = _build_csv(expected_ids, cfg.out_dir, store, manifest, spool, cfg.csv_workers)
+    finally:
+        spool.close()
+        store.close()
+        manifest.close()
+
+    sys.stdout.write(
+        f"REBUILT csv={csv_path} rows={recomputed} workers={cfg.csv_workers} "
+        f"seconds={time.monotonic() - started:.2f}\n"
+    )
+    return 0
 
-    list_rate_limiter = RateLimiter(cfg.min_request_interval_seconds)
-    detail_rate_limiter = RateLimiter(cfg.min_request_interval_seconds)
-    headers = _bootstrap_headers(cfg.competition_slug, cfg.request_timeout_seconds)
 
-    total_count, list_items = _list_all_writeups(
-        cfg.competition_id,
-        cfg.page_size,
-        headers,
-        cfg.request_timeout_seconds,
-        cfg.max_retries,
-        list_rate_limiter,
+def _copy_shard(
+    shard_dir: Path,
+    shard_index: int,
+    shard_count: int,
+    listed_ids: Sequence[int],
+    storage: str,
+    dest_store: WriteupStore,
+    dest_manifest: "DownloadManifest",
+    dest_rows: CsvRowSpool,
+    dest_sync_state: SyncState,
+    deep_verify: bool,
+) -> Tuple[List[int], int]:
+    """Copy one shard's writeups into the merged export; returns (missing ids, rewritten count)."""
+    shard_ids = [wid for wid in listed_ids if shard_of(wid, shard_count) == shard_index]
+    manifest = DownloadManifest(shard_dir / MANIFEST_FILENAME, storage)
+    store = open_writeup_store(shard_dir, storage)
+    rows = CsvRowSpool(shard_dir / CSV_ROW_SPOOL_FILENAME)
+    written = 0
+    try:
+        missing = verify_downloaded(shard_ids, store, manifest, deep=deep_verify)
+        missing_set = set(missing)
+        row_index = rows.index()
+        with contextlib.ExitStack() as stack:
+            rows_file = stack.enter_context(rows.path.open("rb")) if row_index else None
+            for wid in shard_ids:
+                if wid in missing_set:
+                    continue
+                # Re-saving the parsed JSON reproduces the shard's bytes in the merged layout.
+                saved = dest_store.save(json.loads(store.read_json_bytes(wid)))
+                dest_manifest.record(saved, fetched_at=store.saved_at(wid))
+                written += int(saved.written)
+                spooled = row_index.get(wid)
+                if rows_file is not None and spooled is not None and spooled[0] == saved.content_hash:
+                    rows_file.seek(spooled[1])
+                    dest_rows.append(wid, saved.content_hash, json.loads(rows_file.readline())["fields"])
+
+        shard_state = SyncState.load(shard_dir / SYNC_STATE_FILENAME)
+        for wid in shard_ids:
+            if wid in shard_state.writeups and wid not in missing_set:
+                dest_sync_state.mark_fetched(wid, shard_state.writeups[wid])
+    finally:
+        rows.close()
+        store.close()
+        manifest.close()
+    return missing, written
+
+
+def merge_main(argv: Optional[Sequence[str]] = None) -> int:
+    """``merge``: combine the ``--shard i/N`` exports of one competition into a single export.
+
+    Each shard is verified against its own manifest, copied into ``--out-dir`` (unchanged
+    writeups are not rewritten, so re-merging is cheap) and the CSV is built once for the
+    whole listing, reusing the shards' spooled rows.
+    """
+    parser = argparse.ArgumentParser(
+        prog=f"{Path(sys.argv[0]).name} merge",
+        description="Combine --shard i/N exports of one competition into a single export.",
+    )
+    parser.add_argument("shard_dirs", nargs="+", help="--out-dir of every --shard run")
+    parser.add_argument("--out-dir", default="./kaggle_writeups_export")
+    parser.add_argument("--storage", choices=STORAGE_LAYOUTS, default="files")
+    parser.add_argument("--csv-workers", type=int, default=min(8, os.cpu_count() or 1))
+    parser.add_argument(
+        "--deep-verify",
+        action="store_true",
+        help="Re-hash every shard's writeups against its manifest before copying",
     )
+    args = parser.parse_args(argv)
 
-    if total_count and len(list_items) != total_count:
-        sys.stderr.write(
-            f"WARNING: list count mismatch: totalCount={total_count} fetched={len(list_items)}\n"
-        )
-        sys.stderr.flush()
-        if len(list_items) < total_count:
+    out_dir = Path(args.out_dir).expanduser().resolve()
+    shard_dirs = [Path(d).expanduser().resolve() for d in args.shard_dirs]
+    if out_dir in shard_dirs:
+        parser.error("--out-dir must not be one of the shard directories")
+
+    indexes: List[Dict[str, Any]] = []
+    for shard_dir in shard_dirs:
+        index_path = shard_dir / "writeups_index.json"
+        if not is_valid_json_file(index_path):
+            sys.stderr.write(f"ERROR: {index_path} not found; did the shard's listing finish?\n")
+            return 2
+        index = read_json_file(index_path)
+        if not index.get("shard"):
+            sys.stderr.write(f"ERROR: {shard_dir} was not downloaded with --shard\n")
             return 2
+        indexes.append(index)
 
-    writeup_ids: List[int] = []
-    for it in list_items:
-        if not isinstance(it, dict):
-            continue
-        wid = _extract_writeup_id(it)
-        if wid is None:
-            continue
-        writeup_ids.append(wid)
+    shards = [_parse_shard(str(index["shard"])) for index in indexes]
+    shard_count = shards[0][1]
+    competition_ids = {int(index["competition_id"]) for index in indexes}
+    if len(competition_ids) > 1 or any(count != shard_count for _, count in shards):
+        sys.stderr.write("ERROR: shard directories belong to different competitions or --shard splits\n")
+        return 2
+    absent = sorted(set(range(shard_count)) - {i for i, _ in shards})
+    if len(set(shards)) != len(shards) or absent:
+        sys.stderr.write(f"ERROR: need each of {shard_count} shards exactly once; absent={absent}\n")
+        return 2
 
-    expected_ids = sorted(set(writeup_ids))
+    listings = [set(int(w) for w in index.get("writeup_ids") or []) for index in indexes]
+    listed_ids = sorted(set().union(*listings))
+    if any(len(ids) != len(listed_ids) for ids in listings):
+        # Shards listed at different times; the union is expected and late ids show up as missing.
+        sys.stderr.write("WARNING: shards saw different listings; merging against their union\n")
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest = DownloadManifest(out_dir / MANIFEST_FILENAME, str(args.storage))
+    store = open_writeup_store(out_dir, str(args.storage), known_hash=manifest.ok_hash)
+    rows = CsvRowSpool(out_dir / CSV_ROW_SPOOL_FILENAME)
+    sync_state = SyncState.load(out_dir / SYNC_STATE_FILENAME)
+    missing: List[int] = []
+    written = 0
+    try:
+        for shard_dir, index, (shard_index, _count) in sorted(zip(shard_dirs, indexes, shards), key=lambda t: t[2]):
+            shard_missing, shard_written = _copy_shard(
+                shard_dir,
+                shard_index,
+                shard_count,
+                listed_ids,
+                str(index.get("storage") or "files"),
+                store,
+                manifest,
+                rows,
+                sync_state,
+                bool(args.deep_verify),
+            )
+            sys.stderr.write(
+                f"[merge] shard={shard_index}/{shard_count} dir={shard_dir} "
+                f"written={shard_written} missing={len(shard_missing)}\n"
+            )
+            sys.stderr.flush()
+            missing.extend(shard_missing)
+            written += shard_written
+        sync_state.save()
 
-    if total_count and len(expected_ids) != total_count:
-        sys.stderr.write(
-            f"WARNING: unique writeup ids mismatch: totalCount={total_count} unique={len(expected_ids)}\n"
-        )
-        sys.stderr.flush()
-        if len(expected_ids) < total_count:
+        missing = sorted(set(missing) | set(verify_downloaded(listed_ids, store, manifest)))
+        if missing:
+            _atomic_write_text(out_dir / "missing_writeups.txt", "\n".join(map(str, missing)) + "\n")
+            sys.stderr.write(
+                f"ERROR: {len(missing)} writeups missing from the shards. See: {out_dir / 'missing_writeups.txt'}\n"
+            )
             return 2
 
-    _atomic_write_json(cfg.out_dir / "writeups_list_raw.json", list_items)
-    _atomic_write_json(
-        cfg.out_dir / "writeups_index.json",
-        {
-            "competition_slug": cfg.competition_slug,
-            "competition_id": cfg.competition_id,
-            "total_count": total_count,
-            "unique_writeup_count": len(expected_ids),
-            "writeup_ids": expected_ids,
-        },
+        newest = max(shard_dirs, key=lambda d: (d / "writeups_list_raw.json").stat().st_mtime)
+        _atomic_write_bytes(out_dir / "writeups_list_raw.json", (newest / "writeups_list_raw.json").read_bytes())
+        atomic_write_json(
+            out_dir / "writeups_index.json",
+            {
+                "competition_slug": indexes[0].get("competition_slug"),
+                "competition_id": competition_ids.pop(),
+                "total_count": max(int(index.get("total_count") or 0) for index in indexes),
+                "unique_writeup_count": len(listed_ids),
+                "writeup_ids": listed_ids,
+            },
+        )
+        csv_path, recomputed = _build_csv(
+            listed_ids, out_dir, store, manifest, rows, max(1, int(args.csv_workers))
+        )
+    finally:
+        rows.close()
+        store.close()
+        manifest.close()
+
+    sys.stdout.write(
+        f"MERGED shards={shard_count} unique_writeups={len(listed_ids)} written={written}\n"
+        f"out_dir={out_dir}\n"
+        f"csv={csv_path} rows_from_json={recomputed}\n"
     )
+    return 0
 
-    missing = _verify_downloaded(expected_ids, cfg.out_dir)
-    if missing:
-        sys.stderr.write(f"need_download={len(missing)}\n")
-        sys.stderr.flush()
-        _download_missing(missing, headers, cfg, detail_rate_limiter)
 
-    for _pass in range(cfg.retry_missing_passes):
-        missing = _verify_downloaded(expected_ids, cfg.out_dir)
-        if not missing:
-            break
-        sys.stderr.write(f"retry_pass: need_download={len(missing)}\n")
+class CompetitionSync:
+    """Download state for one competition's export directory.
+
+    Work is split into phases so several competitions can share each download run: the
+    listing-driven first pass and every retry pass are handed out as :class:`DownloadJob`\\ s,
+    and :meth:`after_listing` / :meth:`finish` do the per-export bookkeeping in between.
+    """
+
+    def __init__(
+        self,
+        cfg: Config,
+        session: KaggleSession,
+        rate_limiter: RateLimiter,
+        stats: RequestStats,
+        log_prefix: str,
+    ) -> None:
+        self.cfg = cfg
+        self.session = session
+        self.rate_limiter = rate_limiter
+        self.stats = stats
+        self.log_prefix = log_prefix
+        cfg.out_dir.mkdir(parents=True, exist_ok=True)
+        batched = cfg.durability == "batch"
+        self.manifest = DownloadManifest(cfg.out_dir / MANIFEST_FILENAME, cfg.storage, autocommit=not batched)
+        self.store = open_writeup_store(
+            cfg.out_dir, cfg.storage, known_hash=self.manifest.ok_hash, durability=cfg.durability
+        )
+        self._durable_lock = threading.Lock()
+        self._saved_since_sync = 0
+        self.written = 0
+        self.unchanged = 0
+        self.sync_state = SyncState.load(cfg.out_dir / SYNC_STATE_FILENAME)
+        self.incremental = cfg.sync == "incremental"
+        self._ok_ids = self.manifest.ok_ids()
+        self._deep_verify = cfg.deep_verify
+
+        self.listing = ListingCheckpoint(cfg.out_dir, cfg.competition_id, cfg.page_size)
+        self.csv_rows = CsvRowSpool(cfg.out_dir / CSV_ROW_SPOOL_FILENAME)
+        self.total_count = 0
+        self.writeup_ids: List[int] = []
+        # Only ids in this process's shard are tracked past the listing.
+        self.listed_update_times: Dict[int, str] = {}
+        self.listed_ids: List[int] = []
+        self.expected_ids: List[int] = []
+        self.adopted = 0
+        self.tombstoned: List[int] = []
+        self.missing_ids: List[int] = []
+
+    def close(self) -> None:
+        self.listing.close()
+        self.csv_rows.close()
+        self.store.close()
+        self.manifest.close()
+
+    def _make_durable(self) -> None:
+        # Data first, then the manifest rows that vouch for it.
+        self.store.sync()
+        self.manifest.commit()
+        self._saved_since_sync = 0
+
+    def log(self, message: str) -> None:
+        sys.stderr.write(f"{self.log_prefix}{message}\n")
         sys.stderr.flush()
-        _download_missing(missing, headers, cfg, detail_rate_limiter)
 
-    missing = _verify_downloaded(expected_ids, cfg.out_dir)
-    if missing:
-        _atomic_write_text(cfg.out_dir / "missing_writeups.txt", "\n".join(map(str, missing)) + "\n")
-        sys.stderr.write(
-            f"ERROR: still missing {len(missing)} writeups after retries. See: {cfg.out_dir / 'missing_writeups.txt'}\n"
+    @property
+    def sharded(self) -> bool:
+        return self.cfg.shard_count > 1
+
+    def _in_shard(self, wid: int) -> bool:
+        return not self.sharded or shard_of(wid, self.cfg.shard_count) == self.cfg.shard_index
+
+    def _needs_download(self, wid: int) -> bool:
+        if self.incremental and not self.sync_state.is_current(wid, self.listed_update_times[wid]):
+            if not self.sync_state.adopt(wid, self.listed_update_times[wid], self.store):
+                return True
+            self.adopted += 1
+        if wid in self._ok_ids:
+            return False
+        saved = self.store.describe_existing(wid)
+        if saved is None:
+            return True
+        self.manifest.record(saved, fetched_at=self.store.saved_at(wid))
+        return False
+
+    def _produce_from_listing(self, emit: Callable[[int], None]) -> None:
+        def on_page(batch: List[Dict[str, Any]]) -> None:
+            for it in batch:
+                if not isinstance(it, dict):
+                    continue
+                wid = _extract_writeup_id(it)
+                if wid is None:
+                    continue
+                self.writeup_ids.append(wid)
+                if wid in self.listed_update_times or not self._in_shard(wid):
+                    continue
+                self.listed_update_times[wid] = _extract_writeup_update_time(it)
+                if self._needs_download(wid):
+                    emit(wid)
+
+        listing = self.listing
+        if listing.open():
+            self.log(f"listing: resuming after page {listing.pages} ({listing.items} items already listed)")
+            for batch in listing.stored_pages():
+                on_page(batch)
+
+        for total_count, batch, next_page_token in _iter_writeup_pages(
+            self.cfg.competition_id,
+            self.cfg.page_size,
+            self.session,
+            self.cfg.request_timeout_seconds,
+            self.cfg.max_retries,
+            self.rate_limiter,
+            page_token=listing.next_page_token,
+            base_url=self.cfg.base_url,
+            stats=self.stats,
+        ):
+            listing.append(total_count, batch, next_page_token)
+            on_page(batch)
+        self.total_count = listing.total_count
+
+    def _on_saved(self, saved: SavedWriteup, detail: Dict[str, Any]) -> None:
+        if saved.written:
+            # Unchanged content keeps the row spooled when it was first saved.
+            self.csv_rows.append(saved.writeup_id, saved.content_hash, _csv_content_fields(detail, saved.writeup_id))
+        with self._durable_lock:
+            self.manifest.record(saved)
+            if saved.written:
+                self.written += 1
+            else:
+                self.unchanged += 1
+            if self.cfg.durability == "batch":
+                self._saved_since_sync += 1
+                if self._saved_since_sync >= self.cfg.durability_batch_size:
+                    self._make_durable()
+        self.sync_state.mark_fetched(saved.writeup_id, self.listed_update_times.get(saved.writeup_id, ""))
+
+    def _job(self, produce: WriteupProducer) -> DownloadJob:
+        return DownloadJob(
+            label=self.cfg.competition_slug,
+            produce=produce,
+            session=self.session,
+            store=self.store,
+            on_saved=self._on_saved,
         )
-        return 2
 
-    csv_path = _build_csv(expected_ids, cfg.out_dir)
+    def listing_job(self) -> DownloadJob:
+        """Listing and detail fetching are pipelined: ids are queued page by page as they are listed."""
+        return self._job(self._produce_from_listing)
+
+    def retry_job(self, missing: Sequence[int]) -> DownloadJob:
+        return self._job(_produce_ids(missing))
+
+    def job_finished(self, job: DownloadJob) -> None:
+        if self.cfg.durability == "batch":
+            with self._durable_lock:
+                self._make_durable()
+        self.sync_state.save()
+        if job.error is not None:
+            raise job.error
+        if job.failed_writeups:
+            first = next(iter(job.failed_writeups.values()))
+            self.log(f"detail: {len(job.failed_writeups)} writeups failed, left for the retry passes (first: {first})")
+
+    def after_listing(self) -> int:
+        cfg = self.cfg
+        listed = self.listing.items
+        if self.total_count and listed != self.total_count:
+            self.log(f"WARNING: list count mismatch: totalCount={self.total_count} fetched={listed}")
+            if listed < self.total_count:
+                return 2
+
+        self.listed_ids = sorted(set(self.writeup_ids))
+        self.expected_ids = [wid for wid in self.listed_ids if self._in_shard(wid)]
+
+        if self.total_count and len(self.listed_ids) != self.total_count:
+            self.log(
+                f"WARNING: unique writeup ids mismatch: totalCount={self.total_count} unique={len(self.listed_ids)}"
+            )
+            if len(self.listed_ids) < self.total_count:
+                return 2
 
-    sys.stdout.write(
-        f"DONE\n"
-        f"competition={cfg.competition_slug} (id={cfg.competition_id})\n"
-        f"total_count={total_count} unique_writeups={len(expected_ids)}\n"
-        f"out_dir={cfg.out_dir}\n"
-        f"csv={csv_path}\n"
-    )
-    return 0
+        self.listing.export_json_array(cfg.out_dir / "writeups_list_raw.json")
+        index: Dict[str, Any] = {
+            "competition_slug": cfg.competition_slug,
+            "competition_id": cfg.competition_id,
+            "total_count": self.total_count,
+            "unique_writeup_count": len(self.listed_ids),
+            "writeup_ids": self.listed_ids,
+        }
+        if self.sharded:
+            # The full listing is kept so `merge` can tell when a shard is missing.
+            index.update(
+                shard=f"{cfg.shard_index}/{cfg.shard_count}",
+                storage=cfg.storage,
+                shard_writeup_count=len(self.expected_ids),
+            )
+        atomic_write_json(cfg.out_dir / "writeups_index.json", index)
+
+        if self.incremental:
+            self.tombstoned = self.sync_state.tombstone_unlisted(self.listed_ids)
+            self.manifest.mark_status(self.tombstoned, "tombstone")
+            self.sync_state.save()
+            self.log(f"sync: adopted={self.adopted} tombstoned={len(self.tombstoned)}")
+        return 0
+
+    def find_missing(self) -> List[int]:
+        missing = verify_downloaded(self.expected_ids, self.store, self.manifest, deep=self._deep_verify)
+        # Hashing everything once per run is enough; retry passes only need the manifest.
+        self._deep_verify = False
+        if self.incremental:
+            missing = sorted(set(missing) | set(self.sync_state.stale_ids(self.listed_update_times)))
+        return missing
+
+    def finish(self, concurrency: Optional[AimdConcurrencyController]) -> int:
+        cfg = self.cfg
+        missing = self.find_missing()
+        self.missing_ids = missing
+        if missing:
+            _atomic_write_text(cfg.out_dir / "missing_writeups.txt", "\n".join(map(str, missing)) + "\n")
+            self.log(
+                f"ERROR: still missing {len(missing)} writeups after retries. See: {cfg.out_dir / 'missing_writeups.txt'}"
+            )
+            return 2
+
+        csv_path, recomputed = _build_csv(
+            self.expected_ids, cfg.out_dir, self.store, self.manifest, self.csv_rows, cfg.csv_workers
+        )
+
+        concurrency_line = f"concurrency {concurrency.summary()}\n" if concurrency is not None else ""
+        shard_line = ""
+        if self.sharded:
+            shard_line = f"shard={cfg.shard_index}/{cfg.shard_count} shard_writeups={len(self.expected_ids)}\n"
+        requests_line = f"requests {self.stats.summary()}\n"
+        requests_line += "".join(f"bytes {line}\n" for line in self.stats.bytes_summary_lines())
+        sys.stdout.write(
+            f"DONE\n"
+            f"competition={cfg.competition_slug} (id={cfg.competition_id})\n"
+            f"total_count={self.total_count} unique_writeups={len(self.listed_ids)}\n"
+            f"{shard_line}"
+            f"sync={cfg.sync} tombstoned={len(self.tombstoned)} session_refreshes={self.session.refreshes}\n"
+            f"writes written={self.written} unchanged={self.unchanged} durability={cfg.durability}\n"
+            f"{concurrency_line}"
+            f"{requests_line}"
+            f"out_dir={cfg.out_dir}\n"
+            f"csv={csv_path} rows_from_json={recomputed}\n"
+        )
+        return 0
+
+
+def _run_competitions(
+    cfgs: Sequence[Config],
+    cfg: Config,
+    rate_limiter: RateLimiter,
+    download: Callable[..., None],
+    concurrency: Optional[AimdConcurrencyController],
+    stats: RequestStats,
+) -> int:
+    """Sync every competition, sharing each download run (workers, pool and rate budget).
+
+    Writeups whose detail fetch failed are re-fetched by the retry passes, as with a single
+    competition, before their competition counts as failed. Other failures (e.g. the
+    listing) propagate with a single competition; in batch mode the failing competition is
+    reported and the others carry on.
+    """
+    batch = len(cfgs) > 1
+    syncs: Dict[int, CompetitionSync] = {}
+    results: Dict[int, int] = {}
+    reasons: Dict[int, str] = {}
+    active: List[int] = []
+
+    def fail(index: int, error: BaseException) -> None:
+        if not batch:
+            raise error
+        sys.stderr.write(f"ERROR: {cfgs[index].competition_slug}: {error}\n")
+        sys.stderr.flush()
+        results[index] = 1
+        reasons[index] = str(error)
+
+    def run(indexed_jobs: List[Tuple[int, DownloadJob]]) -> None:
+        download([job for _, job in indexed_jobs], cfg, rate_limiter, concurrency, stats)
+        for index, job in indexed_jobs:
+            try:
+                syncs[index].job_finished(job)
+            except Exception as e:
+                fail(index, e)
+
+    try:
+        for i, c in enumerate(cfgs):
+            try:
+                session = KaggleSession(c.base_url, c.competition_slug, c.request_timeout_seconds)
+                syncs[i] = CompetitionSync(
+                    c, session, rate_limiter, stats, f"{c.competition_slug}: " if batch else ""
+                )
+            except Exception as e:
+                fail(i, e)
+
+        run([(i, s.listing_job()) for i, s in syncs.items()])
+        for i, s in syncs.items():
+            if i in results:
+                continue
+            rc = s.after_listing()
+            if rc:
+                results[i] = rc
+                reasons[i] = "listing incomplete"
+            else:
+                active.append(i)
+
+        for _pass in range(cfg.retry_missing_passes):
+            retry_jobs: List[Tuple[int, DownloadJob]] = []
+            for i in active:
+                if i in results:
+                    continue
+                missing = syncs[i].find_missing()
+                if missing:
+                    syncs[i].log(f"retry_pass: need_download={len(missing)}")
+                    retry_jobs.append((i, syncs[i].retry_job(missing)))
+            if not retry_jobs:
+                break
+            run(retry_jobs)
+
+        for i in active:
+            if i not in results:
+                results[i] = syncs[i].finish(concurrency)
+                if results[i]:
+                    reasons[i] = f"{len(syncs[i].missing_ids)} writeups still missing after retries"
+    finally:
+        for s in syncs.values():
+            s.close()
+
+    if batch:
+        failed = sorted(i for i, rc in results.items() if rc)
+        sys.stdout.write(f"BATCH competitions={len(cfgs)} failed={len(failed)}\n")
+        for i in failed:
+            c = cfgs[i]
+            sys.stdout.write(
+                f"FAILED competition={c.competition_slug} (id={c.competition_id}) exit={results[i]} {reasons[i]}\n"
+            )
+    return max(results.values(), default=0)
 
 
 if __name__ == "__main__":
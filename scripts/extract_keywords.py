@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
 """
 使用 Claude API 从 Kaggle Writeups 提取中文关键词
+
+相同的请求会命中本地 LLM 响应缓存（见 llm_cache.py，与 classify_writeups.py 共用），
+使用 --no-cache 可跳过缓存。
 """
 
+import argparse
 import pandas as pd
 import requests
 import json
@@ -11,6 +15,8 @@ from tqdm import tqdm
 
 import os
 
+from llm_cache import cache_key, open_llm_cache
+
 # API 配置 (从环境变量读取)
 API_BASE = os.environ.get("OPENAI_API_BASE", "https://api.openai.com/v1")
 API_KEY = os.environ.get("OPENAI_API_KEY", "")
@@ -24,10 +30,20 @@ OUTPUT_CSV = "kaggle_writeups_export/writeups_classified.csv"
 BATCH_SIZE = 10  # 每次处理的记录数
 SLEEP_TIME = 0.5  # 请求间隔（秒）
 
-def extract_keywords_batch(items):
+def _parse_keywords(content):
+    """从响应中截取 JSON 部分并解析，失败时抛出 ValueError"""
+    # 尝试找到 JSON 开始和结束位置
+    start = content.find('{')
+    end = content.rfind('}') + 1
+    if start == -1 or end <= start:
+        raise ValueError(f"无法解析响应: {content[:200]}")
+    return json.loads(content[start:end])
+
+def extract_keywords_batch(items, cache=None):
     """
     批量提取关键词
     items: list of dict with 'title' and 'description'
+    cache: 可选的 LlmCache，命中时不再请求 API
     """
     # 构建批量提取的 prompt
     prompt_items = []
@@ -62,6 +78,12 @@ def extract_keywords_batch(items):
         ]
     }
 
+    key = cache_key(MODEL, data["messages"], max_tokens=data["max_tokens"])
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return _parse_keywords(cached)
+
     try:
         response = requests.post(
             f"{API_BASE}/chat/completions",
@@ -73,24 +95,26 @@ def extract_keywords_batch(items):
 
         result = response.json()
         content = result['choices'][0]['message']['content']
-
-        # 提取 JSON 部分
-        # 尝试找到 JSON 开始和结束位置
-        start = content.find('{')
-        end = content.rfind('}') + 1
-        if start != -1 and end > start:
-            json_str = content[start:end]
-            keywords_dict = json.loads(json_str)
-            return keywords_dict
-        else:
-            print(f"无法解析响应: {content[:200]}")
-            return {}
-
     except Exception as e:
         print(f"API 请求失败: {e}")
         return {}
 
+    try:
+        keywords_dict = _parse_keywords(content)
+    except ValueError as e:
+        print(e)
+        return {}
+    # 只缓存能解析的响应，解析失败的批次下次会重新请求
+    if cache is not None:
+        cache.put(key, MODEL, content)
+    return keywords_dict
+
 def main():
+    parser = argparse.ArgumentParser(description="从 Kaggle Writeups 提取中文关键词")
+    parser.add_argument("--no-cache", action="store_true", help="跳过本地 LLM 响应缓存")
+    args = parser.parse_args()
+    cache = open_llm_cache(args.no_cache)
+
     print("=" * 60)
     print("Kaggle Writeups 中文关键词提取工具")
     print(f"使用模型: {MODEL}")
@@ -133,7 +157,8 @@ def main():
             })
 
         # 调用 API 提取关键词
-        keywords_dict = extract_keywords_batch(batch_items)
+        hits = cache.hits if cache is not None else 0
+        keywords_dict = extract_keywords_batch(batch_items, cache)
 
         # 更新 DataFrame
         for i, idx in enumerate(batch_idx):
@@ -148,11 +173,14 @@ def main():
         # 每批保存一次
         df.to_csv(OUTPUT_CSV, index=False)
 
-        # 等待一下
-        if batch_start + BATCH_SIZE < len(unprocessed_idx):
+        # 等待一下（缓存命中时无需等待）
+        if batch_start + BATCH_SIZE < len(unprocessed_idx) and (cache is None or cache.hits == hits):
             time.sleep(SLEEP_TIME)
 
     print(f"\n处理完成! 已保存到: {OUTPUT_CSV}")
+    if cache is not None:
+        print(f"LLM 缓存: {cache.summary()}")
+        cache.close()
 
     # 显示一些示例
     print("\n提取示例:")
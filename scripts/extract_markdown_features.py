@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""Extract per-writeup features from the saved rawMarkdown into columnar side data.
+
+Runs after download_kaggle_writeups.py and parses every writeup's markdown in a process
+pool, producing ``writeups_features.json`` next to ``writeups.csv``: one list per column
+(word count, headings, code-block languages, outbound link domains, plain-text excerpt),
+aligned by ``writeup_id``. Rows are keyed on the manifest's content hash, so later runs
+only re-parse writeups that are new or changed.
+
+    python scripts/extract_markdown_features.py --out-dir ./kaggle_writeups_export --workers 8
+
+Load it with ``pandas.DataFrame(load_features(out_dir))`` or :func:`load_features` alone.
+"""
+
+import argparse
+import concurrent.futures
+import functools
+import os
+import re
+import sys
+import time
+import urllib.parse
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from download_kaggle_writeups import (
+    MANIFEST_FILENAME,
+    STORAGE_LAYOUTS,
+    DownloadManifest,
+    WriteupStore,
+    atomic_write_json,
+    is_valid_json_file,
+    open_writeup_store,
+    read_json_file,
+    read_store_in_process,
+    verify_downloaded,
+)
+
+
+FEATURES_FILENAME = "writeups_features.json"
+FEATURES_VERSION = 1
+FEATURE_COLUMNS = ("word_count", "headings", "code_languages", "link_domains", "excerpt")
+EXCERPT_CHARS = 400
+PARALLEL_MIN_ROWS = 64
+
+_FENCE_RE = re.compile(r"^\s{0,3}(`{3,}|~{3,})\s*([^\s`]*)")
+_HEADING_RE = re.compile(r"^\s{0,3}(#{1,6})\s+(.*?)\s*#*\s*$")
+_URL_RE = re.compile(r"https?://[^\s)<>\"'\]]+", re.IGNORECASE)
+_IMAGE_RE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+_LINK_RE = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+_INLINE_MARKUP_RE = re.compile(r"[*_`~>|]+")
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def markdown_features(markdown: str, excerpt_chars: int = EXCERPT_CHARS) -> Dict[str, Any]:
+    """Parse one writeup's markdown into the :data:`FEATURE_COLUMNS` values."""
+    headings: List[str] = []
+    languages: List[str] = []
+    domains: List[str] = []
+    text_lines: List[str] = []
+    fence: Optional[str] = None
+
+    for line in markdown.splitlines():
+        m = _FENCE_RE.match(line)
+        if fence is not None:
+            # Only a fence of the same character and at least the same length closes the block.
+            if m and m.group(1)[0] == fence[0] and len(m.group(1)) >= len(fence) and not m.group(2):
+                fence = None
+            continue
+        if m:
+            fence = m.group(1)
+            lang = m.group(2).strip("{}.").lower()
+            if lang and lang not in languages:
+                languages.append(lang)
+            continue
+
+        for url in _URL_RE.findall(line):
+            host = (urllib.parse.urlsplit(url.rstrip(".,;:!?")).hostname or "").lower()
+            if host.startswith("www."):
+                host = host[len("www.") :]
+            if host and host not in domains:
+                domains.append(host)
+
+        h = _HEADING_RE.match(line)
+        text = h.group(2) if h else line
+        if h and text:
+            headings.append(_plain_text(text))
+        text = _plain_text(text)
+        if text:
+            text_lines.append(text)
+
+    text = " ".join(text_lines)
+    excerpt = text
+    if len(excerpt) > excerpt_chars:
+        excerpt = excerpt[:excerpt_chars].rsplit(" ", 1)[0] + "…"
+    return {
+        "word_count": len(_WORD_RE.findall(text)),
+        "headings": headings,
+        "code_languages": languages,
+        "link_domains": domains,
+        "excerpt": excerpt,
+    }
+
+
+def _plain_text(line: str) -> str:
+    line = _IMAGE_RE.sub(r"\1", line)
+    line = _LINK_RE.sub(r"\1", line)
+    line = _URL_RE.sub("", line)
+    line = _HTML_TAG_RE.sub("", line)
+    line = _INLINE_MARKUP_RE.sub("", line)
+    return " ".join(line.split())
+
+
+def _store_features(
+    store: WriteupStore, writeup_ids: Sequence[int], excerpt_chars: int = EXCERPT_CHARS
+) -> List[Tuple[int, Dict[str, Any]]]:
+    return [(wid, markdown_features(store.read_markdown(wid), excerpt_chars)) for wid in writeup_ids]
+
+
+def _read_features_file(out_dir: Path) -> Dict[str, Any]:
+    path = Path(out_dir) / FEATURES_FILENAME
+    if not is_valid_json_file(path):
+        return {}
+    data = read_json_file(path)
+    return data if data.get("version") == FEATURES_VERSION else {}
+
+
+def load_features(out_dir: Path) -> Dict[str, List[Any]]:
+    """Columns of ``writeups_features.json`` (``writeup_id`` first); empty if not extracted yet."""
+    return dict(_read_features_file(out_dir).get("columns") or {})
+
+
+def extract_features(
+    out_dir: Path,
+    storage: str,
+    workers: int = 1,
+    excerpt_chars: int = EXCERPT_CHARS,
+    force: bool = False,
+) -> Tuple[Path, int, int]:
+    """Bring ``writeups_features.json`` up to date; returns (path, rows parsed, rows reused)."""
+    index_path = out_dir / "writeups_index.json"
+    if not is_valid_json_file(index_path):
+        raise RuntimeError(f"{index_path} not found; run download_kaggle_writeups.py first")
+    expected_ids = sorted(int(w) for w in read_json_file(index_path).get("writeup_ids") or [])
+
+    manifest = DownloadManifest(out_dir / MANIFEST_FILENAME, storage)
+    store = open_writeup_store(out_dir, storage)
+    try:
+        # Records hashes for exports that predate the manifest; anything missing is skipped.
+        missing = set(verify_downloaded(expected_ids, store, manifest))
+        hashes = {wid: entry[2] for wid, entry in manifest.entries(expected_ids).items()}
+    finally:
+        store.close()
+        manifest.close()
+    ids = [wid for wid in expected_ids if wid not in missing and wid in hashes]
+
+    previous: Dict[int, Dict[str, Any]] = {}
+    data = {} if force else _read_features_file(out_dir)
+    columns = (data.get("columns") or {}) if data.get("excerpt_chars") == excerpt_chars else {}
+    for i, wid in enumerate(columns.get("writeup_id") or []):
+        if columns["source_hash"][i] == hashes.get(wid):
+            previous[wid] = {name: columns[name][i] for name in FEATURE_COLUMNS}
+
+    stale = [wid for wid in ids if wid not in previous]
+    parsed: Dict[int, Dict[str, Any]] = {}
+    if stale:
+        read = functools.partial(_store_features, excerpt_chars=excerpt_chars)
+        if workers > 1 and len(stale) >= PARALLEL_MIN_ROWS:
+            chunk_size = max(1, -(-len(stale) // (workers * 4)))
+            chunks = [stale[i : i + chunk_size] for i in range(0, len(stale), chunk_size)]
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+                for rows in pool.map(
+                    read_store_in_process,
+                    [out_dir] * len(chunks),
+                    [storage] * len(chunks),
+                    [read] * len(chunks),
+                    chunks,
+                ):
+                    parsed.update(rows)
+        else:
+            parsed.update(read_store_in_process(out_dir, storage, read, stale))
+
+    out: Dict[str, List[Any]] = {"writeup_id": ids, "source_hash": [hashes[wid] for wid in ids]}
+    for name in FEATURE_COLUMNS:
+        out[name] = [(parsed.get(wid) or previous[wid])[name] for wid in ids]
+
+    path = out_dir / FEATURES_FILENAME
+    atomic_write_json(path, {"version": FEATURES_VERSION, "excerpt_chars": excerpt_chars, "columns": out})
+    if missing:
+        sys.stderr.write(f"WARNING: {len(missing)} writeups missing from {out_dir}; skipped\n")
+    return path, len(parsed), len(ids) - len(parsed)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out-dir", default="./kaggle_writeups_export", help="Export written by the downloader")
+    parser.add_argument("--storage", choices=STORAGE_LAYOUTS, default="files")
+    parser.add_argument("--workers", type=int, default=min(8, os.cpu_count() or 1))
+    parser.add_argument("--excerpt-chars", type=int, default=EXCERPT_CHARS)
+    parser.add_argument("--force", action="store_true", help="Re-parse every writeup instead of only changed ones")
+    args = parser.parse_args(argv)
+
+    started = time.monotonic()
+    path, parsed, reused = extract_features(
+        Path(args.out_dir).expanduser().resolve(),
+        str(args.storage),
+        workers=max(1, int(args.workers)),
+        excerpt_chars=max(1, int(args.excerpt_chars)),
+        force=bool(args.force),
+    )
+    sys.stdout.write(
+        f"DONE\n"
+        f"features={path} parsed={parsed} reused={reused} seconds={time.monotonic() - started:.2f}\n"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Kaggle endpoints used by download_kaggle_writeups.py.
+
+Serves the competition writeups page (which hands out the XSRF-TOKEN / CLIENT-TOKEN
+cookies), ListHackathonWriteUps and GetWriteUpById over a generated corpus, with
+configurable response latency and injected 429/5xx responses. With ``--assets-per-writeup``
+writeups also reference image assets under ``/assets/`` (Range requests supported) for
+mirror_writeup_assets.py. benchmark_download.py starts it in-process; it can also be run
+on its own:
+
+    python scripts/fake_kaggle_server.py --port 8765 --writeups 2000 --latency-ms 40 --rate-429 0.02
+    python scripts/download_kaggle_writeups.py --base-url http://127.0.0.1:8765 --competition-id 1
+"""
+
+import argparse
+import base64
+import collections
+import json
+import math
+import random
+import sys
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from download_kaggle_writeups import GET_WRITEUP_BY_ID_API_PATH, LIST_WRITEUPS_API_PATH
+
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+CONTENT_ENCODINGS = ("gzip", "deflate")
+
+FAKE_XSRF_TOKEN_PREFIX = "fake-xsrf-"
+FAKE_BUILD_VERSION = "fake-build-1"
+FIRST_WRITEUP_ID = 1_000_000
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The threads engine opens a connection per request; the default backlog of 5 drops SYNs
+    # under load and shows up as 1s+ retransmit stalls in the latency tail.
+    request_queue_size = 256
+
+
+@dataclass(frozen=True)
+class FakeServerConfig:
+    competition_slug: str = "gemini-3"
+    competition_id: int = 120570
+    writeups: int = 500
+    markdown_bytes: int = 4000
+    latency_ms: float = 0.0
+    latency_distribution: str = "fixed"
+    rate_429: float = 0.0
+    rate_5xx: float = 0.0
+    retry_after_seconds: float = 1.0
+    seed: int = 0
+    # Server preference order; negotiated against the request's Accept-Encoding.
+    content_encodings: Tuple[str, ...] = CONTENT_ENCODINGS
+    # XSRF tokens older than this are rejected with 403 (0: sessions never expire).
+    session_ttl_seconds: float = 0.0
+    # Image assets referenced per writeup, drawn from a shared pool of asset_pool URLs in which
+    # every two consecutive URLs serve identical bytes (exercises dedup by URL and by content).
+    assets_per_writeup: int = 0
+    asset_pool: int = 64
+    asset_bytes: int = 64 * 1024
+    # Fraction of asset responses cut off halfway through the body (exercises range resume).
+    asset_truncate_rate: float = 0.0
+
+
+def _client_token() -> str:
+    # Only the payload matters to the downloader: it reads the "bld" claim.
+    def b64(obj: Dict[str, Any]) -> str:
+        return base64.urlsafe_b64encode(json.dumps(obj).encode("utf-8")).decode("ascii").rstrip("=")
+
+    return f"{b64({'alg': 'none'})}.{b64({'bld': FAKE_BUILD_VERSION})}.sig"
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        c = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return c.compress(body) + c.flush()
+    return zlib.compress(body, 6)
+
+
+def _writeup_id(index: int) -> int:
+    # Sparse ids, like the real ones.
+    return FIRST_WRITEUP_ID + index * 7
+
+
+def _asset_body(cfg: FakeServerConfig, asset_no: int) -> bytes:
+    rng = random.Random(cfg.seed * 7_919 + asset_no // 2)
+    return b"\x89PNG\r\n\x1a\n" + rng.randbytes(max(0, cfg.asset_bytes - 8))
+
+
+def _build_detail(cfg: FakeServerConfig, index: int, base_url: str = "") -> Dict[str, Any]:
+    wid = _writeup_id(index)
+    rng = random.Random(cfg.seed * 1_000_003 + index)
+    words = ["model", "feature", "ensemble", "prompt", "gemini", "agent", "latency", "eval", "data", "token"]
+    paragraphs: List[str] = [f"# Writeup {wid}\n"]
+    size = len(paragraphs[0])
+    while size < cfg.markdown_bytes:
+        line = " ".join(rng.choice(words) for _ in range(16)) + "\n"
+        paragraphs.append(line)
+        size += len(line)
+    links = [
+        {"url": f"https://example.com/app/{wid}", "mediaType": "LINK"},
+        {"url": f"https://www.youtube.com/watch?v=fake{wid}", "mediaType": "LINK"},
+    ]
+    if cfg.assets_per_writeup > 0 and cfg.asset_pool > 0:
+        asset_rng = random.Random(cfg.seed * 31 + index)
+        for n in range(cfg.assets_per_writeup):
+            asset_url = f"{base_url}/assets/{asset_rng.randrange(cfg.asset_pool)}.png"
+            # Alternate between an inline markdown image and an IMAGE link.
+            if n % 2:
+                links.append({"url": asset_url, "mediaType": "IMAGE"})
+            else:
+                paragraphs.append(f"\n![figure {n}]({asset_url})\n")
+    return {
+        "id": wid,
+        "topicId": 500_000 + index,
+        "url": f"/competitions/{cfg.competition_slug}/writeups/w{wid}",
+        "title": f"Fake writeup {wid}",
+        "subtitle": f"Generated writeup #{index}",
+        "authors": f"user{index % 97}",
+        "contentState": "PUBLISHED",
+        "createTime": "2025-01-01T00:00:00Z",
+        "publishTime": "2025-01-01T00:00:00Z",
+        "updateTime": "2025-01-02T00:00:00Z",
+        "message": {"rawMarkdown": "".join(paragraphs)},
+        "writeUpLinks": links,
+    }
+
+
+class FakeKaggleServer:
+    """A threaded HTTP/1.1 keep-alive server over a fixed, seeded corpus.
+
+    ``counts()`` reports responses per (endpoint, status) so callers can check how many
+    errors were injected.
+    """
+
+    def __init__(self, cfg: FakeServerConfig, host: str = "127.0.0.1", port: int = 0) -> None:
+        if cfg.latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"unknown latency distribution: {cfg.latency_distribution}")
+        for encoding in cfg.content_encodings:
+            if encoding not in CONTENT_ENCODINGS:
+                raise ValueError(f"unknown content encoding: {encoding}")
+        self.cfg = cfg
+        self._httpd = _HTTPServer((host, port), self._handler_class())
+        self._details = [
+            json.dumps(_build_detail(cfg, i, self.url), ensure_ascii=False).encode("utf-8")
+            for i in range(cfg.writeups)
+        ]
+        self._assets: Dict[int, bytes] = {}
+        self._index_by_id = {_writeup_id(i): i for i in range(cfg.writeups)}
+        self._compressed_details: Dict[Tuple[str, int], bytes] = {}
+        self._sessions: Dict[str, float] = {}
+        self._rng = random.Random(cfg.seed)
+        self._lock = threading.Lock()
+        self._counts: Dict[Tuple[str, int], int] = collections.Counter()
+        self._bytes_sent: Dict[str, int] = collections.Counter()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeKaggleServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def counts(self) -> Dict[Tuple[str, int], int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def _count(self, endpoint: str, status: int) -> None:
+        with self._lock:
+            self._counts[(endpoint, status)] += 1
+
+    def _add_bytes(self, endpoint: str, n: int) -> None:
+        with self._lock:
+            self._bytes_sent[endpoint] += n
+
+    def bytes_sent(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._bytes_sent)
+
+    def _random(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def _latency_seconds(self) -> float:
+        mean = self.cfg.latency_ms / 1000.0
+        if mean <= 0:
+            return 0.0
+        dist = self.cfg.latency_distribution
+        with self._lock:
+            if dist == "uniform":
+                return self._rng.uniform(0.0, 2.0 * mean)
+            if dist == "exponential":
+                return self._rng.expovariate(1.0 / mean)
+            if dist == "lognormal":
+                # sigma=0.75 gives a long tail; mu keeps the mean at latency_ms.
+                sigma = 0.75
+                return self._rng.lognormvariate(math.log(mean) - sigma * sigma / 2.0, sigma)
+        return mean
+
+    def _injected_error(self) -> Optional[int]:
+        r = self._random()
+        if r < self.cfg.rate_429:
+            return 429
+        if r < self.cfg.rate_429 + self.cfg.rate_5xx:
+            return (500, 502, 503)[int(self._random() * 3)]
+        return None
+
+    def _new_session(self) -> str:
+        with self._lock:
+            token = f"{FAKE_XSRF_TOKEN_PREFIX}{len(self._sessions)}"
+            self._sessions[token] = time.monotonic()
+        return token
+
+    def _session_valid(self, token: str) -> bool:
+        with self._lock:
+            issued_at = self._sessions.get(token)
+        if issued_at is None:
+            return False
+        ttl = self.cfg.session_ttl_seconds
+        return ttl <= 0 or time.monotonic() - issued_at < ttl
+
+    def _negotiate_encoding(self, accept_encoding: str) -> str:
+        accepted = set()
+        for part in accept_encoding.split(","):
+            name, _, params = part.strip().lower().partition(";")
+            if params.replace(" ", "") not in {"q=0", "q=0.0"}:
+                accepted.add(name.strip())
+        for encoding in self.cfg.content_encodings:
+            if encoding in accepted:
+                return encoding
+        return ""
+
+    def _detail_body(self, index: int, encoding: str) -> bytes:
+        if not encoding:
+            return self._details[index]
+        key = (encoding, index)
+        with self._lock:
+            body = self._compressed_details.get(key)
+        if body is None:
+            body = _compress(self._details[index], encoding)
+            with self._lock:
+                self._compressed_details[key] = body
+        return body
+
+    def _asset(self, asset_no: int) -> bytes:
+        with self._lock:
+            body = self._assets.get(asset_no)
+        if body is None:
+            body = _asset_body(self.cfg, asset_no)
+            with self._lock:
+                self._assets[asset_no] = body
+        return body
+
+    def _list_page(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        page_size = max(1, int(payload.get("pageSize") or 20))
+        start = int(payload.get("pageToken") or 0)
+        stop = min(self.cfg.writeups, start + page_size)
+        items = [
+            {"writeUp": {"id": _writeup_id(i), "updateTime": "2025-01-02T00:00:00Z"}} for i in range(start, stop)
+        ]
+        page: Dict[str, Any] = {"totalCount": self.cfg.writeups, "hackathonWriteUps": items}
+        if stop < self.cfg.writeups:
+            page["nextPageToken"] = str(stop)
+        return page
+
+    def _handler_class(self) -> type:
+        server = self
+        writeups_page = f"/competitions/{self.cfg.competition_slug}/writeups"
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without TCP_NODELAY every response
+            # would wait out the client's delayed ACK.
+            disable_nagle_algorithm = True
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def _send(self, endpoint: str, status: int, body: bytes, headers: Optional[Dict[str, str]] = None) -> None:
+                server._count(endpoint, status)
+                server._add_bytes(endpoint, len(body))
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_asset(self) -> None:
+                name = self.path.split("?", 1)[0][len("/assets/") :]
+                stem, _, ext = name.partition(".")
+                if ext != "png" or not stem.isdigit() or int(stem) >= server.cfg.asset_pool:
+                    self._send("asset", 404, b"{}")
+                    return
+                time.sleep(server._latency_seconds())
+                body = server._asset(int(stem))
+                etag = f'"{zlib.crc32(body):08x}"'
+                start, status = 0, 200
+                range_header = self.headers.get("Range") or ""
+                if_range = self.headers.get("If-Range")
+                if range_header.startswith("bytes=") and (if_range is None or if_range == etag):
+                    first, _, last = range_header[len("bytes=") :].partition("-")
+                    if first.isdigit() and not last:
+                        start, status = int(first), 206
+                if start >= len(body) and status == 206:
+                    server._count("asset", 416)
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{len(body)}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                part = body[start:]
+                sent = part
+                if server._random() < server.cfg.asset_truncate_rate:
+                    sent = part[: len(part) // 2]
+                    # The connection is dropped after the short body.
+                    self.close_connection = True
+                server._count("asset", status)
+                server._add_bytes("asset", len(sent))
+                self.send_response(status)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("ETag", etag)
+                self.send_header("Accept-Ranges", "bytes")
+                if status == 206:
+                    self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+                self.send_header("Content-Length", str(len(part)))
+                self.end_headers()
+                self.wfile.write(sent)
+
+            def do_GET(self) -> None:
+                if self.path.startswith("/assets/"):
+                    self._send_asset()
+                    return
+                if self.path.split("?", 1)[0] != writeups_page:
+                    self._send("other", 404, b"{}")
+                    return
+                body = b"<html><body>writeups</body></html>"
+                server._count("bootstrap", 200)
+                self.send_response(200)
+                self.send_header("Set-Cookie", f"XSRF-TOKEN={server._new_session()}; Path=/")
+                self.send_header("Set-Cookie", f"CLIENT-TOKEN={_client_token()}; Path=/")
+                self.send_header("Content-Type", "text/html")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                endpoint = {LIST_WRITEUPS_API_PATH: "list", GET_WRITEUP_BY_ID_API_PATH: "detail"}.get(
+                    self.path, "other"
+                )
+                if endpoint == "other":
+                    self._send(endpoint, 404, b"{}")
+                    return
+
+                time.sleep(server._latency_seconds())
+
+                if not server._session_valid(self.headers.get("X-XSRF-TOKEN") or ""):
+                    self._send(endpoint, 403, b'{"error":"invalid or expired xsrf token"}')
+                    return
+                status = server._injected_error()
+                if status is not None:
+                    headers = {}
+                    if status in {429, 503} and server.cfg.retry_after_seconds > 0:
+                        headers["Retry-After"] = f"{server.cfg.retry_after_seconds:g}"
+                    self._send(endpoint, status, b"{}", headers)
+                    return
+
+                try:
+                    payload = json.loads(raw or b"{}")
+                except ValueError:
+                    self._send(endpoint, 400, b'{"error":"bad json"}')
+                    return
+
+                encoding = server._negotiate_encoding(self.headers.get("Accept-Encoding") or "")
+                headers = {"Content-Encoding": encoding} if encoding else {}
+                if endpoint == "list":
+                    if int(payload.get("competitionId") or 0) != server.cfg.competition_id:
+                        self._send(endpoint, 404, b'{"error":"unknown competition"}')
+                        return
+                    body = json.dumps(server._list_page(payload)).encode("utf-8")
+                    self._send(endpoint, 200, _compress(body, encoding) if encoding else body, headers)
+                    return
+
+                index = server._index_by_id.get(int(payload.get("writeUpId") or 0))
+                if index is None:
+                    self._send(endpoint, 404, b'{"error":"unknown writeup"}')
+                    return
+                self._send(endpoint, 200, server._detail_body(index, encoding), headers)
+
+        return Handler
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--competition-slug", default="gemini-3")
+    parser.add_argument("--competition-id", type=int, default=120570)
+    parser.add_argument("--writeups", type=int, default=500, help="Corpus size")
+    parser.add_argument("--markdown-bytes", type=int, default=4000, help="Approximate rawMarkdown size per writeup")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Mean response latency")
+    parser.add_argument("--latency-distribution", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of API requests answered with 429")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="Fraction of API requests answered with 500/502/503")
+    parser.add_argument(
+        "--retry-after-seconds",
+        type=float,
+        default=1.0,
+        help="Retry-After sent with 429/503 responses (0 to omit the header)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--content-encodings",
+        default=",".join(CONTENT_ENCODINGS),
+        help="Comma-separated encodings offered in preference order (empty: always identity)",
+    )
+    parser.add_argument(
+        "--session-ttl-seconds",
+        type=float,
+        default=0.0,
+        help="Reject XSRF tokens older than this with 403 (0: never expire)",
+    )
+    parser.add_argument("--assets-per-writeup", type=int, default=0, help="Image assets referenced per writeup")
+    parser.add_argument("--asset-pool", type=int, default=64, help="Distinct asset URLs shared by all writeups")
+    parser.add_argument("--asset-bytes", type=int, default=64 * 1024)
+    parser.add_argument(
+        "--asset-truncate-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of asset responses cut off halfway (the client must resume with a Range request)",
+    )
+    args = parser.parse_args(argv)
+
+    cfg = FakeServerConfig(
+        competition_slug=str(args.competition_slug),
+        competition_id=int(args.competition_id),
+        writeups=max(0, int(args.writeups)),
+        markdown_bytes=max(0, int(args.markdown_bytes)),
+        latency_ms=max(0.0, float(args.latency_ms)),
+        latency_distribution=str(args.latency_distribution),
+        rate_429=max(0.0, float(args.rate_429)),
+        rate_5xx=max(0.0, float(args.rate_5xx)),
+        retry_after_seconds=max(0.0, float(args.retry_after_seconds)),
+        seed=int(args.seed),
+        content_encodings=tuple(e.strip() for e in str(args.content_encodings).split(",") if e.strip()),
+        session_ttl_seconds=max(0.0, float(args.session_ttl_seconds)),
+        assets_per_writeup=max(0, int(args.assets_per_writeup)),
+        asset_pool=max(1, int(args.asset_pool)),
+        asset_bytes=max(8, int(args.asset_bytes)),
+        asset_truncate_rate=max(0.0, float(args.asset_truncate_rate)),
+    )
+    server = FakeKaggleServer(cfg, str(args.host), int(args.port)).start()
+    sys.stderr.write(
+        f"serving {cfg.writeups} writeups for {cfg.competition_slug} (id={cfg.competition_id}) at {server.url}\n"
+    )
+    sys.stderr.flush()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        for (endpoint, status), n in sorted(server.counts().items()):
+            sys.stderr.write(f"{endpoint} http={status} count={n}\n")
+        for endpoint, n in sorted(server.bytes_sent().items()):
+            sys.stderr.write(f"{endpoint} bytes_sent={n}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""On-disk cache of LLM chat completions shared by classify_writeups.py and extract_keywords.py.
+
+Responses are keyed by a sha256 of the model, the messages and the sampling parameters,
+so re-running a job with byte-identical prompts (after a crash, or after changing only how
+results are written out) costs nothing. The cache is one SQLite file, capped at a size
+limit with least-recently-used eviction, and safe to share between threads and processes.
+
+Environment variables:
+  LLM_CACHE_PATH     - Cache file (default: ~/.cache/kaggle-writeups/llm_cache.sqlite3)
+  LLM_CACHE_MAX_MB   - Size cap in MB (default: 512)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "kaggle-writeups" / "llm_cache.sqlite3"
+DEFAULT_MAX_MB = 512
+# Cache hits buffer their last-access updates and write them in one transaction this often
+# (and on every put and on close), instead of committing once per hit.
+TOUCH_FLUSH_EVERY = 256
+
+
+def cache_key(model: str, messages: List[Dict[str, str]], **params: Any) -> str:
+    """Stable key for one completion request; *params* are the sampling parameters."""
+    canonical = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LlmCache:
+    """SQLite-backed response cache with a byte cap and LRU eviction.
+
+    :meth:`get` refreshes an entry's last access, so prompts that keep being re-run are
+    the last to go when :meth:`put` has to make room. The refreshes are buffered in memory
+    and flushed in batches, so a run served mostly from the cache is not one commit per hit.
+    """
+
+    def __init__(self, path: Path, max_bytes: int) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}
+        # Another process may hold the write lock briefly (e.g. classify and extract_keywords
+        # running side by side).
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " response TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_touches_locked()
+            self._conn.commit()
+            self._conn.close()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[key] = time.time()
+            if len(self._touched) >= TOUCH_FLUSH_EVERY:
+                self._flush_touches_locked()
+                self._conn.commit()
+        return str(row[0])
+
+    def put(self, key: str, model: str, response: str) -> None:
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, now, now),
+            )
+            self.writes += 1
+            # Pending touches first, so eviction sees the real access order.
+            self._flush_touches_locked()
+            self._evict_locked()
+            self._conn.commit()
+
+    def _flush_touches_locked(self) -> None:
+        if not self._touched:
+            return
+        self._conn.executemany(
+            "UPDATE responses SET last_access = ? WHERE key = ?",
+            [(at, key) for key, at in self._touched.items()],
+        )
+        self._touched.clear()
+
+    def _evict_locked(self) -> None:
+        total = int(self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0])
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= int(size)
+            self.evictions += 1
+
+    def summary(self) -> str:
+        lookups = self.hits + self.misses
+        hit_rate = 100.0 * self.hits / lookups if lookups else 0.0
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return (
+            f"hits={self.hits} misses={self.misses} hit_rate={hit_rate:.1f}% writes={self.writes} "
+            f"evictions={self.evictions} entries={entries} size_mb={size / 1024 / 1024:.1f}"
+        )
+
+
+def open_llm_cache(disabled: bool = False) -> Optional[LlmCache]:
+    """The cache configured by LLM_CACHE_PATH / LLM_CACHE_MAX_MB, or None with ``--no-cache``."""
+    if disabled:
+        return None
+    path = Path(os.environ.get("LLM_CACHE_PATH") or DEFAULT_CACHE_PATH).expanduser()
+    max_mb = float(os.environ.get("LLM_CACHE_MAX_MB") or DEFAULT_MAX_MB)
+    cache = LlmCache(path, int(max_mb * 1024 * 1024))
+    print(f"[llm-cache] using {path}", file=sys.stderr)
+    return cache
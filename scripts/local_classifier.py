@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Offline pre-classifier that settles the obvious writeups before classify_writeups.py calls the LLM.
+
+Each writeup's title and description, and each category's name, description and
+``example_keywords`` from categories.json, become TF-IDF vectors over hashed word unigrams
+and bigrams. A writeup is scored against every category centroid by cosine similarity; when
+the best category beats the runner-up by at least the margin it is assigned locally, and only
+the low-margin rest goes to the LLM.
+
+NumPy is only needed when this stage is used (``classify --prefilter``).
+"""
+
+import re
+import zlib
+from typing import Any, Dict, List, Sequence, Tuple
+
+
+DEFAULT_MIN_MARGIN = 0.1
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _hashed_terms(text: str) -> List[int]:
+    words = _WORD_RE.findall(text.lower())
+    terms = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    return [zlib.crc32(t.encode("utf-8")) for t in terms]
+
+
+def _category_text(category: Dict[str, Any]) -> str:
+    keywords = category.get("example_keywords") or []
+    return " ".join([category.get("name", ""), category.get("description", ""), " ".join(keywords)])
+
+
+def _tfidf_rows(np: Any, docs: Sequence[List[int]], vocab: Any, idf: Any) -> Tuple[Any, Any, Any]:
+    """Sparse L2-normalized TF-IDF rows as (row index, term hash, weight) arrays."""
+    rows = np.repeat(np.arange(len(docs)), [len(d) for d in docs])
+    terms = np.fromiter((t for d in docs for t in d), dtype=np.int64, count=len(rows))
+    if not len(rows):
+        return rows, terms, np.zeros(0)
+    # Collapse repeated terms within a row into term frequencies.
+    pairs, tf = np.unique(np.stack([rows, terms], axis=1), axis=0, return_counts=True)
+    rows, terms = pairs[:, 0], pairs[:, 1]
+    weights = tf * idf[np.searchsorted(vocab, terms)]
+    norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=len(docs)))
+    return rows, terms, weights / norms[rows]
+
+
+def score_categories(
+    items: Sequence[Dict[str, str]], categories: Sequence[Dict[str, Any]]
+) -> Tuple[Any, Any]:
+    """Cosine similarity of each item (``title``/``description``) to each category: (best index, scores)."""
+    import numpy as np
+
+    item_docs = [_hashed_terms(f"{it.get('title', '')} {it.get('description', '')}") for it in items]
+    cat_docs = [_hashed_terms(_category_text(c)) for c in categories]
+
+    # Document frequency over writeups and categories alike, so a word every category
+    # mentions (e.g. "app") carries little weight.
+    vocab, df = np.unique(
+        np.fromiter((t for d in item_docs + cat_docs for t in set(d)), dtype=np.int64),
+        return_counts=True,
+    )
+    n_docs = len(item_docs) + len(cat_docs)
+    idf = np.log((1 + n_docs) / (1 + df)) + 1.0
+
+    cat_rows, cat_terms, cat_weights = _tfidf_rows(np, cat_docs, vocab, idf)
+    item_rows, item_terms, item_weights = _tfidf_rows(np, item_docs, vocab, idf)
+
+    # Dense centroids over the categories' own vocabulary; item terms outside it score zero.
+    cat_vocab, cat_cols = np.unique(cat_terms, return_inverse=True)
+    centroids = np.zeros((len(categories), len(cat_vocab)))
+    np.add.at(centroids, (cat_rows, cat_cols), cat_weights)
+
+    cols = np.searchsorted(cat_vocab, item_terms)
+    cols = np.minimum(cols, max(len(cat_vocab) - 1, 0))
+    known = (cat_vocab[cols] == item_terms) if len(cat_vocab) else np.zeros(len(item_terms), dtype=bool)
+    scores = np.zeros((len(items), len(categories)))
+    np.add.at(
+        scores,
+        item_rows[known],
+        item_weights[known, None] * centroids[:, cols[known]].T,
+    )
+    return scores.argmax(axis=1), scores
+
+
+def local_classify(
+    items: Sequence[Dict[str, str]],
+    categories: Sequence[Dict[str, Any]],
+    min_margin: float = DEFAULT_MIN_MARGIN,
+) -> Dict[str, Dict[str, str]]:
+    """Categories for the items whose best score beats the runner-up by *min_margin*, keyed by ``id``.
+
+    Items left out of the result are the ambiguous ones that still need the LLM.
+    """
+    if not items or len(categories) < 2:
+        return {}
+    import numpy as np
+
+    best, scores = score_categories(items, categories)
+    top2 = np.sort(scores, axis=1)[:, -2:]
+    margin = top2[:, 1] - top2[:, 0]
+    assigned: Dict[str, Dict[str, str]] = {}
+    for i in np.flatnonzero((margin >= min_margin) & (top2[:, 1] > 0)):
+        assigned[str(items[i]["id"])] = {
+            "category": categories[best[i]]["name"],
+            "confidence": "high" if margin[i] >= 2 * min_margin else "medium",
+        }
+    return assigned
@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""Mirror the images and storage.googleapis.com assets referenced by downloaded writeups.
+
+Runs against an existing download_kaggle_writeups.py export. Asset URLs come from the
+``writeUpLinks`` that ``categorize_links`` files under "other" and from images embedded
+in each writeup's markdown. Assets are fetched concurrently into a content-addressed store
+under ``<out-dir>/assets/`` (identical bytes behind different URLs are stored once);
+interrupted transfers resume with Range requests, and the store is kept under
+``--budget-bytes`` by evicting the least recently used objects.
+
+    python scripts/mirror_writeup_assets.py --out-dir ./kaggle_writeups_export --threads 8 --budget-bytes 2G
+"""
+
+import argparse
+import base64
+import concurrent.futures
+import hashlib
+import http.client
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from download_kaggle_writeups import (
+    RESPONSE_READ_CHUNK_BYTES,
+    RETRYABLE_HTTP_CODES,
+    STORAGE_LAYOUTS,
+    RateLimiter,
+    atomic_write_json,
+    categorize_links,
+    error_retry_sleep_seconds,
+    http_retry_sleep_seconds,
+    is_valid_json_file,
+    open_writeup_store,
+    read_json_file,
+)
+
+
+ASSETS_DIRNAME = "assets"
+ASSET_INDEX_FILENAME = "assets.sqlite3"
+ASSET_BUDGET_BYTES = 2 * 1024**3
+ASSET_MAX_BYTES = 50 * 1024**2
+USER_AGENT = "Mozilla/5.0 (compatible; kaggle-writeups-asset-mirror/1.0)"
+
+_MARKDOWN_IMAGE_RE = re.compile(r"!\[[^\]]*\]\(\s*<?(https?://[^)\s>]+)>?(?:\s+\"[^\"]*\")?\s*\)")
+_HTML_IMAGE_RE = re.compile(r"<img\b[^>]*?\bsrc=[\"'](https?://[^\"']+)[\"']", re.IGNORECASE)
+_SIZE_SUFFIXES = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+
+def _parse_size(value: str) -> int:
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*", value, re.IGNORECASE)
+    if match is None:
+        raise argparse.ArgumentTypeError(f"expected a size like 500M or 2G, got {value!r}")
+    return int(float(match.group(1)) * _SIZE_SUFFIXES[match.group(2).upper()])
+
+
+def collect_asset_urls(detail: Dict[str, Any]) -> List[str]:
+    """Asset URLs of one writeup, in first-seen order: "other" links, then markdown images."""
+    urls: List[str] = []
+    _application, _youtube, other = categorize_links(detail.get("writeUpLinks"))
+    urls.extend(str(link.get("url") or "").strip() for link in other)
+
+    msg = detail.get("message")
+    markdown = str(msg.get("rawMarkdown") or "") if isinstance(msg, dict) else ""
+    urls.extend(m.group(1) for m in _MARKDOWN_IMAGE_RE.finditer(markdown))
+    urls.extend(m.group(1) for m in _HTML_IMAGE_RE.finditer(markdown))
+
+    seen: Set[str] = set()
+    result: List[str] = []
+    for url in urls:
+        if url.startswith(("http://", "https://")) and url not in seen:
+            seen.add(url)
+            result.append(url)
+    return result
+
+
+@dataclass(frozen=True)
+class MirroredAsset:
+    url: str
+    sha256: str
+    size: int
+    content_type: str
+
+
+class AssetStore:
+    """Content-addressed asset objects plus a SQLite index of URLs, objects and references.
+
+    Objects live at ``objects/<sha[:2]>/<sha>``; ``urls`` maps each URL to its object (or a
+    failure), ``objects`` tracks size and last access for LRU eviction, and ``refs`` records
+    which writeups use which URL. :meth:`lookup` counts as an access, so assets the viewer
+    keeps showing are the last to be evicted.
+    """
+
+    def __init__(self, root: Path, budget_bytes: int = ASSET_BUDGET_BYTES) -> None:
+        self.root = root
+        self.budget_bytes = budget_bytes
+        self.objects_dir = root / "objects"
+        self.partial_dir = root / "partial"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.partial_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(root / ASSET_INDEX_FILENAME), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS objects ("
+            " sha256 TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " content_type TEXT NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS objects_last_access ON objects (last_access)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS urls ("
+            " url TEXT PRIMARY KEY,"
+            " sha256 TEXT,"
+            " status TEXT NOT NULL,"
+            " error TEXT NOT NULL DEFAULT '',"
+            " fetched_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS urls_sha256 ON urls (sha256)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS refs ("
+            " writeup_id INTEGER NOT NULL,"
+            " url TEXT NOT NULL,"
+            " PRIMARY KEY (writeup_id, url))"
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def object_path(self, sha256: str) -> Path:
+        return self.objects_dir / sha256[:2] / sha256
+
+    def partial_path(self, url: str) -> Path:
+        return self.partial_dir / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.part"
+
+    def stored_bytes(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0])
+
+    def add_refs(self, writeup_id: int, urls: Iterable[str]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO refs (writeup_id, url) VALUES (?, ?)", [(writeup_id, u) for u in urls]
+            )
+            self._conn.commit()
+
+    def statuses(self) -> Dict[str, str]:
+        with self._lock:
+            return {url: status for url, status in self._conn.execute("SELECT url, status FROM urls")}
+
+    def lookup(self, url: str) -> Optional[MirroredAsset]:
+        """The mirrored copy of *url*, if any. Read-only; report uses through :meth:`touch`."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT o.sha256, o.size, o.content_type FROM urls u JOIN objects o ON o.sha256 = u.sha256"
+                " WHERE u.url = ? AND u.status = 'ok'",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        return MirroredAsset(url=url, sha256=row[0], size=int(row[1]), content_type=str(row[2]))
+
+    def touch(self, sha256s: Iterable[str]) -> None:
+        """Mark objects as recently used, in one transaction (e.g. all images of a rendered page)."""
+        now = time.time()
+        params = [(now, sha256) for sha256 in set(sha256s)]
+        if not params:
+            return
+        with self._lock:
+            self._conn.executemany("UPDATE objects SET last_access = ? WHERE sha256 = ?", params)
+            self._conn.commit()
+
+    def record_failure(self, url: str, status: str, error: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO urls (url, sha256, status, error, fetched_at) VALUES (?, NULL, ?, ?, ?)",
+                (url, status, error[:500], time.time()),
+            )
+            self._conn.commit()
+
+    def admit(self, url: str, partial: Path, content_type: str) -> Tuple[MirroredAsset, bool, List[str]]:
+        """Move a completed download into the store; returns (asset, deduplicated, evicted shas).
+
+        Objects already present are reused and the download discarded. Otherwise least
+        recently used objects are evicted until the new one fits the budget.
+        """
+        digest = hashlib.sha256()
+        with partial.open("rb") as f:
+            for chunk in iter(lambda: f.read(RESPONSE_READ_CHUNK_BYTES), b""):
+                digest.update(chunk)
+        sha256 = digest.hexdigest()
+        size = partial.stat().st_size
+        now = time.time()
+
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM objects WHERE sha256 = ?", (sha256,)).fetchone() is not None
+            evicted: List[str] = []
+            if exists:
+                partial.unlink(missing_ok=True)
+                self._conn.execute("UPDATE objects SET last_access = ? WHERE sha256 = ?", (now, sha256))
+            else:
+                evicted = self._evict_locked(size)
+                path = self.object_path(sha256)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(partial, path)
+                self._conn.execute(
+                    "INSERT INTO objects (sha256, size, content_type, last_access) VALUES (?, ?, ?, ?)",
+                    (sha256, size, content_type, now),
+                )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO urls (url, sha256, status, error, fetched_at) VALUES (?, ?, 'ok', '', ?)",
+                (url, sha256, now),
+            )
+            self._conn.commit()
+        partial.with_suffix(".json").unlink(missing_ok=True)
+        return MirroredAsset(url=url, sha256=sha256, size=size, content_type=content_type), exists, evicted
+
+    def evict_to_budget(self) -> List[str]:
+        """Evict least recently used objects until the store fits the (possibly lowered) budget."""
+        with self._lock:
+            evicted = self._evict_locked(0)
+            self._conn.commit()
+        return evicted
+
+    def _evict_locked(self, incoming_bytes: int) -> List[str]:
+        total = int(self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0])
+        evicted: List[str] = []
+        if total + incoming_bytes <= self.budget_bytes:
+            return evicted
+        for sha256, size in self._conn.execute("SELECT sha256, size FROM objects ORDER BY last_access").fetchall():
+            if total + incoming_bytes <= self.budget_bytes:
+                break
+            self.object_path(sha256).unlink(missing_ok=True)
+            self._conn.execute("DELETE FROM objects WHERE sha256 = ?", (sha256,))
+            self._conn.execute("UPDATE urls SET status = 'evicted', sha256 = NULL WHERE sha256 = ?", (sha256,))
+            total -= int(size)
+            evicted.append(sha256)
+        return evicted
+
+
+def localize_markdown(markdown: str, store: AssetStore, max_inline_bytes: int = 2 * 1024**2) -> str:
+    """Point markdown images at their mirrored copies (as data URIs) instead of the origin.
+
+    The objects used are marked as recently used with a single write per call.
+    """
+    used: List[str] = []
+
+    def inline(match: "re.Match[str]") -> str:
+        url = match.group(1)
+        asset = store.lookup(url)
+        if asset is None or asset.size > max_inline_bytes:
+            return match.group(0)
+        data = base64.b64encode(store.object_path(asset.sha256).read_bytes()).decode("ascii")
+        used.append(asset.sha256)
+        content_type = asset.content_type or "application/octet-stream"
+        return match.group(0).replace(url, f"data:{content_type};base64,{data}")
+
+    markdown = _MARKDOWN_IMAGE_RE.sub(inline, markdown)
+    markdown = _HTML_IMAGE_RE.sub(inline, markdown)
+    store.touch(used)
+    return markdown
+
+
+class _AssetTooLarge(Exception):
+    pass
+
+
+def _fetch_asset(
+    url: str,
+    store: AssetStore,
+    timeout: int,
+    max_retries: int,
+    max_asset_bytes: int,
+    rate_limiter: RateLimiter,
+) -> Tuple[str, int]:
+    """Download *url* into its partial file, resuming from whatever is already there.
+
+    Returns (content type, bytes transferred by this call). A server that ignores the
+    Range header or whose ETag changed restarts the download from the beginning.
+    """
+    partial = store.partial_path(url)
+    meta_path = partial.with_suffix(".json")
+    host = urllib.parse.urlsplit(url).netloc
+    transferred = 0
+
+    for attempt in range(1, max_retries + 1):
+        meta: Dict[str, Any] = read_json_file(meta_path) if is_valid_json_file(meta_path) else {}
+        offset = partial.stat().st_size if partial.exists() and meta.get("url") == url else 0
+        headers = {"User-Agent": USER_AGENT, "Accept-Encoding": "identity"}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            validator = meta.get("etag") or meta.get("last_modified")
+            if validator:
+                headers["If-Range"] = str(validator)
+
+        rate_limiter.wait(host)
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=timeout) as resp:
+                length = resp.headers.get("Content-Length")
+                total = length
+                if resp.status == 206:
+                    content_range = resp.headers.get("Content-Range") or ""
+                    if not content_range.startswith(f"bytes {offset}-"):
+                        raise ValueError(f"unexpected Content-Range {content_range!r} for offset {offset}")
+                    total = content_range.rpartition("/")[2] or None
+                else:
+                    offset = 0
+                if total is not None and total.isdigit() and int(total) > max_asset_bytes:
+                    raise _AssetTooLarge(f"{total} bytes")
+                content_type = (resp.headers.get("Content-Type") or "").split(";", 1)[0].strip()
+                atomic_write_json(
+                    meta_path,
+                    {
+                        "url": url,
+                        "etag": resp.headers.get("ETag"),
+                        "last_modified": resp.headers.get("Last-Modified"),
+                        "content_type": content_type,
+                    },
+                )
+                with partial.open("r+b" if offset else "wb") as f:
+                    f.seek(offset)
+                    f.truncate()
+                    while True:
+                        chunk = resp.read(RESPONSE_READ_CHUNK_BYTES)
+                        if not chunk:
+                            break
+                        f.write(chunk)
+                        transferred += len(chunk)
+                        if f.tell() > max_asset_bytes:
+                            raise _AssetTooLarge(f"more than {max_asset_bytes} bytes")
+                    # urllib reports a connection closed mid-body as a short read, not an error.
+                    if length is not None and length.isdigit() and f.tell() != offset + int(length):
+                        raise ValueError(f"truncated response: {f.tell()} of {offset + int(length)} bytes")
+                rate_limiter.on_success()
+                return content_type, transferred
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and offset:
+                # Nothing left past the offset: either the partial file is already complete
+                # (the crash came before it was admitted) or it is bogus and is refetched.
+                total = (e.headers.get("Content-Range") or "").rpartition("/")[2]
+                if total.isdigit() and int(total) == offset:
+                    rate_limiter.on_success()
+                    return str(meta.get("content_type") or ""), transferred
+                partial.unlink(missing_ok=True)
+                continue
+            if e.code not in RETRYABLE_HTTP_CODES or attempt >= max_retries:
+                raise
+            sleep_seconds = http_retry_sleep_seconds(e.code, e.headers, attempt)
+            if e.code == 429:
+                # Throttling is per asset host: hold back that host's bucket (every worker
+                # fetching from it waits in rate_limiter.wait) and leave the others running.
+                rate_limiter.penalize_key(host, sleep_seconds)
+            else:
+                time.sleep(sleep_seconds)
+        except _AssetTooLarge:
+            partial.unlink(missing_ok=True)
+            meta_path.unlink(missing_ok=True)
+            raise
+        except (urllib.error.URLError, http.client.HTTPException, OSError, ValueError):
+            # Includes connections dropped mid-body: the bytes written so far are kept and
+            # the next attempt asks only for the rest.
+            if attempt >= max_retries:
+                raise
+            time.sleep(error_retry_sleep_seconds(attempt))
+    raise RuntimeError(f"Failed to fetch {url}")
+
+
+def _writeup_assets(out_dir: Path, storage: str) -> Dict[int, List[str]]:
+    index_path = out_dir / "writeups_index.json"
+    if not is_valid_json_file(index_path):
+        raise RuntimeError(f"{index_path} not found; run download_kaggle_writeups.py first")
+    store = open_writeup_store(out_dir, storage)
+    try:
+        assets: Dict[int, List[str]] = {}
+        for wid in sorted(int(w) for w in read_json_file(index_path).get("writeup_ids") or []):
+            if store.has(wid):
+                assets[wid] = collect_asset_urls(store.read_json(wid))
+        return assets
+    finally:
+        store.close()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out-dir", default="./kaggle_writeups_export", help="Export written by the downloader")
+    parser.add_argument("--storage", choices=STORAGE_LAYOUTS, default="files")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--request-timeout-seconds", type=int, default=60)
+    parser.add_argument("--max-retries", type=int, default=5)
+    parser.add_argument(
+        "--min-request-interval-seconds",
+        type=float,
+        default=0.1,
+        help="Minimum spacing between requests to the same host",
+    )
+    parser.add_argument(
+        "--budget-bytes",
+        type=_parse_size,
+        default=ASSET_BUDGET_BYTES,
+        help="Cap on mirrored bytes, e.g. 500M or 2G; least recently used assets are evicted beyond it",
+    )
+    parser.add_argument("--max-asset-bytes", type=_parse_size, default=ASSET_MAX_BYTES)
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="Also retry assets that failed or were evicted on earlier runs",
+    )
+    args = parser.parse_args(argv)
+
+    out_dir = Path(args.out_dir).expanduser().resolve()
+    threads = max(1, int(args.threads))
+    max_retries = max(1, int(args.max_retries))
+    max_asset_bytes = min(int(args.max_asset_bytes), int(args.budget_bytes))
+
+    assets = _writeup_assets(out_dir, str(args.storage))
+    store = AssetStore(out_dir / ASSETS_DIRNAME, int(args.budget_bytes))
+    rate_limiter = RateLimiter(float(args.min_request_interval_seconds))
+    counts: Dict[str, int] = {"fetched": 0, "deduplicated": 0, "failed": 0, "too_large": 0, "evicted": 0}
+    transferred = 0
+    counts_lock = threading.Lock()
+
+    try:
+        counts["evicted"] += len(store.evict_to_budget())
+        for wid, urls in assets.items():
+            store.add_refs(wid, urls)
+        statuses = store.statuses()
+        retry = {"failed", "evicted", "too_large"} if args.retry_failed else set()
+        urls = sorted({u for us in assets.values() for u in us})
+        todo = [u for u in urls if u not in statuses or statuses[u] in retry]
+        sys.stderr.write(f"[assets] writeups={len(assets)} urls={len(urls)} to_fetch={len(todo)}\n")
+        sys.stderr.flush()
+
+        def mirror(url: str) -> None:
+            nonlocal transferred
+            try:
+                content_type, n = _fetch_asset(
+                    url, store, int(args.request_timeout_seconds), max_retries, max_asset_bytes, rate_limiter
+                )
+                _asset, deduplicated, evicted = store.admit(url, store.partial_path(url), content_type)
+                outcome = "deduplicated" if deduplicated else "fetched"
+            except _AssetTooLarge as e:
+                store.record_failure(url, "too_large", str(e))
+                n, evicted, outcome = 0, [], "too_large"
+            except Exception as e:
+                store.record_failure(url, "failed", f"{type(e).__name__}: {e}")
+                n, evicted, outcome = 0, [], "failed"
+            with counts_lock:
+                counts[outcome] += 1
+                counts["evicted"] += len(evicted)
+                transferred += n
+                done = sum(counts[k] for k in ("fetched", "deduplicated", "failed", "too_large"))
+                if done % 50 == 0 or done == len(todo):
+                    sys.stderr.write(f"[assets] {done}/{len(todo)} {outcome} {url}\n")
+                    sys.stderr.flush()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(mirror, todo))
+
+        stored = store.stored_bytes()
+    finally:
+        store.close()
+
+    sys.stdout.write(
+        f"DONE\n"
+        f"assets urls={len(urls)} fetched={counts['fetched']} deduplicated={counts['deduplicated']} "
+        f"failed={counts['failed']} too_large={counts['too_large']} evicted={counts['evicted']}\n"
+        f"bytes transferred={transferred} stored={stored} budget={int(args.budget_bytes)}\n"
+        f"assets_dir={out_dir / ASSETS_DIRNAME}\n"
+    )
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -8,6 +8,10 @@ import re
 from wordcloud import WordCloud
 import matplotlib.pyplot as plt
 from io import BytesIO
+from pathlib import Path
+
+from download_kaggle_writeups import PACKED_REF_PREFIX, PackedWriteupStore, packed_ref_writeup_id
+from mirror_writeup_assets import ASSET_INDEX_FILENAME, ASSETS_DIRNAME, AssetStore, localize_markdown
 
 # 页面配置
 st.set_page_config(
@@ -114,6 +118,27 @@ def load_data(csv_path):
         st.error(f"加载数据出错: {e}")
         return pd.DataFrame()
 
+@st.cache_resource
+def get_packed_store(export_dir):
+    """打开 packed 存储（索引常驻内存，按需 mmap 读取单篇）"""
+    return PackedWriteupStore(Path(export_dir))
+
+@st.cache_resource
+def get_asset_store(export_dir):
+    """打开本地资源镜像（mirror_writeup_assets.py 生成），没有镜像时返回 None"""
+    root = Path(export_dir) / ASSETS_DIRNAME
+    if not (root / ASSET_INDEX_FILENAME).exists():
+        return None
+    return AssetStore(root)
+
+def read_markdown(export_dir, md_path):
+    """读取 Writeup 的 Markdown，支持 files 和 packed 两种存储布局"""
+    md_path = str(md_path)
+    if md_path.startswith(PACKED_REF_PREFIX):
+        return get_packed_store(export_dir).read_markdown(packed_ref_writeup_id(md_path))
+    with open(f"{export_dir}/{md_path}", 'r', encoding='utf-8') as f:
+        return f.read()
+
 def extract_youtube_id(url):
     """从 URL 中提取 YouTube 视频 ID"""
     if pd.isna(url) or not url:
@@ -309,10 +334,12 @@ def main():
             # 完整内容
             md_path = item.get('markdown_path')
             if pd.notna(md_path):
-                full_path = f"kaggle_writeups_export/{md_path}"
                 try:
-                    with open(full_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
+                    content = read_markdown("kaggle_writeups_export", md_path)
+                    asset_store = get_asset_store("kaggle_writeups_export")
+                    if asset_store is not None:
+                        # 已镜像的图片改为内嵌本地副本，不再外链
+                        content = localize_markdown(content, asset_store)
                     st.markdown("### 📄 完整描述")
                     with st.container(height=500):
                         st.markdown(content)